@@ -18,7 +18,8 @@ a = Analysis(
     pathex=[],
     binaries=binaries,
     datas=datas,
-    hiddenimports=[],
+    # engine/__init__.py imports these by name on first access (engine._LAZY).
+    hiddenimports=['engine.config', 'engine.transfer'],
     hookspath=[],
     hooksconfig=[],
     runtime_hooks=[],
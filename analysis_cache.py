@@ -0,0 +1,663 @@
+"""
+Content-addressed cache for per-file analysis results (BPM, key, waveform peaks).
+
+Results are keyed by a fingerprint of the file's content — its size plus a
+BLAKE2b digest of the first and last 64 KiB — so they follow a file through
+Copy/Move, renames and other machines.  Hashing is avoided on repeat visits
+by a shared path → fingerprint side index (~/.sampson/fingerprints.json)
+that is trusted while the file's size and mtime are unchanged.
+
+Cache files look like
+
+    {"version": 2,
+     "entries": {"<fingerprint>": {"bpm": 120.0, "source": "analysis",
+                                   "confidence": 0.91, "algorithm": "autocorr/1",
+                                   "candidates": [[120.0, 0.91], [60.0, 0.77]]}, ...},
+     "legacy":  {"<path>": {"mtime": ..., "bpm": ...}, ...}}
+
+"legacy" holds entries from the old path + mtime format; each is migrated
+to its fingerprint the first time its file is looked up, so upgrading never
+re-hashes a whole library at once.
+
+Analysed entries record the detector that produced them as "name/version".
+When a detector's version is bumped, load() drops only that detector's
+older results; tag, name and manual values are never invalidated.
+
+Maintenance keeps the files from growing without bound:
+
+  * every entry carries a "used" last-access stamp, and flush() evicts the
+    least recently used beyond MAX_ENTRIES (or the cache's own limit),
+    along with the index rows of evicted results no other cache holds;
+  * the fingerprint index is capped at MAX_ENTRIES rows too — rows with no
+    results go first, then those whose results were used least recently;
+  * maintain() — run on a background thread at startup — forgets files
+    that no longer exist, listing each indexed directory once instead of
+    stat-ing every file.  A directory that is missing altogether is left
+    alone: it may be on a volume that is simply not mounted.
+
+Each cache also counts hits and misses of the detectors' lookups;
+stats() reports them per Run.
+
+Nothing written is lost to a crash:
+
+  * every file is written with write_atomic() — a temp file in the same
+    directory, fsync'd, then renamed over the old one — so a crash leaves
+    either the old file or the new one, never half of each;
+  * every put() and discard() is also appended to a journal next to the
+    cache (bpm_cache.journal); load() replays it over the last snapshot;
+  * the first change after a save schedules a flush ANALYSIS_CACHE_FLUSH_S
+    later, so long Runs snapshot as they go and the journal stays short.
+    A snapshot moves the journal aside first (.journal.flushing) and
+    deletes it only once the new file is in place.
+
+A snapshot that still fails to parse is renamed to *.corrupt and reported,
+rather than being silently replaced by an empty cache.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+import constants
+
+CACHE_DIR = Path.home() / ".sampson"
+CACHE_VERSION = 2
+FINGERPRINT_BLOCK = 64 * 1024
+try:
+    MAX_ENTRIES = int(os.environ.get("SAMPSON_CACHE_MAX_ENTRIES",
+                                     constants.ANALYSIS_CACHE_MAX_ENTRIES))
+except ValueError:
+    MAX_ENTRIES = constants.ANALYSIS_CACHE_MAX_ENTRIES
+
+
+def write_atomic(path: Path, payload: str):
+    """Replace `path` with `payload` so a crash never leaves a partial file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            fh.write(payload)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+# ── Fingerprints ──────────────────────────────────────────────────────────────
+
+_INDEX_FILE = CACHE_DIR / "fingerprints.json"
+_index: dict = {}          # str(path) → {"mtime", "size", "fp"}
+_index_loaded = False
+_index_dirty = False
+_index_lock = threading.Lock()
+_index_write_lock = threading.Lock()   # held from snapshot to rename in flush_index()
+
+
+def fingerprint_file(path: Path, size: int) -> str:
+    """Hash the head and tail blocks of `path` (uncached)."""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as fh:
+        h.update(fh.read(FINGERPRINT_BLOCK))
+        if size > 2 * FINGERPRINT_BLOCK:
+            fh.seek(-FINGERPRINT_BLOCK, 2)
+            h.update(fh.read(FINGERPRINT_BLOCK))
+        elif size > FINGERPRINT_BLOCK:
+            h.update(fh.read())
+    return f"{size:x}-{h.hexdigest()}"
+
+
+def _load_index():
+    # Caller holds _index_lock.
+    global _index, _index_loaded
+    if _index_loaded:
+        return
+    _index_loaded = True
+    try:
+        _index = json.loads(_INDEX_FILE.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        _index = {}
+    except (OSError, ValueError) as e:
+        _index = {}
+        corrupt = _INDEX_FILE.with_suffix(".corrupt")
+        try:
+            os.replace(_INDEX_FILE, corrupt)
+        except OSError:
+            pass
+        _log(f"[CACHE] ERROR: Fingerprint index unreadable ({e}); kept as {corrupt.name}")
+
+
+def _log(message: str):
+    # The index has no log of its own; report through the first cache's.
+    for cache in _caches:
+        if cache._logged:
+            cache._log(message)
+            return
+
+
+def fingerprint(path: Path) -> Optional[str]:
+    """Return the content fingerprint of `path` (None if it can't be read)."""
+    global _index_dirty
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    key = str(path)
+    with _index_lock:
+        _load_index()
+        entry = _index.get(key)
+        if entry and entry["mtime"] == st.st_mtime and entry["size"] == st.st_size:
+            return entry["fp"]
+    try:
+        fp = fingerprint_file(path, st.st_size)
+    except OSError:
+        return None
+    with _index_lock:
+        _index[key] = {"mtime": st.st_mtime, "size": st.st_size, "fp": fp}
+        _index_dirty = True
+    return fp
+
+
+def known_fingerprint(path: Path) -> Optional[str]:
+    """Indexed fingerprint of `path` if still current, without reading the file."""
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    with _index_lock:
+        _load_index()
+        entry = _index.get(str(path))
+    if entry and entry["mtime"] == st.st_mtime and entry["size"] == st.st_size:
+        return entry["fp"]
+    return None
+
+
+def alias(pairs):
+    """Index each `dst` of (src, dst, fp) under `fp` — for byte-identical copies."""
+    global _index_dirty
+    with _index_lock:
+        _load_index()
+        for _src, dst, fp in pairs:
+            try:
+                st = dst.stat()
+            except OSError:
+                continue
+            _index[str(dst)] = {"mtime": st.st_mtime, "size": st.st_size, "fp": fp}
+            _index_dirty = True
+
+
+def copy_results(pairs):
+    """Copy every cache's entries for each (src fp, dst) — for rewritten targets."""
+    for cache in _caches:
+        for src_fp, dst in pairs:
+            cache.copy(src_fp, dst)
+
+
+def retire(paths):
+    """Forget `paths` (e.g. Move sources) and any results only they referenced."""
+    global _index_dirty
+    with _index_lock:
+        _load_index()
+        gone = {_index.pop(str(p))["fp"] for p in paths if str(p) in _index}
+        if not gone:
+            return
+        _index_dirty = True
+        gone -= {e["fp"] for e in _index.values()}
+    for cache in _caches:
+        cache.discard(gone)
+
+
+def _unindex(fps):
+    """Drop the index rows of evicted `fps` that no cache holds any more."""
+    global _index_dirty
+    gone = set(fps)
+    for cache in _caches:
+        if not gone:
+            return
+        with cache._lock:
+            gone = {fp for fp in gone if fp not in cache._entries}
+    if not gone:
+        return
+    with _index_lock:
+        _load_index()
+        stale = [p for p, row in _index.items() if row["fp"] in gone]
+        for p in stale:
+            del _index[p]
+        if stale:
+            _index_dirty = True
+
+
+def _trim_index():
+    """Cap the index at MAX_ENTRIES rows: rows without results go first,
+    then those whose results were used least recently."""
+    global _index_dirty
+    if len(_index) <= MAX_ENTRIES:
+        return
+    used: dict = {}
+    for cache in _caches:
+        with cache._lock:
+            for fp, entry in cache._entries.items():
+                used[fp] = max(used.get(fp, 0), entry.get("used", 0))
+    with _index_lock:
+        excess = len(_index) - MAX_ENTRIES
+        if excess <= 0:
+            return
+        oldest = sorted(_index, key=lambda p: used.get(_index[p]["fp"], -1))[:excess]
+        for p in oldest:
+            del _index[p]
+        _index_dirty = True
+    _log(f"[CACHE] Trimmed {excess} rows from the fingerprint index")
+
+
+def flush_index():
+    global _index_dirty
+    _trim_index()
+    # The write lock keeps concurrent flushes in order: an older snapshot
+    # can never be renamed over a newer one.
+    with _index_write_lock:
+        with _index_lock:
+            if not _index_dirty:
+                return
+            payload = json.dumps(_index)
+            _index_dirty = False
+        try:
+            write_atomic(_INDEX_FILE, payload)
+        except Exception:
+            with _index_lock:
+                _index_dirty = True
+
+
+# ── Result caches ─────────────────────────────────────────────────────────────
+
+_caches: list = []            # every AnalysisCache, for retire()
+
+
+class AnalysisCache:
+    """One result per fingerprint, stored in CACHE_DIR / `filename` under `field`.
+
+    `versions` maps detector name → current version; analysed entries from
+    any other version are dropped on load.  Entries written before versions
+    were recorded count as `legacy_algorithm`.  `max_entries` overrides
+    MAX_ENTRIES; `log` may be None for a cache with nothing to report.
+    """
+
+    def __init__(self, filename: str, field: str, tag: str, log,
+                 versions: Optional[dict] = None, legacy_algorithm: Optional[str] = None,
+                 max_entries: Optional[int] = None):
+        self.path = CACHE_DIR / filename
+        self.journal = self.path.with_suffix(".journal")
+        self._flushing = self.path.with_suffix(".journal.flushing")
+        self.field = field
+        self.tag = tag
+        self._log = log or (lambda message: None)
+        self._logged = log is not None
+        self._max_entries = max_entries or MAX_ENTRIES
+        self._versions = versions or {}
+        self._legacy_algorithm = legacy_algorithm
+        self._entries: dict = {}
+        self._legacy: dict = {}
+        self._loaded = False
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()      # one snapshot at a time
+        self._journal_fh = None
+        self._timer = None
+        self.hits = self.misses = 0
+        _caches.append(self)
+
+    def load(self):
+        with self._lock:
+            if self._loaded:
+                return
+            self._loaded = True
+            data = self._read_snapshot()
+            if data.get("version") == CACHE_VERSION:
+                self._entries = data.get("entries", {})
+                self._legacy = data.get("legacy", {})
+            else:
+                self._legacy = data          # v1: {path: {"mtime", field}}
+            if data:
+                self._log(f"{self.tag} Loaded cache: {len(self._entries) + len(self._legacy)} entries")
+            replayed = self._replay(self._flushing) + self._replay(self.journal)
+            if replayed:
+                self._dirty = True
+                self._log(f"{self.tag} Recovered {replayed} unsaved results from the journal")
+            stale = [fp for fp, entry in self._entries.items() if not self._current(entry)]
+            for fp in stale:
+                del self._entries[fp]
+            if stale:
+                self._dirty = True
+                self._log(f"{self.tag} Dropped {len(stale)} results from outdated detector versions")
+            if self._dirty:
+                self._schedule_flush()
+
+    def _read_snapshot(self) -> dict:
+        # Caller holds self._lock.
+        try:
+            return json.loads(self.path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            corrupt = self.path.with_suffix(".corrupt")
+            try:
+                os.replace(self.path, corrupt)
+            except OSError:
+                pass
+            self._log(f"{self.tag} ERROR: Cache file unreadable ({e}); kept as {corrupt.name}")
+            return {}
+
+    def _replay(self, journal: Path) -> int:
+        # Caller holds self._lock.  A torn last line (crash mid-append) ends the replay.
+        try:
+            lines = journal.read_text(encoding="utf-8").splitlines()
+        except OSError:
+            return 0
+        count = 0
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            if "entry" in record:
+                self._legacy.pop(record.get("path"), None)
+                self._entries[record["fp"]] = record["entry"]
+            else:
+                self._entries.pop(record["fp"], None)
+            count += 1
+        return count
+
+    def _append_journal(self, record: dict):
+        # Caller holds self._lock.  Best effort: the snapshot is still written on flush.
+        try:
+            if self._journal_fh is None:
+                CACHE_DIR.mkdir(parents=True, exist_ok=True)
+                self._journal_fh = open(self.journal, "a", encoding="utf-8")
+            self._journal_fh.write(json.dumps(record) + "\n")
+            self._journal_fh.flush()
+        except OSError:
+            pass
+
+    def _rotate_journal(self):
+        # Caller holds self._lock.  Everything journalled so far is in the
+        # snapshot about to be written; later writes start a fresh journal.
+        if self._journal_fh is not None:
+            self._journal_fh.close()
+            self._journal_fh = None
+        try:
+            if not self._flushing.exists():
+                os.replace(self.journal, self._flushing)
+            else:                                # an earlier save failed: keep both
+                with open(self._flushing, "ab") as dst:
+                    dst.write(self.journal.read_bytes())
+                self.journal.unlink()
+        except OSError:
+            pass
+
+    def _schedule_flush(self):
+        # Caller holds self._lock.  Changes within the interval share one save.
+        if self._timer is None:
+            self._timer = threading.Timer(constants.ANALYSIS_CACHE_FLUSH_S, self._timed_flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _timed_flush(self):
+        with self._lock:
+            self._timer = None
+        self.flush(quiet=True)
+
+    def algorithm(self, name: str) -> str:
+        """The "name/version" tag stored with results of detector `name`."""
+        return f"{name}/{self._versions.get(name, 1)}"
+
+    def _current(self, entry: dict) -> bool:
+        if not self._versions or entry.get("source", "analysis") != "analysis":
+            return True
+        name, _, version = (entry.get("algorithm") or self._legacy_algorithm or "").partition("/")
+        return name not in self._versions or version == str(self._versions[name])
+
+    def _migrate(self, path: Path, fp: str):
+        # Caller holds self._lock.
+        old = self._legacy.get(str(path))
+        if old is None:
+            return
+        try:
+            if old["mtime"] == path.stat().st_mtime:
+                self._entries.setdefault(fp, {self.field: old[self.field]})
+        except (OSError, KeyError):
+            pass
+        del self._legacy[str(path)]
+        self._dirty = True
+
+    def get_entry(self, path: Path, indexed_only: bool = False) -> Optional[dict]:
+        """The cache entry ({field: value, "source": ...}) for `path`'s content, or None.
+
+        `indexed_only` looks `path` up only if its fingerprint is already
+        indexed — no file reads, for cheap display-only lookups.
+        """
+        self.load()
+        fp = known_fingerprint(path) if indexed_only else fingerprint(path)
+        if fp is None:
+            return None
+        with self._lock:
+            if fp not in self._entries:
+                self._migrate(path, fp)
+            entry = self._entries.get(fp)
+            if not entry:
+                return None
+            self._touch(entry)
+            return dict(entry)
+
+    def _touch(self, entry: dict):
+        # Caller holds self._lock.  Coarse stamps keep reads from dirtying the file.
+        now = int(time.time())
+        if now - entry.get("used", 0) >= constants.ANALYSIS_CACHE_TOUCH_S:
+            entry["used"] = now
+            self._dirty = True
+
+    def count(self, hit: bool):
+        """Record a detector lookup for stats()."""
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, path: Path, indexed_only: bool = False):
+        """Cached value for `path`'s content, or None."""
+        entry = self.get_entry(path, indexed_only)
+        return entry.get(self.field) if entry else None
+
+    def put(self, path: Path, value, source: Optional[str] = None,
+            confidence: Optional[float] = None, algorithm: Optional[str] = None,
+            candidates=None) -> bool:
+        """Store `value` for `path`'s content. Returns False if the file is unreadable.
+
+        `source` records where the value came from ("analysis", "tag", "manual");
+        for analysed values, `confidence` (0–1) how sure the detector was,
+        `algorithm` which detector version produced it and `candidates` its
+        [(value, score)] runners-up, best first.
+        """
+        self.load()
+        fp = fingerprint(path)
+        if fp is None:
+            return False
+        entry = {self.field: value}
+        if source:
+            entry["source"] = source
+        if confidence is not None:
+            entry["confidence"] = round(confidence, 3)
+        if algorithm:
+            entry["algorithm"] = algorithm
+        if candidates:
+            entry["candidates"] = [[v, round(score, 3)] for v, score in candidates]
+        entry["used"] = int(time.time())
+        self._store(path, fp, entry)
+        return True
+
+    def copy(self, src_fp: str, path: Path) -> bool:
+        """Copy the entry under `src_fp` to `path`'s content (False if there is none).
+
+        The whole entry is kept: source, confidence, detector version and
+        candidates, so a carried manual or tag value stays one.
+        """
+        self.load()
+        with self._lock:
+            entry = self._entries.get(src_fp)
+        if entry is None:
+            return False
+        fp = fingerprint(path)
+        if fp is None:
+            return False
+        if fp != src_fp:
+            self._store(path, fp, dict(entry, used=int(time.time())))
+        return True
+
+    def _store(self, path: Path, fp: str, entry: dict):
+        with self._lock:
+            self._legacy.pop(str(path), None)
+            self._entries[fp] = entry
+            self._dirty = True
+            self._append_journal({"fp": fp, "path": str(path), "entry": entry})
+            self._schedule_flush()
+
+    def discard(self, fps):
+        """Drop the results stored under any of `fps`."""
+        self.load()
+        with self._lock:
+            for fp in fps:
+                if self._entries.pop(fp, None) is not None:
+                    self._dirty = True
+                    self._append_journal({"fp": fp})
+            if self._dirty:
+                self._schedule_flush()
+
+    def flush(self, quiet: bool = False):
+        """Write the cache (and the shared fingerprint index) if anything changed.
+
+        `quiet` skips the log lines — for the periodic background saves.
+        """
+        with self._flush_lock:
+            with self._lock:
+                evicted = self._evict()
+            _unindex(evicted)
+            flush_index()
+            with self._lock:
+                if not self._dirty:
+                    if not quiet:
+                        self._log(f"{self.tag} Cache unchanged")
+                    return
+                data = {"version": CACHE_VERSION, "entries": self._entries}
+                if self._legacy:
+                    data["legacy"] = self._legacy
+                payload = json.dumps(data, indent=2)
+                count = len(self._entries)
+                self._dirty = False
+                self._rotate_journal()
+            try:
+                write_atomic(self.path, payload)
+                self._flushing.unlink(missing_ok=True)
+                if not quiet:
+                    self._log(f"{self.tag} Cache saved: {count} entries")
+            except Exception as e:
+                with self._lock:
+                    self._dirty = True
+                self._log(f"{self.tag} ERROR: Cache save failed - {e}")
+
+    def _evict(self) -> list:
+        # Caller holds self._lock.  Returns the evicted fingerprints.
+        excess = len(self._entries) - self._max_entries
+        if excess <= 0:
+            return []
+        oldest = sorted(self._entries, key=lambda fp: self._entries[fp].get("used", 0))[:excess]
+        for fp in oldest:
+            del self._entries[fp]
+        self._dirty = True
+        self._log(f"{self.tag} Evicted {excess} least recently used results")
+        return oldest
+
+    def _prune_legacy(self, missing: set) -> int:
+        with self._lock:
+            gone = [p for p in self._legacy if p in missing]
+            for p in gone:
+                del self._legacy[p]
+            if gone:
+                self._dirty = True
+            return len(gone)
+
+
+def flush_all():
+    """Flush the fingerprint index and every cache with unsaved changes."""
+    flush_index()
+    for cache in _caches:
+        if cache._dirty:
+            cache.flush()
+
+
+# ── Maintenance ───────────────────────────────────────────────────────────────
+
+def _missing(paths) -> set:
+    """The `paths` whose directory still exists but no longer lists them."""
+    by_dir: dict = {}
+    for p in paths:
+        by_dir.setdefault(os.path.dirname(p), []).append(p)
+    missing = set()
+    for directory, group in by_dir.items():
+        try:
+            with os.scandir(directory) as it:
+                names = {e.name for e in it}
+        except OSError:
+            continue                     # gone, unmounted or unreadable: keep
+        missing.update(p for p in group if os.path.basename(p) not in names)
+    return missing
+
+
+def maintain(busy=None) -> int:
+    """Forget files that no longer exist, evict beyond MAX_ENTRIES, and flush.
+
+    `busy()`, if given, is checked before anything is dropped; a Run that is
+    moving files right now would otherwise look like deletions.  Returns the
+    number of paths forgotten.
+    """
+    for cache in _caches:
+        cache.load()
+    with _index_lock:
+        _load_index()
+        indexed = list(_index)
+    legacy = [p for cache in _caches for p in list(cache._legacy)]
+    missing = _missing(indexed + legacy)
+    if not missing or (busy and busy()):
+        flush_all()
+        return 0
+    before = {cache: len(cache._entries) for cache in _caches}
+    retire(missing)
+    for cache in _caches:
+        dropped = before[cache] - len(cache._entries) + cache._prune_legacy(missing)
+        if dropped:
+            cache._log(f"{cache.tag} Pruned {dropped} results of files that no longer exist")
+    flush_all()
+    return len(missing)
+
+
+def start_maintenance(busy=None):
+    """Run maintain() on a background thread."""
+    threading.Thread(target=maintain, args=(busy,), name="sampson-cache-maintenance",
+                     daemon=True).start()
+
+
+def reset_stats():
+    """Zero the hit/miss counters (at the start of a Run)."""
+    for cache in _caches:
+        with cache._lock:
+            cache.hits = cache.misses = 0
+
+
+def stats() -> dict:
+    """{field: {"hits", "misses"}} for every cache looked up since reset_stats()."""
+    return {cache.field: {"hits": cache.hits, "misses": cache.misses}
+            for cache in _caches if cache.hits or cache.misses}
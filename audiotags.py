@@ -0,0 +1,281 @@
+"""
+Embedded BPM / root-note tags in WAV and AIFF headers.
+
+write_tags() stores analysis results in the exported file itself:
+
+  * WAV  — an `acid` chunk (tempo + root note), the chunk ACID, Ableton Live
+           and most samplers read.
+  * AIFF — an `ANNO` annotation chunk with a fixed-width SAMPSON text line.
+
+read_tags() walks the chunk headers only (seeking past the audio), so a
+tagged file costs a few small reads instead of a decode and an analysis.
+Besides our own chunks it understands what commercial packs ship with:
+
+  * WAV  `acid` — tempo and root note (ACID / Live / most loop tools)
+  * WAV  `smpl` — MIDI unity note (sampler root key)
+  * WAV  `inst`, AIFF `INST` — instrument base note
+  * AIFF `basc` — Apple Loops beat count and root note; the tempo follows
+                  from the beat count and the COMM frame count / rate
+
+When several chunks disagree the more specific one wins: acid/ANNO over
+basc over smpl/inst.
+Rewrites happen in place: an existing tag chunk of ours is overwritten,
+otherwise the chunk is appended and the container size patched — the audio
+data is never moved.
+"""
+
+import struct
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+from key import NOTE_NAMES
+
+_WAV_EXTS  = {".wav"}
+_AIFF_EXTS = {".aif", ".aiff"}
+
+_ACID_FMT = "<IHHfIHHf"          # flags, root note, -, -, beats, meter den/num, tempo
+_ACID_ONE_SHOT = 0x01
+_ACID_ROOT_SET = 0x02
+_ACID_ROOT_BASE = 48             # acid root notes are MIDI numbers; 48 = C3
+
+_ANNO_PREFIX = b"SAMPSON "
+_ANNO_FMT = "SAMPSON bpm={bpm:06.2f} key={key:<2}"   # fixed width → rewrites in place
+
+BPM_RANGE = (30.0, 300.0)
+
+
+class Tags(NamedTuple):
+    bpm: Optional[float]
+    key: Optional[str]
+    source: str          # chunk(s) the values came from, e.g. "acid" or "basc+INST"
+
+
+def supports(path: Path) -> bool:
+    """True if tags can be written to / read from `path`'s container."""
+    return path.suffix.lower() in _WAV_EXTS | _AIFF_EXTS
+
+
+def _valid_bpm(value) -> Optional[float]:
+    if value and BPM_RANGE[0] <= value <= BPM_RANGE[1]:
+        return round(float(value), 2)
+    return None
+
+
+# ── Chunk walking ─────────────────────────────────────────────────────────────
+
+def _chunks(fh, endian: str, end: int):
+    """Yield (chunk id, data offset, data size) for every chunk up to `end`."""
+    pos = 12
+    while pos + 8 <= end:
+        fh.seek(pos)
+        head = fh.read(8)
+        if len(head) < 8:
+            return
+        cid, size = struct.unpack(endian + "4sI", head)
+        yield cid, pos + 8, size
+        pos += 8 + size + (size & 1)
+
+
+def _open_container(fh):
+    """Return (endian, form type) for a RIFF/WAVE or FORM/AIFF(-C) file, else None."""
+    head = fh.read(12)
+    if len(head) < 12:
+        return None
+    if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+        return "<", b"WAVE"
+    if head[:4] == b"FORM" and head[8:12] in (b"AIFF", b"AIFC"):
+        return ">", head[8:12]
+    return None
+
+
+# ── Reading ───────────────────────────────────────────────────────────────────
+
+def _parse_acid(data: bytes) -> Tags:
+    flags, root, _u1, _u2, _beats, _den, _num, tempo = struct.unpack(_ACID_FMT, data[:24])
+    key = NOTE_NAMES[root % 12] if flags & _ACID_ROOT_SET else None
+    bpm = None if flags & _ACID_ONE_SHOT else _valid_bpm(tempo)
+    return Tags(bpm, key, "acid")
+
+
+def _parse_smpl(data: bytes) -> Optional[Tags]:
+    manufacturer, _product, _period, unity, fraction, _fmt, _off, loops = \
+        struct.unpack("<8I", data[:32])
+    # Many writers emit a bare smpl chunk with the default unity note 60;
+    # only trust it when the chunk says something beyond the defaults.
+    if unity > 127 or (unity == 60 and not (manufacturer or fraction or loops)):
+        return None
+    return Tags(None, NOTE_NAMES[unity % 12], "smpl")
+
+
+def _parse_inst(data: bytes, cid: bytes) -> Optional[Tags]:
+    note = data[0]
+    if note > 127:
+        return None
+    return Tags(None, NOTE_NAMES[note % 12], cid.decode("ascii"))
+
+
+def _extended(data: bytes) -> float:
+    """Decode an 80-bit IEEE extended float (AIFF COMM sample rate)."""
+    exp, mant = struct.unpack(">HQ", data[:10])
+    if not mant:
+        return 0.0
+    sign = -1.0 if exp & 0x8000 else 1.0
+    return sign * mant * 2.0 ** ((exp & 0x7FFF) - 16383 - 63)
+
+
+def _parse_basc(data: bytes, seconds: Optional[float]) -> Tags:
+    _version, beats, root = struct.unpack(">IIH", data[:10])
+    bpm = _valid_bpm(beats * 60.0 / seconds) if beats and seconds else None
+    key = NOTE_NAMES[root % 12] if 0 < root <= 127 else None
+    return Tags(bpm, key, "basc")
+
+
+def _merge(found: list) -> Optional[Tags]:
+    """Combine chunk results, earlier entries (higher priority) first."""
+    bpm = next(((t.bpm, t.source) for t in found if t.bpm is not None), (None, None))
+    key = next(((t.key, t.source) for t in found if t.key is not None), (None, None))
+    if bpm[0] is None and key[0] is None:
+        return None
+    sources = [s for s in (bpm[1], key[1]) if s]
+    return Tags(bpm[0], key[0], "+".join(dict.fromkeys(sources)))
+
+
+def _parse_anno(data: bytes) -> Optional[Tags]:
+    if not data.startswith(_ANNO_PREFIX):
+        return None
+    fields = dict(part.split("=", 1) for part in data.decode("ascii", "replace").split()
+                  if "=" in part)
+    try:
+        bpm = _valid_bpm(float(fields.get("bpm", "0")))
+    except ValueError:
+        bpm = None
+    key = fields.get("key") if fields.get("key") in NOTE_NAMES else None
+    return Tags(bpm, key, "anno")
+
+
+def read_tags(path: Path) -> Optional[Tags]:
+    """Return the BPM/key embedded in `path`'s header, or None if it carries none."""
+    if not supports(path):
+        return None
+    by_chunk = {}
+    seconds = None
+    basc = None
+    try:
+        with open(path, "rb") as fh:
+            kind = _open_container(fh)
+            if kind is None:
+                return None
+            endian, _form = kind
+            end = fh.seek(0, 2)
+            for cid, offset, size in _chunks(fh, endian, end):
+                if cid == b"acid" and size >= 24:
+                    by_chunk["acid"] = _parse_acid(_read_at(fh, offset, 24))
+                elif cid == b"ANNO" and size <= 256:
+                    tags = _parse_anno(_read_at(fh, offset, size))
+                    if tags:
+                        by_chunk["anno"] = tags
+                elif cid == b"smpl" and size >= 36:
+                    by_chunk["smpl"] = _parse_smpl(_read_at(fh, offset, 32))
+                elif cid in (b"inst", b"INST") and size >= 7:
+                    by_chunk["inst"] = _parse_inst(_read_at(fh, offset, 1), cid)
+                elif cid == b"COMM" and size >= 18:
+                    comm = _read_at(fh, offset, 18)
+                    frames = struct.unpack(">I", comm[2:6])[0]
+                    rate = _extended(comm[8:18])
+                    seconds = frames / rate if rate > 0 else None
+                elif cid == b"basc" and size >= 10:
+                    basc = _read_at(fh, offset, 10)
+    except (OSError, struct.error):
+        return None
+    if basc is not None:
+        by_chunk["basc"] = _parse_basc(basc, seconds)
+    order = ("anno", "acid", "basc", "smpl", "inst")
+    return _merge([by_chunk[k] for k in order if by_chunk.get(k)])
+
+
+# ── Writing ───────────────────────────────────────────────────────────────────
+
+def _acid_chunk(bpm: Optional[float], key: Optional[str],
+                existing: Optional[bytes] = None) -> Optional[bytes]:
+    """The 24-byte acid header with `bpm` / `key` set.
+
+    An `existing` header is updated in place: its flags, beat count and
+    meter are kept, and a one-shot never gets a tempo.  None if there is
+    nothing to change.
+    """
+    if existing is None:
+        fields = [0, 0, 0x8000, 0.0, 0, 4, 4, 0.0]
+    else:
+        fields = list(struct.unpack(_ACID_FMT, existing[:24]))
+    if bpm is not None and fields[0] & _ACID_ONE_SHOT:
+        bpm = None
+    if bpm is None and key is None:
+        return None
+    if key is not None:
+        fields[0] |= _ACID_ROOT_SET
+        fields[1] = _ACID_ROOT_BASE + NOTE_NAMES.index(key)
+    if bpm is not None:
+        fields[7] = float(bpm)
+    return struct.pack(_ACID_FMT, *fields)
+
+
+def _anno_chunk(bpm: Optional[float], key: Optional[str]) -> bytes:
+    text = _ANNO_FMT.format(bpm=bpm or 0.0, key=key if key in NOTE_NAMES else "-")
+    return text.encode("ascii")
+
+
+def write_tags(path: Path, bpm: Optional[float] = None, key: Optional[str] = None) -> bool:
+    """Embed `bpm` / `key` in `path`'s header. Returns False if nothing was written."""
+    bpm = _valid_bpm(bpm)
+    if key not in NOTE_NAMES:
+        key = None
+    if (bpm is None and key is None) or not supports(path):
+        return False
+    try:
+        with open(path, "r+b") as fh:
+            kind = _open_container(fh)
+            if kind is None:
+                return False
+            endian, form = kind
+            end = fh.seek(0, 2)
+            if form == b"WAVE":
+                cid = b"acid"
+                for found, offset, size in _chunks(fh, endian, end):
+                    if found == cid and size >= 24:
+                        data = _acid_chunk(bpm, key, _read_at(fh, offset, 24))
+                        if data is None:
+                            return False
+                        fh.seek(offset)
+                        fh.write(data)
+                        return True
+                data = _acid_chunk(bpm, key)
+            else:
+                cid, data = b"ANNO", _anno_chunk(bpm, key)
+                for found, offset, size in _chunks(fh, endian, end):
+                    if (found == cid and size == len(data)
+                            and _read_at(fh, offset, len(_ANNO_PREFIX)) == _ANNO_PREFIX):
+                        fh.seek(offset)
+                        fh.write(data)
+                        return True
+            # Append a new chunk (keeping the container word-aligned) and patch its size.
+            fh.seek(end)
+            if end & 1:
+                fh.write(b"\0")
+                end += 1
+            fh.write(struct.pack(endian + "4sI", cid, len(data)) + data)
+            if len(data) & 1:
+                fh.write(b"\0")
+            total = fh.tell()
+            if total - 8 > 0xFFFFFFFF:
+                fh.truncate(end)
+                return False
+            fh.seek(4)
+            fh.write(struct.pack(endian + "I", total - 8))
+        return True
+    except (OSError, struct.error):
+        return False
+
+
+def _read_at(fh, offset: int, n: int) -> bytes:
+    fh.seek(offset)
+    return fh.read(n)
@@ -0,0 +1 @@
+"""Performance benchmarks and synthetic test-library generation."""
@@ -0,0 +1,191 @@
+"""Pipeline benchmark: time each stage over a synthetic library.
+
+    python -m benchmarks.bench [--folders 4] [--files 10] [--seconds 4]
+                               [--baseline benchmarks/baseline.json]
+
+Run from the repository root.  Generates (or reuses, with --library) a
+reproducible library, then times the scanner, duration probing, the Deck B
+filter, BPM and key detection, conversion and the full Run worker.  Results
+are written as JSON; when a baseline is given each stage's median is
+compared against it and the exit status is 1 if any stage regressed by more
+than --threshold.
+
+The analysis caches are redirected to a scratch HOME so runs never read or
+pollute ~/.sampson.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks import synth
+from benchmarks.common import (ROOT, add_baseline_args, compare_medians, load_baseline,
+                               meta, print_medians, stats, write_report)
+
+_FILTER_QUERIES = ["loop_01", "BPM:120", "BPM:100-130", "BPM:1*",
+                   "Note:C", "MinLength:2 MaxLength:10", "loop BPM:90-150 Note:F#"]
+
+
+class _DiscardRoot:
+    """Stands in for state.root: swallows after() callbacks so GUI-bound
+    workers (_scan_thread, _run_worker) can be timed without a Tk root."""
+
+    def __init__(self):
+        self.callbacks = []
+
+    def after(self, _ms, fn=None, *args):
+        if fn is not None:
+            self.callbacks.append((fn, args))
+        return "after#0"
+
+    def after_cancel(self, _id):
+        pass
+
+
+def _time_each(fn, items) -> list:
+    samples = []
+    for item in items:
+        t0 = time.perf_counter()
+        fn(item)
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+
+def _time_repeat(fn, repeat: int) -> list:
+    return _time_each(lambda _i: fn(), range(repeat))
+
+
+def run_benchmarks(library: Path, work: Path, stages, repeat: int, workers: int) -> dict:
+    """Time every requested stage and return {stage: stats}."""
+    import state
+    import engine
+    import preview
+    import operations
+    import bpm as bpm_module
+    import key as key_module
+    from conversion import convert_file, check_ffmpeg
+
+    files = sorted(engine.scan_audio_files([library]))
+    results = {}
+
+    if "scan" in stages:
+        results["scan"] = stats(_time_repeat(
+            lambda: engine.scan_audio_files([library]), repeat))
+
+    if "get_duration" in stages:
+        def _cold_duration(f):
+            engine.clear_duration_cache()
+            engine.get_duration(f)
+        results["get_duration"] = stats(_time_each(_cold_duration, files))
+
+    if "scan_thread" in stages:
+        state.root = _DiscardRoot()
+        state._selected_folders = {str(library)}
+        results["scan_thread"] = stats(_time_repeat(
+            lambda: preview._scan_thread(str(library)), repeat))
+
+    if "apply_filter" in stages:
+        manifest = {str(library / e["path"]): e for e in synth.load_manifest(library)}
+        rows = []
+        for f in files:
+            e = manifest.get(str(f), {})
+            rows.append((f.name, f.name, "", str(e.get("bpm", "???")), e.get("note", "???"),
+                         str(f), e.get("seconds")))
+        rows *= max(1, 2000 // max(1, len(rows)))     # filter cost only shows at scale
+        results["apply_filter"] = stats(_time_each(
+            lambda q: preview._filter_rows(rows, q), _FILTER_QUERIES * repeat))
+        results["apply_filter"]["rows"] = len(rows)
+
+    if "detect_bpm" in stages:
+        results["detect_bpm"] = stats(_time_each(
+            lambda f: bpm_module.detect_bpm(f, force=True), files))
+        bpm_module.get_log_messages()
+
+    if "detect_key" in stages:
+        results["detect_key"] = stats(_time_each(
+            lambda f: key_module.detect_key(f, force=True), files))
+        key_module.get_log_messages()
+
+    if "convert_file" in stages and check_ffmpeg():
+        out = work / "converted"
+        results["convert_file"] = stats(_time_each(
+            lambda f: convert_file(f, out / (f.stem + ".wav"), "wav", 44100, 16), files))
+
+    if "run_worker" in stages:
+        dest = work / "run_dest"
+        dest.mkdir(parents=True, exist_ok=True)
+        state.root = _DiscardRoot()
+        config = engine.RunConfig(
+            source=library, dest=dest, folders=(str(library),),
+            dry_run=False, no_rename=False, struct_mode="mirror",
+            bpm_enabled=True, bpm_append=True, bpm_fresh=True,
+            key_enabled=True, key_append=True, key_fresh=True,
+            workers=workers)
+        results["run_worker"] = stats(_time_repeat(
+            lambda: operations._run_worker(config), 1))
+        results["run_worker"]["files"] = len(files)
+
+    return results
+
+
+STAGES = ("scan", "get_duration", "scan_thread", "apply_filter",
+          "detect_bpm", "detect_key", "convert_file", "run_worker")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench",
+                                     description="Time SAMPSON pipeline stages.")
+    parser.add_argument("--library", help="reuse an existing synthetic library")
+    parser.add_argument("--folders", type=int, default=4)
+    parser.add_argument("--files", type=int, default=10, help="files per folder")
+    parser.add_argument("--seconds", type=float, default=4.0, help="length of each file")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--formats", default=",".join(synth.FORMATS))
+    parser.add_argument("--stages", default=",".join(STAGES))
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="repetitions for whole-library stages")
+    parser.add_argument("--workers", type=int, default=1, help="workers for run_worker")
+    add_baseline_args(parser, "median ratio above which a stage counts as regressed")
+    args = parser.parse_args(argv)
+
+    stages = set(args.stages.split(","))
+    with tempfile.TemporaryDirectory(prefix="sampson-bench-") as tmp:
+        work = Path(tmp)
+        os.environ["HOME"] = str(work / "home")          # isolate ~/.sampson caches
+        os.environ["USERPROFILE"] = str(work / "home")
+        sys.path.insert(0, str(ROOT))
+
+        from conversion import _find_ffmpeg_path
+        params = {"folders": args.folders, "files_per_folder": args.files,
+                  "seconds": args.seconds, "seed": args.seed,
+                  "formats": args.formats.split(",")}
+        if args.library:
+            library = Path(args.library).resolve()
+        else:
+            library = work / "library"
+            t0 = time.perf_counter()
+            synth.generate_library(library, args.folders, args.files, args.seconds,
+                                   args.seed, tuple(params["formats"]),
+                                   ffmpeg=_find_ffmpeg_path())
+            print(f"Generated library in {time.perf_counter() - t0:.1f}s", file=sys.stderr)
+
+        results = run_benchmarks(library, work, stages, args.repeat, args.workers)
+
+    report = {
+        "meta": meta(library=params if not args.library else {"path": args.library}),
+        "results": results,
+    }
+    write_report(report, args, "bench")
+    baseline = load_baseline(args)
+    if baseline is not None:
+        if compare_medians(report, baseline, args.threshold, "stage"):
+            return 1
+    else:
+        print_medians(results)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
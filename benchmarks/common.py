@@ -0,0 +1,98 @@
+"""Helpers shared by the benchmark scripts: timing summaries, report
+metadata, result files and the --baseline / --save-baseline / --threshold
+handling."""
+
+import json
+import platform
+import statistics
+import subprocess
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+def stats(samples: list) -> dict:
+    """Summarise a list of durations in seconds."""
+    ordered = sorted(samples)
+    n = len(ordered)
+    return {
+        "n": n,
+        "total_s": round(sum(ordered), 6),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+        "median_ms": round(statistics.median(ordered) * 1000, 3),
+        "p95_ms": round(ordered[min(n - 1, int(n * 0.95))] * 1000, 3),
+        "min_ms": round(ordered[0] * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+def git_revision() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                             capture_output=True, text=True, timeout=5)
+        return out.stdout.strip() or "unknown"
+    except (OSError, subprocess.SubprocessError):
+        return "unknown"
+
+
+def meta(**extra) -> dict:
+    """The "meta" block every report starts with."""
+    return {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            **extra}
+
+
+def add_baseline_args(parser, threshold_help: str):
+    """Add --out, --baseline, --save-baseline and --threshold to `parser`."""
+    parser.add_argument("--out", help="result JSON path (default benchmarks/results/)")
+    parser.add_argument("--baseline", help="baseline JSON to compare against")
+    parser.add_argument("--save-baseline", metavar="PATH",
+                        help="also write the results as a new baseline")
+    parser.add_argument("--threshold", type=float, default=1.25, help=threshold_help)
+
+
+def write_report(report: dict, args, prefix: str) -> Path:
+    """Write `report` to --out (or a timestamped file under results/) and,
+    with --save-baseline, to the baseline path as well."""
+    text = json.dumps(report, indent=2)
+    out = Path(args.out) if args.out else RESULTS_DIR / f"{prefix}-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(text, encoding="utf-8")
+    print(f"Results written to {out}")
+    if args.save_baseline:
+        Path(args.save_baseline).write_text(text, encoding="utf-8")
+    return out
+
+
+def load_baseline(args):
+    """The --baseline report, or None when none was given."""
+    if not args.baseline:
+        return None
+    return json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+
+
+def compare_medians(current: dict, baseline: dict, threshold: float, label: str) -> list:
+    """Print a row-by-row comparison of the "results" medians; return the
+    names whose median grew by more than `threshold` ×."""
+    regressed = []
+    print(f"{label:<16}{'baseline ms':>14}{'current ms':>14}{'ratio':>9}")
+    for name, cur in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if not base or not base.get("median_ms"):
+            print(f"{name:<16}{'—':>14}{cur['median_ms']:>14.3f}{'':>9}")
+            continue
+        ratio = cur["median_ms"] / base["median_ms"]
+        flag = "  REGRESSED" if ratio > threshold else ""
+        print(f"{name:<16}{base['median_ms']:>14.3f}{cur['median_ms']:>14.3f}{ratio:>9.2f}{flag}")
+        if flag:
+            regressed.append(name)
+    return regressed
+
+
+def print_medians(results: dict):
+    for name, st in results.items():
+        print(f"{name:<16} median {st['median_ms']:>10.3f} ms   n={st['n']}")
@@ -0,0 +1,188 @@
+"""Accuracy-plus-speed regression corpus for the BPM and key detectors.
+
+    python -m benchmarks.detectors [--seconds 8] [--baseline PATH]
+
+Run from the repository root.  Renders click tracks at known tempos and
+tone stacks at known pitches in memory, feeds them through the same
+preprocessing as detect_bpm()/detect_key(), and runs every backend listed
+in bpm.BACKENDS and key.BACKENDS.  For each backend it reports files/sec
+next to accuracy:
+
+    BPM — exact (within ±2 %), octave errors (×2 / ×½), other metrical
+          errors (×3/2 / ×2/3), wrong, and no result
+    key — exact, signed semitone error histogram, and no result
+
+With --baseline the exit status is 1 if any backend lost accuracy or got
+slower than --threshold × its baseline time per file.
+"""
+
+import argparse
+import sys
+import time
+
+from benchmarks import synth
+from benchmarks.common import add_baseline_args, load_baseline, meta, write_report
+
+_TOLERANCE = 0.02
+
+
+def _audio_segment(pcm: bytes, sample_rate: int):
+    from pydub import AudioSegment
+    return AudioSegment(data=pcm, sample_width=2, frame_rate=sample_rate, channels=1)
+
+
+def bpm_corpus(seconds: float, step: int, sample_rate: int) -> list:
+    """[(truth_bpm, pcm)] — click tracks across 60–200 BPM."""
+    return [(t, synth.render_clicks(t, seconds, sample_rate, seed=t))
+            for t in range(60, 201, step)]
+
+
+def key_corpus(seconds: float, octaves, sample_rate: int) -> list:
+    """[(truth_note, octave, pcm)] — tone stacks for every pitch class."""
+    return [(n, o, synth.render_tone_stack(n, seconds, o, sample_rate))
+            for o in octaves for n in synth.NOTE_NAMES]
+
+
+def classify_bpm(detected, truth: float) -> str:
+    if detected is None:
+        return "none"
+    for label, factor in (("exact", 1.0), ("octave", 2.0), ("octave", 0.5),
+                          ("metrical", 1.5), ("metrical", 2 / 3)):
+        if abs(detected - truth * factor) <= truth * factor * _TOLERANCE:
+            return label
+    return "wrong"
+
+
+def semitone_error(detected, truth: str):
+    """Signed distance in semitones, folded into -5..+6; None when undetected."""
+    if detected is None:
+        return None
+    d = (synth.NOTE_NAMES.index(detected) - synth.NOTE_NAMES.index(truth)) % 12
+    return d - 12 if d > 6 else d
+
+
+def run_bpm(corpus, sample_rate: int) -> dict:
+    import bpm as bpm_module
+    results = {}
+    for name, detector in bpm_module.BACKENDS.items():
+        counts = {"exact": 0, "octave": 0, "metrical": 0, "wrong": 0, "none": 0}
+        misses = []
+        elapsed = 0.0
+        for truth, pcm in corpus:
+            audio = bpm_module._prepare_audio(_audio_segment(pcm, sample_rate))
+            t0 = time.perf_counter()
+            detected = detector(audio).value
+            elapsed += time.perf_counter() - t0
+            label = classify_bpm(detected, truth)
+            counts[label] += 1
+            if label != "exact":
+                misses.append({"truth": truth, "detected": detected, "class": label})
+        n = len(corpus)
+        results[name] = {
+            "files": n,
+            "files_per_sec": round(n / elapsed, 2) if elapsed else None,
+            "ms_per_file": round(elapsed / n * 1000, 3) if n else None,
+            "accuracy": round(counts["exact"] / n, 4) if n else None,
+            "counts": counts,
+            "misses": misses,
+        }
+    return results
+
+
+def run_key(corpus, sample_rate: int) -> dict:
+    import key as key_module
+    results = {}
+    for name, detector in key_module.BACKENDS.items():
+        errors = {}
+        exact = none = 0
+        misses = []
+        elapsed = 0.0
+        for truth, octave, pcm in corpus:
+            audio = key_module._prepare_audio(_audio_segment(pcm, sample_rate))
+            t0 = time.perf_counter()
+            detected = detector(audio).value
+            elapsed += time.perf_counter() - t0
+            err = semitone_error(detected, truth)
+            if err is None:
+                none += 1
+            elif err == 0:
+                exact += 1
+            else:
+                errors[str(err)] = errors.get(str(err), 0) + 1
+            if err != 0:
+                misses.append({"truth": truth, "octave": octave, "detected": detected})
+        n = len(corpus)
+        results[name] = {
+            "files": n,
+            "files_per_sec": round(n / elapsed, 2) if elapsed else None,
+            "ms_per_file": round(elapsed / n * 1000, 3) if n else None,
+            "accuracy": round(exact / n, 4) if n else None,
+            "counts": {"exact": exact, "none": none},
+            "semitone_errors": dict(sorted(errors.items(), key=lambda kv: int(kv[0]))),
+            "misses": misses,
+        }
+    return results
+
+
+def _print_report(report: dict):
+    for kind in ("bpm", "key"):
+        for name, r in report[kind].items():
+            print(f"{kind:<4} {name:<10} {r['files_per_sec']:>9} files/s   "
+                  f"accuracy {r['accuracy']:.1%}   {r['counts']}")
+            if kind == "key" and r["semitone_errors"]:
+                print(f"{'':<16}semitone errors {r['semitone_errors']}")
+
+
+def compare(report: dict, baseline: dict, threshold: float) -> list:
+    """Return human-readable regressions of `report` against `baseline`."""
+    problems = []
+    for kind in ("bpm", "key"):
+        for name, cur in report[kind].items():
+            base = baseline.get(kind, {}).get(name)
+            if not base:
+                continue
+            if cur["accuracy"] < base["accuracy"]:
+                problems.append(f"{kind}/{name}: accuracy {base['accuracy']:.1%} → {cur['accuracy']:.1%}")
+            if base["ms_per_file"] and cur["ms_per_file"] > base["ms_per_file"] * threshold:
+                problems.append(f"{kind}/{name}: {base['ms_per_file']} → {cur['ms_per_file']} ms/file")
+    return problems
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.detectors",
+                                     description="Detector accuracy and speed corpus.")
+    parser.add_argument("--seconds", type=float, default=8.0, help="length of each render")
+    parser.add_argument("--bpm-step", type=int, default=5, help="tempo spacing in BPM")
+    parser.add_argument("--octaves", default="2,3,4", help="octaves for the key corpus")
+    parser.add_argument("--sample-rate", type=int, default=22050)
+    parser.add_argument("--only", choices=("bpm", "key"), help="run one detector family")
+    add_baseline_args(parser, "ms/file ratio above which a backend counts as slower")
+    args = parser.parse_args(argv)
+
+    report = {
+        "meta": meta(seconds=args.seconds, sample_rate=args.sample_rate),
+        "bpm": {}, "key": {},
+    }
+    if args.only in (None, "bpm"):
+        report["bpm"] = run_bpm(bpm_corpus(args.seconds, args.bpm_step, args.sample_rate),
+                                args.sample_rate)
+    if args.only in (None, "key"):
+        octaves = [int(o) for o in args.octaves.split(",")]
+        report["key"] = run_key(key_corpus(args.seconds, octaves, args.sample_rate),
+                                args.sample_rate)
+
+    _print_report(report)
+    write_report(report, args, "detectors")
+
+    baseline = load_baseline(args)
+    if baseline is not None:
+        problems = compare(report, baseline, args.threshold)
+        for p in problems:
+            print(f"REGRESSED  {p}")
+        if problems:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
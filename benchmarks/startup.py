@@ -0,0 +1,139 @@
+"""Startup timing report: cold import cost and time to first paint.
+
+    python -m benchmarks.startup [--repeat 5] [--baseline PATH]
+
+Run from the repository root.  Every sample is a fresh interpreter, so
+nothing is shared between runs:
+
+    import_builders — `import builders` (everything the GUI pulls in before
+                      the window is created)
+    imports         — main.py's own import phase  ┐ only when a display is
+    first_paint     — main.py until the first     ┘ available; the app is
+                      frame has been drawn          closed right after
+
+The report also carries an `-X importtime` breakdown of `import builders`
+(the slowest modules by self and cumulative time) so a regression can be
+traced to the import that caused it.
+
+Results are JSON under benchmarks/results/; with --baseline each metric's
+median is compared and the exit status is 1 if any regressed by more than
+--threshold.  --budget MS additionally fails the run when the median
+`import builders` time exceeds that budget.  Save a baseline before a
+startup change and compare after it.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from benchmarks.common import (ROOT, add_baseline_args, compare_medians, load_baseline,
+                               meta, print_medians, stats, write_report)
+
+_IMPORT_PROBE = ("import time; t = time.perf_counter(); import builders; "
+                 "print(time.perf_counter() - t)")
+
+
+def _has_display() -> bool:
+    if sys.platform.startswith("linux"):
+        return bool(os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"))
+    return True
+
+
+def _import_sample(env) -> float:
+    out = subprocess.run([sys.executable, "-c", _IMPORT_PROBE], cwd=ROOT, env=env,
+                         capture_output=True, text=True, timeout=120, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def importtime_report(env, top: int) -> dict:
+    """Run `python -X importtime -c "import builders"`; return the slowest modules."""
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", "import builders"],
+                         cwd=ROOT, env=env, capture_output=True, text=True,
+                         timeout=120, check=True)
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cum_us, name = line[len("import time:"):].split("|")
+        rows.append({"module": name.strip(), "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+                     "self_ms": int(self_us) / 1000, "cumulative_ms": int(cum_us) / 1000})
+    # Children are printed before their parent: keep only the subtree of
+    # `builders`, i.e. the rows after the previous top-level import.
+    end = max(i for i, r in enumerate(rows) if r["module"] == "builders" and r["depth"] == 0)
+    start = max([i + 1 for i, r in enumerate(rows[:end]) if r["depth"] == 0] or [0])
+    rows = rows[start:end + 1]
+    by_self = sorted(rows, key=lambda r: r["self_ms"], reverse=True)[:top]
+    # Cumulative time is only additive for direct imports of builders.
+    direct = [r for r in rows if r["depth"] == 1]
+    by_cum = sorted(direct, key=lambda r: r["cumulative_ms"], reverse=True)[:top]
+    return {"modules": len(rows), "by_self": by_self, "by_cumulative": by_cum}
+
+
+def _launch_sample(env, tmp: Path) -> dict:
+    """Start main.py, let it paint once and exit; return {metric: seconds}."""
+    report = tmp / "startup.json"
+    env = dict(env, SAMPSON_STARTUP_REPORT=str(report))
+    subprocess.run([sys.executable, "main.py"], cwd=ROOT, env=env,
+                   capture_output=True, timeout=120, check=True)
+    stages = json.loads(report.read_text(encoding="utf-8"))["stages"]
+    return {name.split(".", 1)[1]: st["total_ms"] / 1000
+            for name, st in stages.items() if name.startswith("startup.")}
+
+
+def run_startup(repeat: int) -> dict:
+    env = dict(os.environ)
+    samples = {"import_builders": []}
+    for _ in range(repeat):
+        samples["import_builders"].append(_import_sample(env))
+
+    if _has_display():
+        with tempfile.TemporaryDirectory(prefix="sampson-startup-") as tmp:
+            for _ in range(repeat):
+                for name, sec in _launch_sample(env, Path(tmp)).items():
+                    samples.setdefault(name, []).append(sec)
+    else:
+        print("No display — skipping the first-paint measurement.", file=sys.stderr)
+
+    return {name: stats(vals) for name, vals in samples.items() if vals}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.startup",
+                                     description="Time SAMPSON cold start.")
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters per metric")
+    add_baseline_args(parser, "median ratio above which a metric counts as regressed")
+    parser.add_argument("--budget", type=float, metavar="MS",
+                        help="fail if the median `import builders` time exceeds this")
+    parser.add_argument("--top", type=int, default=15, help="modules listed in the import report")
+    args = parser.parse_args(argv)
+
+    report = {
+        "meta": meta(),
+        "results": run_startup(max(1, args.repeat)),
+        "importtime": importtime_report(dict(os.environ), args.top),
+    }
+    print(f"Slowest imports under `import builders` ({report['importtime']['modules']} modules):")
+    for r in report["importtime"]["by_cumulative"]:
+        print(f"  {r['module']:<28}{r['cumulative_ms']:>10.1f} ms cumulative")
+    write_report(report, args, "startup")
+
+    failed = False
+    baseline = load_baseline(args)
+    if baseline is not None:
+        failed = bool(compare_medians(report, baseline, args.threshold, "metric"))
+    else:
+        print_medians(report["results"])
+    if args.budget is not None:
+        median = report["results"]["import_builders"]["median_ms"]
+        if median > args.budget:
+            print(f"OVER BUDGET  import_builders {median:.1f} ms > {args.budget:.1f} ms")
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
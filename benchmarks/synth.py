@@ -0,0 +1,176 @@
+"""Reproducible synthetic sample libraries for benchmarks.
+
+Every file is a loop at a known tempo built on a known root note: a
+sustained tone at the note's pitch with a decaying accent on each beat.
+The same seed always produces the same library, and a manifest.json in the
+library root records the ground truth (relative path, bpm, note, format).
+
+WAV and AIFF are written with the stdlib; FLAC and MP3 are encoded with
+ffmpeg when it is available and fall back to WAV otherwise (the manifest
+records the format actually written).
+"""
+
+import array
+import json
+import math
+import random
+import struct
+import subprocess
+import sys
+import wave
+from pathlib import Path
+
+NOTE_NAMES = ["C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B"]
+FORMATS = ("wav", "aiff", "flac", "mp3")
+
+_C3 = 130.81   # Hz — octave 3 sits in the middle of key.py's search range
+
+
+def note_frequency(note: str, octave: int = 3) -> float:
+    return _C3 * 2 ** (NOTE_NAMES.index(note) / 12 + (octave - 3))
+
+
+def render_loop(bpm: float, note: str, seconds: float,
+                sample_rate: int = 44100, tone_level: float = 0.25,
+                accent_level: float = 0.6, seed: int = 0) -> bytes:
+    """Return mono 16-bit little-endian PCM for a loop at `bpm` rooted on `note`.
+
+    One beat is rendered sample by sample and then tiled, so rendering cost
+    is proportional to the beat length rather than the file length.
+    """
+    rng = random.Random(seed)
+    freq = note_frequency(note)
+    beat_len = max(1, int(round(sample_rate * 60.0 / bpm)))
+    accent_len = min(beat_len, int(sample_rate * 0.12))
+    click_len = min(accent_len, int(sample_rate * 0.004))
+    w = 2 * math.pi * freq / sample_rate
+    beat = array.array("h", bytes(2 * beat_len))
+    for i in range(beat_len):
+        s = tone_level * math.sin(w * i)
+        if i < accent_len:
+            env = math.exp(-6.0 * i / accent_len)
+            s += accent_level * env * math.sin(2 * w * i)
+            if i < click_len:
+                s += 0.3 * (rng.random() * 2 - 1)
+        beat[i] = max(-32767, min(32767, int(s * 32767)))
+    if sys.byteorder == "big":
+        beat.byteswap()
+    total = int(seconds * sample_rate)
+    beats = -(-total // beat_len)
+    return (beat.tobytes() * beats)[:total * 2]
+
+
+def _to_pcm16(samples) -> bytes:
+    out = array.array("h", (max(-32767, min(32767, int(s * 32767))) for s in samples))
+    if sys.byteorder == "big":
+        out.byteswap()
+    return out.tobytes()
+
+
+def render_clicks(bpm: float, seconds: float, sample_rate: int = 22050,
+                  seed: int = 0) -> bytes:
+    """Return mono 16-bit PCM of a bare click track (noise bursts, no pitch)."""
+    rng = random.Random(seed)
+    beat_len = max(1, int(round(sample_rate * 60.0 / bpm)))
+    click_len = min(beat_len, int(sample_rate * 0.02))
+    beat = [0.0] * beat_len
+    for i in range(click_len):
+        beat[i] = 0.8 * math.exp(-8.0 * i / click_len) * (rng.random() * 2 - 1)
+    total = int(seconds * sample_rate)
+    beat_pcm = _to_pcm16(beat)
+    return (beat_pcm * (-(-total // beat_len)))[:total * 2]
+
+
+def render_tone_stack(note: str, seconds: float, octave: int = 3,
+                      sample_rate: int = 22050) -> bytes:
+    """Return mono 16-bit PCM of a sustained root + fifth + octave stack on `note`."""
+    f0 = note_frequency(note, octave)
+    partials = ((f0, 0.45), (f0 * 1.5, 0.2), (f0 * 2, 0.2), (f0 * 3, 0.1))
+    ws = [(2 * math.pi * f / sample_rate, a) for f, a in partials]
+    total = int(seconds * sample_rate)
+    return _to_pcm16(sum(a * math.sin(w * i) for w, a in ws) for i in range(total))
+
+
+def _write_wav(path: Path, pcm: bytes, sample_rate: int):
+    with wave.open(str(path), "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes(pcm)
+
+
+def _ieee_extended(value: float) -> bytes:
+    """Encode a positive number as an 80-bit IEEE 754 extended float (AIFF COMM rate)."""
+    mantissa, exponent = math.frexp(value)
+    return struct.pack(">HQ", exponent + 16382, int(mantissa * (1 << 64)))
+
+
+def _write_aiff(path: Path, pcm: bytes, sample_rate: int):
+    samples = array.array("h", pcm)
+    if sys.byteorder == "little":
+        samples.byteswap()           # AIFF PCM is big-endian
+    data = samples.tobytes()
+    comm = struct.pack(">hLh", 1, len(data) // 2, 16) + _ieee_extended(sample_rate)
+    ssnd = struct.pack(">LL", 0, 0) + data
+    body = (b"AIFF"
+            + b"COMM" + struct.pack(">L", len(comm)) + comm
+            + b"SSND" + struct.pack(">L", len(ssnd)) + ssnd)
+    path.write_bytes(b"FORM" + struct.pack(">L", len(body)) + body)
+
+
+def _encode_with_ffmpeg(ffmpeg: str, wav_path: Path, out_path: Path) -> bool:
+    try:
+        result = subprocess.run([ffmpeg, "-y", "-loglevel", "error",
+                                 "-i", str(wav_path), str(out_path)],
+                                capture_output=True, timeout=60)
+    except (OSError, subprocess.SubprocessError):
+        return False
+    return result.returncode == 0 and out_path.is_file()
+
+
+def generate_library(root, folders: int = 4, files_per_folder: int = 10,
+                     seconds: float = 4.0, seed: int = 1,
+                     formats=FORMATS, sample_rate: int = 44100,
+                     ffmpeg: str = None) -> list:
+    """Write a synthetic library under `root` and return its manifest entries.
+
+    Each entry is {"path", "bpm", "note", "format", "seconds"} with `path`
+    relative to `root`.  BPMs are whole numbers in 70–180 so the tempo is
+    unambiguous inside bpm.py's preferred range.
+    """
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+    manifest = []
+    for d in range(folders):
+        folder = root / f"Pack{d:02d}" / ("Loops" if d % 2 else "Hits")
+        folder.mkdir(parents=True, exist_ok=True)
+        for n in range(files_per_folder):
+            bpm = rng.randint(70, 180)
+            note = rng.choice(NOTE_NAMES)
+            fmt = formats[(d * files_per_folder + n) % len(formats)]
+            stem = f"loop_{d:02d}_{n:03d}"
+            pcm = render_loop(bpm, note, seconds, sample_rate, seed=rng.randint(0, 1 << 30))
+
+            if fmt == "aiff":
+                path = folder / f"{stem}.aif"
+                _write_aiff(path, pcm, sample_rate)
+            else:
+                wav_path = folder / f"{stem}.wav"
+                _write_wav(wav_path, pcm, sample_rate)
+                path = wav_path
+                if fmt in ("flac", "mp3"):
+                    encoded = folder / f"{stem}.{fmt}"
+                    if ffmpeg and _encode_with_ffmpeg(ffmpeg, wav_path, encoded):
+                        wav_path.unlink()
+                        path = encoded
+                    else:
+                        fmt = "wav"
+            manifest.append({"path": str(path.relative_to(root)), "bpm": bpm,
+                             "note": note, "format": fmt, "seconds": seconds})
+    (root / "manifest.json").write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    return manifest
+
+
+def load_manifest(root) -> list:
+    return json.loads((Path(root) / "manifest.json").read_text(encoding="utf-8"))
@@ -5,121 +5,125 @@ Uses energy envelope autocorrelation with harmonic analysis.
 Optimized for drum breaks and rhythmic material.
 """
 
-import json
+import importlib.util
 import math
-import os
-import statistics
+import threading
+from contextlib import contextmanager
 from pathlib import Path
 from typing import Optional, List, Tuple
 
-from conversion import _find_ffmpeg_path
+import constants
+import pcm
+import profiling
+from analysis_cache import AnalysisCache
 
 # ── Cache ─────────────────────────────────────────────────────────────────────
-_CACHE_DIR  = Path.home() / ".sampson"
-_CACHE_FILE = _CACHE_DIR / "bpm_cache.json"
-_cache: dict = {}
-_cache_dirty = False
-_cache_loaded = False
 _log_messages: list = []
 
 
+_quiet = threading.local()      # per-thread: drop this thread's messages
+
+
 def _log(msg):
-    _log_messages.append(msg)
+    if not getattr(_quiet, "on", False):
+        _log_messages.append(msg)
 
 
 def get_log_messages():
     global _log_messages
     msgs = _log_messages.copy()
-    _log_messages.clear()
+    del _log_messages[:len(msgs)]
     return msgs
 
 
-def _load_cache():
-    global _cache, _cache_loaded
-    if _cache_loaded:
-        return
-    _cache_loaded = True
+@contextmanager
+def quiet_log():
+    """Drop the calling thread's log messages inside the block.
+
+    For background analysis, which must neither add to nor drain the
+    buffer a Run is reading.
+    """
+    _quiet.on = True
     try:
-        if _CACHE_FILE.exists():
-            _cache = json.loads(_CACHE_FILE.read_text(encoding="utf-8"))
-            _log(f"[BPM] Loaded cache: {len(_cache)} entries")
-    except Exception:
-        _cache = {}
+        yield
+    finally:
+        _quiet.on = False
 
 
-def _entry_valid(path):
-    key = str(path)
-    if key not in _cache:
-        return False
-    try:
-        return _cache[key]["mtime"] == path.stat().st_mtime
-    except Exception:
-        return False
+# Detector versions, stored with every analysed result.  Bump one when its
+# results change: only that detector's cached results are re-analysed.
+VERSIONS = {"autocorr": 1, "onset": 1}
 
+_cache = AnalysisCache("bpm_cache.json", "bpm", "[BPM]", _log,
+                       versions=VERSIONS, legacy_algorithm="autocorr/1")
+
+
+def _load_cache():
+    _cache.load()
 
-def _store(path, bpm_val):
-    global _cache_dirty
-    try:
-        _cache[str(path)] = {"mtime": path.stat().st_mtime, "bpm": float(bpm_val)}
-        _cache_dirty = True
-    except Exception:
-        pass
 
+def store_bpm(path: Path, bpm_val: float, source: str = "analysis",
+              estimate: Optional[pcm.Estimate] = None, backend: Optional[str] = None) -> bool:
+    """Cache a BPM result for `path` (False if the file is unreadable).
 
-def _get_pydub():
-    from pydub import AudioSegment
-    ffmpeg_path = _find_ffmpeg_path()
-    if ffmpeg_path:
-        AudioSegment.converter = ffmpeg_path
-        ffmpeg_dir = os.path.dirname(ffmpeg_path)
-        current_path = os.environ.get('PATH', '')
-        if ffmpeg_dir not in current_path:
-            os.environ['PATH'] = ffmpeg_dir + os.pathsep + current_path
-    return AudioSegment
+    An analysed result also records the detector `estimate`'s confidence and
+    candidates, and which `backend` version produced it.
+    """
+    if estimate is None:
+        return _cache.put(path, float(bpm_val), source)
+    return _cache.put(path, float(bpm_val), source, estimate.confidence,
+                      _cache.algorithm(backend or DEFAULT_BACKEND), estimate.candidates)
 
 
 # ── Detection Algorithm ───────────────────────────────────────────────────────
 
-def _calculate_energy_envelope(samples, sample_rate, hop_ms=10):
-    """Calculate RMS energy envelope."""
-    hop = int(hop_ms * sample_rate / 1000)
-    envelope = []
-    for i in range(0, len(samples) - hop, hop):
-        frame = samples[i:i+hop]
-        rms = math.sqrt(sum(s * s for s in frame) / len(frame))
-        envelope.append(rms)
-    return envelope
-
-
-def _autocorrelation(signal, max_lag):
-    """Calculate autocorrelation."""
-    n = len(signal)
-    if n == 0:
-        return []
-    
-    result = []
-    for lag in range(max_lag + 1):
-        if lag >= n:
-            result.append(0.0)
-            continue
-        corr = sum(signal[i] * signal[i + lag] for i in range(n - lag))
-        result.append(corr)
-    
-    # Normalize
-    if result[0] > 0:
-        result = [r / result[0] for r in result]
-    
-    return result
+def _prepare_audio(audio) -> pcm.Pcm:
+    """First 60 s of `audio` as mono PCM — the detector's input."""
+    return pcm.from_segment(audio, 60000)
 
 
-def _find_local_maxima(signal, min_distance=5):
-    """Find local maxima."""
-    peaks = []
-    for i in range(1, len(signal) - 1):
-        if signal[i] > signal[i-1] and signal[i] > signal[i+1]:
-            if not peaks or i - peaks[-1][0] >= min_distance:
-                peaks.append((i, signal[i]))
-    return peaks
+def _calculate_energy_envelope(audio, hop_ms=10):
+    """RMS energy envelope of mono PCM `audio`, one value per `hop_ms`."""
+    hop = int(hop_ms * audio.rate / 1000)
+    return pcm.rms_envelope(audio.data, audio.width, hop)
+
+
+def _group_octaves(candidates, tolerance=0.05):
+    """Cluster candidates whose tempos agree within `tolerance`, up to octaves.
+
+    Each tempo is folded to its position within an octave (log2 mod 1);
+    after sorting on that, equivalent tempos are neighbours, so one linear
+    sweep replaces comparing every candidate against every group.
+    """
+    width = math.log2(1 + tolerance)
+    folded = sorted(((math.log2(c[0]) % 1.0, c) for c in candidates), key=lambda fc: fc[0])
+    groups = []
+    start = None
+    for pos, cand in folded:
+        if groups and pos - start < width:
+            groups[-1].append(cand)
+        else:
+            groups.append([cand])
+            start = pos
+    # The octave wraps around: merge the last cluster into the first if they touch.
+    if len(groups) > 1 and folded[0][0] + 1.0 - start < width:
+        groups[0].extend(groups.pop())
+    return groups
+
+
+def _same_tempo(a, b, tolerance=0.02):
+    return abs(a - b) <= tolerance * b
+
+
+def _distinct_tempos(ranked, limit=constants.ANALYSIS_CANDIDATES) -> tuple:
+    """The first `limit` of [(bpm, score)] (best first), skipping near-duplicates."""
+    kept = []
+    for bpm, score in ranked:
+        if not any(_same_tempo(bpm, k) for k, _ in kept):
+            kept.append((round(bpm, 1), score))
+            if len(kept) == limit:
+                break
+    return tuple(kept)
 
 
 def _lag_to_bpm(lag, hop_ms):
@@ -128,40 +132,39 @@ def _lag_to_bpm(lag, hop_ms):
     return 60000.0 / (lag * hop_ms)
 
 
-def _detect_bpm_algorithm(audio) -> Optional[float]:
-    """Detect BPM using energy envelope autocorrelation."""
-    samples = audio.get_array_of_samples()
-    sample_rate = audio.frame_rate
+def _detect_bpm_algorithm(audio) -> pcm.Estimate:
+    """Detect BPM using energy envelope autocorrelation.
+
+    The confidence is the winning octave group's share of the total
+    candidate score, times the strongest autocorrelation peak; candidates
+    are scored by their autocorrelation strength.
+    """
+    sample_rate = audio.rate
     hop_ms = 10
     
-    if len(samples) < sample_rate:
-        return None
+    if audio.frame_count() < sample_rate:
+        return pcm.Estimate()
     
-    envelope = _calculate_energy_envelope(samples, sample_rate, hop_ms)
+    envelope = _calculate_energy_envelope(audio, hop_ms)
     
     if len(envelope) < 100:
-        return None
-    
-    # Calculate autocorrelation
-    max_lag = min(int(2000 / hop_ms), len(envelope) // 2)
-    acorr = _autocorrelation(envelope, max_lag)
+        return pcm.Estimate()
     
-    # Find peaks in valid tempo range (60-200 BPM)
-    min_lag = int(60000 / 200 / hop_ms)  # 30 frames
-    max_lag_range = int(60000 / 60 / hop_ms)  # 100 frames
-    
-    min_lag = max(min_lag, 5)
-    max_lag_range = min(max_lag_range, len(acorr) - 1)
+    # Tempo range 60-200 BPM → lags of 30-100 frames; only those are computed.
+    min_lag = max(int(60000 / 200 / hop_ms), 5)
+    max_lag_range = min(int(60000 / 60 / hop_ms), int(2000 / hop_ms), len(envelope) // 2)
     
     if max_lag_range <= min_lag:
-        return None
+        return pcm.Estimate()
+    
+    acorr = pcm.autocorrelation(envelope, max_lag_range, min_lag)
     
     # Find peaks
-    peaks = _find_local_maxima(acorr[min_lag:max_lag_range+1], min_distance=3)
-    peaks = [(lag + min_lag, acorr[lag + min_lag]) for lag, _ in peaks]
+    peaks = pcm.local_maxima(acorr[min_lag:max_lag_range+1], min_distance=3)
+    peaks = [(lag + min_lag, strength) for lag, strength in peaks]
     
     if not peaks:
-        return None
+        return pcm.Estimate()
     
     # Generate candidates with octave variants
     candidates = []
@@ -181,20 +184,9 @@ def _detect_bpm_algorithm(audio) -> Optional[float]:
             candidates.append((bpm * 2, strength * 0.75, 'double'))
     
     if not candidates:
-        return None
+        return pcm.Estimate()
     
-    # Group by similar tempo (within 5%)
-    groups = []
-    for bpm, strength, source in candidates:
-        found = False
-        for group in groups:
-            ref_bpm = group[0][0]
-            if abs(bpm - ref_bpm) / ref_bpm < 0.05 or abs(bpm*2 - ref_bpm) / ref_bpm < 0.05 or abs(bpm/2 - ref_bpm) / ref_bpm < 0.05:
-                group.append((bpm, strength, source))
-                found = True
-                break
-        if not found:
-            groups.append([(bpm, strength, source)])
+    groups = _group_octaves(candidates)
     
     # Score groups
     group_scores = []
@@ -219,59 +211,121 @@ def _detect_bpm_algorithm(audio) -> Optional[float]:
     
     best_bpm = group_scores[0][0]
     best_bpm = max(60.0, min(200.0, best_bpm))
+    # The winning group's share of the evidence, scaled by how periodic the
+    # envelope is at all (the strongest normalised autocorrelation peak).
+    share = group_scores[0][1] / sum(score for _, score in group_scores)
+    confidence = share * max(strength for _, strength in peaks)
+    best_strength = max(s for b, s, _ in candidates if _same_tempo(b, best_bpm))
+    ranked = [(best_bpm, best_strength)] + sorted(
+        ((b, s) for b, s, _ in candidates), key=lambda c: c[1], reverse=True)
     
-    return round(best_bpm, 1)
+    return pcm.Estimate(round(best_bpm, 1), confidence, _distinct_tempos(ranked))
+
+
+def _detect_bpm_onset(audio) -> pcm.Estimate:
+    """Detect BPM from spectral-flux onsets with comb-filter scoring (onset.py)."""
+    import onset   # deferred: NumPy is optional and slow to import
+    bpm_val, confidence, peaks = onset.detect_bpm(audio)
+    if bpm_val is None:
+        return pcm.Estimate()
+    return pcm.Estimate(bpm_val, confidence, _distinct_tempos(peaks))
+
+
+# Detector backends by name; each returns a pcm.Estimate.
+# detect_bpm() uses the default unless a Run picks another; the detector
+# corpus (benchmarks/detectors.py) runs every entry.  "onset" needs NumPy
+# and is only listed when it is installed.
+DEFAULT_BACKEND = "autocorr"
+BACKENDS = {
+    "autocorr": _detect_bpm_algorithm,
+}
+if importlib.util.find_spec("numpy") is not None:
+    BACKENDS["onset"] = _detect_bpm_onset
 
 
 # ── Public API ─────────────────────────────────────────────────────────────────
 
-def get_cached_bpm(path):
-    _load_cache()
-    if _entry_valid(path):
-        return float(_cache[str(path)]["bpm"])
-    return None
+def get_cached_bpm(path, indexed_only: bool = False):
+    cached = _cache.get(path, indexed_only)
+    return float(cached) if cached is not None else None
+
+
+def get_cached_source(path) -> Optional[str]:
+    """Where the cached BPM came from: "analysis", "tag", "manual" (None if unknown)."""
+    entry = _cache.get_entry(path)
+    return entry.get("source") if entry else None
 
 
-def detect_bpm(path, force=False):
+def get_cached_candidates(path) -> List[Tuple[float, float]]:
+    """[(bpm, score)] the detector weighed for `path`, best first ([] if none cached)."""
+    entry = _cache.get_entry(path)
+    return [(float(b), s) for b, s in entry.get("candidates", [])] if entry else []
+
+
+def tempo_variant(path, factor: float) -> Optional[float]:
+    """The cached BPM × `factor` (½, 2, …), snapped to a cached candidate near it.
+
+    Serves half/double-tempo corrections without re-analysing the file.
+    """
+    current = get_cached_bpm(path)
+    if current is None:
+        return None
+    target = current * factor
+    for bpm_val, _ in get_cached_candidates(path):
+        if _same_tempo(bpm_val, target, tolerance=0.04):
+            return bpm_val
+    return round(target, 1)
+
+
+@profiling.timed("detect_bpm")
+def detect_bpm(path, force=False, backend=DEFAULT_BACKEND):
     _load_cache()
     if not force:
         cached = get_cached_bpm(path)
+        _cache.count(cached is not None)
         if cached is not None:
             _log(f"[BPM] CACHE: {path.name} = {cached:.1f} BPM")
             return cached
+
+    # Embedded tags are authoritative — even a fresh scan doesn't re-analyse them.
+    import audiotags   # header-only read; deferred like the decoder
+    tags = audiotags.read_tags(path)
+    if tags and tags.bpm is not None:
+        _log(f"[BPM] TAG ({tags.source}): {path.name} = {tags.bpm:.1f} BPM")
+        store_bpm(path, tags.bpm, source="tag")
+        return tags.bpm
     
     _log(f"[BPM] Analyzing: {path.name}")
     
-    if not _find_ffmpeg_path():
+    from conversion import check_ffmpeg   # deferred: keeps import of this module light
+    import decoder
+    if not check_ffmpeg():
         _log(f"[BPM] ERROR: ffmpeg not found")
         return None
     
     try:
-        AudioSegment = _get_pydub()
-        
-        fmt = Path(path).suffix.lower().lstrip('.')
-        if fmt == 'aif':
-            fmt = 'aiff'
-        
         try:
-            audio = AudioSegment.from_file(str(path), format=fmt)
+            with profiling.span("bpm.decode"):
+                audio = decoder.load(path)
         except Exception as e:
             _log(f"[BPM] ERROR: Load failed - {e}")
             return None
         
-        audio = audio.set_channels(1)
-        
-        if len(audio) > 60000:
-            audio = audio[:60000]
-        
-        bpm_val = _detect_bpm_algorithm(audio)
+        audio = _prepare_audio(audio)
+        backend = backend if backend in BACKENDS else DEFAULT_BACKEND
+        with profiling.span("bpm.analysis"):
+            estimate, analysed_ms = pcm.progressive(
+                audio, BACKENDS[backend], constants.ANALYSIS_WINDOWS_MS,
+                _same_tempo, constants.BPM_MIN_CONFIDENCE)
+        bpm_val = estimate.value
         
         if bpm_val is None:
             _log(f"[BPM] ERROR: Detection failed")
             return None
         
-        _log(f"[BPM] DETECTED: {bpm_val:.1f} BPM")
-        _store(path, bpm_val)
+        _log(f"[BPM] DETECTED: {bpm_val:.1f} BPM "
+             f"(confidence {estimate.confidence:.2f}, {analysed_ms / 1000:.0f} s analysed)")
+        store_bpm(path, bpm_val, estimate=estimate, backend=backend)
         return bpm_val
         
     except Exception as e:
@@ -288,8 +342,11 @@ def set_cached_bpm(path: Path, bpm_val: float) -> bool:
         bpm_val = float(bpm_val)
         bpm_val = max(30.0, min(300.0, bpm_val))
         
-        _cache[str(path)] = {"mtime": path.stat().st_mtime, "bpm": bpm_val}
-        _cache_dirty = True
+        # Keep the detector's candidates: a later correction needs no re-analysis.
+        entry = _cache.get_entry(path) or {}
+        if not _cache.put(path, bpm_val, "manual", algorithm=entry.get("algorithm"),
+                          candidates=entry.get("candidates")):
+            raise OSError(f"cannot read {path}")
         _log(f"[BPM] MANUAL: {path.name} = {bpm_val:.1f} BPM")
         return True
     except Exception as e:
@@ -298,14 +355,4 @@ def set_cached_bpm(path: Path, bpm_val: float) -> bool:
 
 
 def flush_cache():
-    global _cache_dirty
-    if not _cache_dirty:
-        _log(f"[BPM] Cache unchanged")
-        return
-    try:
-        _CACHE_DIR.mkdir(parents=True, exist_ok=True)
-        _CACHE_FILE.write_text(json.dumps(_cache, indent=2), encoding="utf-8")
-        _cache_dirty = False
-        _log(f"[BPM] Cache saved: {len(_cache)} entries")
-    except Exception as e:
-        _log(f"[BPM] ERROR: Cache save failed - {e}")
+    _cache.flush()
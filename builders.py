@@ -6,11 +6,13 @@ import customtkinter as ctk
 import state
 import theme
 import constants
+import bpm as bpm_module
 import browser
 import preview
 import playback
 import log_panel
 import operations
+import diagnostics
 from dpi import _px
 
 
@@ -61,6 +63,15 @@ def build_header(parent):
     lbl.bind("<Enter>",    lambda _e: lbl.configure(text_color=theme.FG_ON_SURF))
     lbl.bind("<Leave>",    lambda _e: lbl.configure(text_color=theme.FG_MUTED))
 
+    diag = ctk.CTkLabel(frame, text="Diagnostics",
+                        font=(theme.FONT_UI, 9),
+                        text_color=theme.FG_MUTED,
+                        cursor="hand2")
+    diag.pack(side="right", padx=4)
+    diag.bind("<Button-1>", lambda _e: diagnostics.open_diagnostics())
+    diag.bind("<Enter>",    lambda _e: diag.configure(text_color=theme.FG_ON_SURF))
+    diag.bind("<Leave>",    lambda _e: diag.configure(text_color=theme.FG_MUTED))
+
     return frame
 
 
@@ -524,6 +535,8 @@ def build_center(parent):
     state.bpm_enabled_var = tk.BooleanVar(value=False)
     state.bpm_append_var  = tk.BooleanVar(value=False)
     state.bpm_fresh_var   = tk.BooleanVar(value=False)
+    state.bpm_backend_var = tk.StringVar(value=bpm_module.DEFAULT_BACKEND)
+    state.embed_tags_var  = tk.BooleanVar(value=False)
 
     bpm_cb = ctk.CTkCheckBox(frame, text="Detect BPM",
                               variable=state.bpm_enabled_var,
@@ -560,13 +573,51 @@ def build_center(parent):
                                     text_color=theme.FG_ON_SURF,
                                     corner_radius=4,
                                     font=(theme.FONT_UI, 10))
-    bpm_fresh_cb.pack(padx=10, pady=(0, 8), anchor="w")
+    bpm_fresh_cb.pack(padx=10, pady=(0, 4), anchor="w")
     _add_tooltip(bpm_fresh_cb, "Force re-detection even for files that already have a cached BPM")
 
+    det_row = ctk.CTkFrame(bpm_opts, fg_color="transparent")
+    det_row.pack(fill="x", padx=10, pady=(0, 4))
+    ctk.CTkLabel(det_row, text="Detector:",
+                 font=(theme.FONT_UI, 9),
+                 text_color=theme.FG_VARIANT,
+                 width=_px(75)).pack(side="left")
+    det_combo = ctk.CTkComboBox(det_row,
+                                values=sorted(bpm_module.BACKENDS),
+                                variable=state.bpm_backend_var,
+                                width=_px(110),
+                                state="readonly",
+                                font=(theme.FONT_UI, 9),
+                                fg_color=theme.BG_SURF2,
+                                text_color=theme.FG_ON_SURF,
+                                border_color=theme.OUTLINE_VAR,
+                                button_color=theme.CYAN_CONT,
+                                button_hover_color=theme.CYAN,
+                                dropdown_fg_color=theme.BG_SURF1,
+                                dropdown_text_color=theme.FG_ON_SURF,
+                                dropdown_hover_color=theme.CYAN_CONT)
+    det_combo.pack(side="left", padx=(8, 0))
+    _add_tooltip(det_combo, "autocorr: energy envelope, best on drums.  "
+                            "onset: spectral flux, for pads, plucks and other non-drum loops "
+                            "(listed when NumPy is installed)")
+
+    embed_cb = ctk.CTkCheckBox(bpm_opts, text="Embed BPM/key tags in exported files",
+                                variable=state.embed_tags_var,
+                                fg_color=theme.CYAN, hover_color=theme.CYAN_CONT,
+                                checkmark_color=theme.BG_ROOT,
+                                border_color=theme.OUTLINE_VAR,
+                                text_color=theme.FG_ON_SURF,
+                                corner_radius=4,
+                                font=(theme.FONT_UI, 10))
+    embed_cb.pack(padx=10, pady=(0, 8), anchor="w")
+    _add_tooltip(embed_cb, "Writes BPM and root note into WAV (acid) / AIFF (ANNO) headers, "
+                           "so SAMPSON and other tools read them without re-analysing")
+
     def _toggle_bpm_opts(*_):
         s = "normal" if state.bpm_enabled_var.get() else "disabled"
         append_cb.configure(state=s)
         bpm_fresh_cb.configure(state=s)
+        det_combo.configure(state="readonly" if s == "normal" else "disabled")
     state.bpm_enabled_var.trace_add("write", _toggle_bpm_opts)
     _toggle_bpm_opts()
 
@@ -657,7 +708,7 @@ def build_center(parent):
                                    font=(theme.FONT_UI, 12, "bold"),
                                    fg_color=theme.CYAN, text_color=theme.BG_ROOT,
                                    hover_color=theme.CYAN_CONT, corner_radius=8,
-                                   command=operations.run_tool)
+                                   command=lambda: operations.run_tool(collect_run_config()))
     state.run_btn.grid(row=15, column=0, columnspan=2, padx=16, sticky="ew")
 
     ctk.CTkButton(frame, text="Clear log",
@@ -734,7 +785,7 @@ def build_deck_b(parent):
 
     # Treeview — stays ttk (no CTK equivalent)
     state.preview_tree = ttk.Treeview(frame, style="Preview.Treeview",
-                                      columns=("original", "renamed", "subfolder", "bpm", "key", "duration", "srcpath"),
+                                      columns=("original", "renamed", "subfolder", "bpm", "key", "duration", "wave", "srcpath"),
                                       show="headings", selectmode="browse")
     state.preview_tree.heading("original",  text="Original name")
     state.preview_tree.heading("renamed",   text="Will become")
@@ -742,6 +793,7 @@ def build_deck_b(parent):
     state.preview_tree.heading("bpm",       text="BPM",    command=lambda: preview.sort_by("bpm"))
     state.preview_tree.heading("key",       text="Note",   command=lambda: preview.sort_by("key"))
     state.preview_tree.heading("duration",  text="Length", command=lambda: preview.sort_by("duration"))
+    state.preview_tree.heading("wave",      text="Wave")
     state.preview_tree.heading("srcpath",   text="")
     state.preview_tree.column("original",  width=_px(160), anchor="w",      minwidth=_px(80))
     state.preview_tree.column("renamed",   width=_px(200), anchor="w",      minwidth=_px(80))
@@ -749,6 +801,7 @@ def build_deck_b(parent):
     state.preview_tree.column("bpm",       width=0,        anchor="center", minwidth=0,      stretch=False)
     state.preview_tree.column("key",       width=0,        anchor="center", minwidth=0,      stretch=False)
     state.preview_tree.column("duration",  width=_px(50),  anchor="center", minwidth=_px(50), stretch=False)
+    state.preview_tree.column("wave",      width=_px(90),  anchor="w",      minwidth=0,      stretch=False)
     state.preview_tree.column("srcpath",   width=0,        anchor="w",      minwidth=0,      stretch=False)
     state.preview_tree.grid(row=4, column=0, sticky="nsew", padx=(12, 0), pady=(0, 12))
 
@@ -866,11 +919,13 @@ def toggle_theme():
     saved_bpm_enabled = state.bpm_enabled_var.get() if state.bpm_enabled_var else False
     saved_bpm_append  = state.bpm_append_var.get()  if state.bpm_append_var  else False
     saved_bpm_fresh   = state.bpm_fresh_var.get()   if state.bpm_fresh_var   else False
+    saved_bpm_backend = state.bpm_backend_var.get() if state.bpm_backend_var else bpm_module.DEFAULT_BACKEND
 
     # Save Key settings
     saved_key_enabled = state.key_enabled_var.get() if state.key_enabled_var else False
     saved_key_append  = state.key_append_var.get()  if state.key_append_var  else False
     saved_key_fresh   = state.key_fresh_var.get()   if state.key_fresh_var   else False
+    saved_embed_tags  = state.embed_tags_var.get()  if state.embed_tags_var  else False
     
     saved_filter      = state.preview_filter_var.get() if state.preview_filter_var else ""
 
@@ -915,6 +970,8 @@ def toggle_theme():
         state.bpm_append_var.set(saved_bpm_append)
     if state.bpm_fresh_var:
         state.bpm_fresh_var.set(saved_bpm_fresh)
+    if state.bpm_backend_var:
+        state.bpm_backend_var.set(saved_bpm_backend)
 
     # Restore Key settings
     if state.key_enabled_var:
@@ -923,6 +980,8 @@ def toggle_theme():
         state.key_append_var.set(saved_key_append)
     if state.key_fresh_var:
         state.key_fresh_var.set(saved_key_fresh)
+    if state.embed_tags_var:
+        state.embed_tags_var.set(saved_embed_tags)
     
     if state.preview_filter_var and saved_filter:
         state.preview_filter_var.set(saved_filter)
@@ -931,6 +990,46 @@ def toggle_theme():
         state.root.after(50, lambda: browser.navigate_to(saved_active))
 
 
+# ── Run configuration ────────────────────────────────────────────────────────
+
+def collect_run_config():
+    """Snapshot the current UI options into an immutable RunConfig for the engine."""
+    from engine import RunConfig, ConvertOptions
+    from conversion import parse_sample_rate, parse_bit_depth, parse_channels
+    active = state.active_dir_var.get().strip() if state.active_dir_var else ""
+    dest   = state.dest_var.get().strip() if state.dest_var else ""
+
+    convert = None
+    if state.convert_enabled_var and state.convert_enabled_var.get():
+        convert = ConvertOptions(
+            output_format=state.convert_format_var.get(),
+            sample_rate=parse_sample_rate(state.convert_sample_rate_var.get()),
+            bit_depth=parse_bit_depth(state.convert_bit_depth_var.get()),
+            channels=parse_channels(state.convert_channels_var.get()),
+            normalize=state.convert_normalize_var.get() if state.convert_normalize_var else False,
+        )
+
+    return RunConfig(
+        source=Path(active) if active else None,
+        dest=Path(dest) if dest else None,
+        folders=tuple(sorted(state._selected_folders)),
+        move_files=state.move_var.get(),
+        dry_run=state.dry_var.get(),
+        no_rename=not state.modify_names_var.get(),
+        struct_mode=state.struct_mode_var.get(),
+        path_limit=RunConfig.path_limit_for(state.profile_var.get()),
+        convert=convert,
+        bpm_enabled=state.bpm_enabled_var.get() if state.bpm_enabled_var else False,
+        bpm_append=state.bpm_append_var.get()   if state.bpm_append_var  else False,
+        bpm_fresh=state.bpm_fresh_var.get()     if state.bpm_fresh_var   else False,
+        bpm_backend=state.bpm_backend_var.get() if state.bpm_backend_var else bpm_module.DEFAULT_BACKEND,
+        key_enabled=state.key_enabled_var.get() if state.key_enabled_var else False,
+        key_append=state.key_append_var.get()   if state.key_append_var  else False,
+        key_fresh=state.key_fresh_var.get()     if state.key_fresh_var   else False,
+        embed_tags=state.embed_tags_var.get()   if state.embed_tags_var  else False,
+    )
+
+
 # ── App assembly ─────────────────────────────────────────────────────────────
 
 def build_app():
@@ -971,7 +1070,7 @@ def build_app():
     state._refresh_preview_cb = preview.refresh_preview
     state.preview_filter_var.trace_add("write",
         lambda *_: preview.apply_filter(state.preview_filter_var.get()))
-    state.root.bind("<Return>", lambda _e: operations.run_tool())
+    state.root.bind("<Return>", lambda _e: operations.run_tool(collect_run_config()))
 
     # Profile change handler - auto-apply conversion preset + refresh preview
     def _on_profile_changed(*_):
@@ -0,0 +1,157 @@
+"""Headless command-line entry point for scripted batch exports.
+
+    python cli.py SOURCE DEST [options]
+
+Fills in the same RunConfig as the Run button and hands it to the engine
+package, without importing tkinter.  Progress is written to stdout as one
+JSON object per line (see engine/transfer.py for the event shapes);
+`--progress text` prints the familiar log lines instead.
+
+Exit status: 0 on success, 1 if any file failed or the setup is invalid.
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+import bpm
+import constants
+import profiling
+from engine import RunConfig, ConvertOptions, run
+from conversion import (
+    check_ffmpeg, parse_sample_rate, parse_bit_depth, parse_channels
+)
+
+
+def _build_parser():
+    parser = argparse.ArgumentParser(
+        prog="sampson",
+        description="Organise, rename and convert an audio sample library (no GUI).")
+    parser.add_argument("source", help="source library root")
+    parser.add_argument("dest", help="destination folder (must exist)")
+    parser.add_argument("--folder", action="append", default=[], metavar="DIR",
+                        help="only scan this folder (relative to SOURCE or absolute); "
+                             "repeatable. Default: all of SOURCE")
+
+    files = parser.add_argument_group("file options")
+    files.add_argument("--profile", choices=constants.PROFILE_NAMES, default="Generic",
+                       help="hardware profile (path limit and conversion preset)")
+    files.add_argument("--structure", choices=("flat", "mirror", "parent"), default="flat",
+                       help="destination folder structure")
+    files.add_argument("--rename", action="store_true",
+                       help="prefix filenames with their parent folder name")
+    files.add_argument("--move", action="store_true", help="move instead of copy")
+    files.add_argument("--dry-run", action="store_true",
+                       help="report actions without touching the filesystem")
+
+    conv = parser.add_argument_group("conversion")
+    conv.add_argument("--convert", action="store_true",
+                      help="convert files (implied by a profile with a conversion preset)")
+    conv.add_argument("--no-profile-conversion", action="store_true",
+                      help="ignore the profile's conversion preset")
+    conv.add_argument("--format", choices=("wav", "aiff"), help="output format")
+    conv.add_argument("--sample-rate", help='e.g. "44.1k", "48k", "96k" or "keep"')
+    conv.add_argument("--bit-depth", help='e.g. "16bit", "24bit", "32bit" or "keep"')
+    conv.add_argument("--channels", help='"mono", "stereo" or "keep"')
+    conv.add_argument("--normalize", action="store_true", help="normalise to -1 dBFS")
+
+    ana = parser.add_argument_group("analysis")
+    ana.add_argument("--bpm", action="store_true", help="detect BPM")
+    ana.add_argument("--append-bpm", action="store_true", help="append _120bpm to filenames")
+    ana.add_argument("--fresh-bpm", action="store_true", help="ignore cached BPM values")
+    ana.add_argument("--bpm-detector", choices=sorted(bpm.BACKENDS), default=bpm.DEFAULT_BACKEND,
+                     help='BPM detector (default "autocorr"; "onset" needs NumPy)')
+    ana.add_argument("--key", action="store_true", help="detect root note")
+    ana.add_argument("--append-key", action="store_true", help="append _C to filenames")
+    ana.add_argument("--fresh-key", action="store_true", help="ignore cached key values")
+    ana.add_argument("--embed-tags", action="store_true",
+                     help="write BPM/key into exported WAV (acid) and AIFF (ANNO) headers")
+
+    execution = parser.add_argument_group("execution")
+    execution.add_argument("--workers", type=int, default=1,
+                     help="files processed in parallel (default 1)")
+    execution.add_argument("--progress", choices=("json", "text"), default="json",
+                     help="progress output format on stdout (default json)")
+    execution.add_argument("--profile-out", metavar="PATH",
+                     help="write per-stage timings as JSON (default ~/.sampson/profile/last_run.json)")
+    return parser
+
+
+def _convert_options(args):
+    """Return ConvertOptions for the run, or None when not converting."""
+    preset = None
+    if not args.no_profile_conversion:
+        preset = constants.PROFILES[args.profile].get("conversion")
+    if not (args.convert or preset):
+        return None
+    base = ConvertOptions.from_preset(preset or {})
+    return ConvertOptions(
+        output_format=args.format or base.output_format,
+        sample_rate=parse_sample_rate(args.sample_rate) if args.sample_rate else base.sample_rate,
+        bit_depth=parse_bit_depth(args.bit_depth) if args.bit_depth else base.bit_depth,
+        channels=parse_channels(args.channels) if args.channels else base.channels,
+        normalize=args.normalize or base.normalize,
+    )
+
+
+def _make_emitter(mode):
+    if mode == "json":
+        def emit(event):
+            print(json.dumps(event), flush=True)
+    else:
+        def emit(event):
+            kind = event["event"]
+            if kind in ("log", "error", "file"):
+                print(event["message"], flush=True)
+            elif kind == "summary":
+                print(f"Done. {event['processed']}/{event['total']} processed, "
+                      f"{event['errors']} error(s).", flush=True)
+    return emit
+
+
+def main(argv=None) -> int:
+    args = _build_parser().parse_args(argv)
+    emit = _make_emitter(args.progress)
+
+    source = Path(args.source).expanduser()
+    dest   = Path(args.dest).expanduser()
+    if not source.is_dir():
+        emit({"event": "error", "src": str(source), "message": f"ERROR: source is not a directory: {source}"})
+        return 1
+    if not dest.is_dir():
+        emit({"event": "error", "src": str(dest), "message": f"ERROR: destination is not a directory: {dest}"})
+        return 1
+
+    convert = _convert_options(args)
+    if convert and not check_ffmpeg():
+        emit({"event": "error", "src": "", "message": "ERROR: ffmpeg is required for audio conversion"})
+        return 1
+
+    config = RunConfig(
+        source=source,
+        dest=dest,
+        folders=tuple(str(source / f) for f in args.folder),
+        move_files=args.move,
+        dry_run=args.dry_run,
+        no_rename=not args.rename,
+        struct_mode=args.structure,
+        path_limit=RunConfig.path_limit_for(args.profile),
+        convert=convert,
+        bpm_enabled=args.bpm, bpm_append=args.append_bpm, bpm_fresh=args.fresh_bpm,
+        bpm_backend=args.bpm_detector,
+        key_enabled=args.key, key_append=args.append_key, key_fresh=args.fresh_key,
+        embed_tags=args.embed_tags,
+        workers=max(1, args.workers),
+    )
+    profiling.reset()
+    summary = profiling.maybe_cprofile(run, config, emit=emit)
+    try:
+        profiling.dump_json(args.profile_out)
+    except OSError as e:
+        print(f"warning: could not write profile: {e}", file=sys.stderr)
+    return 1 if summary["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,32 @@
 AUDIO_EXTS       = {".wav", ".aiff", ".aif", ".flac", ".mp3", ".ogg"}
 MAX_PREVIEW_ROWS = 500
 
+# Playback prefetch: decoded Sounds kept for the current and adjacent rows.
+PLAYBACK_CACHE_SIZE         = 8
+PLAYBACK_CACHE_MAX_BYTES    = 256 * 1024 * 1024  # decoded audio held in memory
+PLAYBACK_PREFETCH_MAX_BYTES = 64 * 1024 * 1024   # skip files whose decoded audio is larger (~5.8 min)
+
+# Arrow-key audition waits this long on a row before loading it (0 = immediately).
+AUDITION_DEBOUNCE_MS        = 180
+
+# Progressive BPM/key analysis (pcm.progressive): growing windows, then the
+# detector's whole input; stop once two windows agree this confidently.
+ANALYSIS_WINDOWS_MS         = (4000, 8000, 16000)
+BPM_MIN_CONFIDENCE          = 0.5   # winning tempo's share of the evidence
+KEY_MIN_CONFIDENCE          = 0.15  # chroma margin between the best two notes
+ANALYSIS_CANDIDATES         = 5     # runner-up BPMs / notes kept in the cache
+
+# Analysis cache maintenance (analysis_cache.py).
+ANALYSIS_CACHE_MAX_ENTRIES  = 100_000  # per cache, least recently used evicted first
+                                       # (SAMPSON_CACHE_MAX_ENTRIES overrides)
+ANALYSIS_CACHE_TOUCH_S      = 3600     # last-access stamps refreshed at most this often
+ANALYSIS_CACHE_FLUSH_S      = 30       # unsaved results snapshotted at most this long after a change
+PEAKS_CACHE_MAX_ENTRIES     = 20_000   # waveform overviews kept (peaks.py), least recently used dropped
+
+# Idle-time BPM/key analysis of Deck B rows (idle_analysis.py).
+IDLE_ANALYSIS_GAP_MS        = 50    # pause between files
+IDLE_ANALYSIS_POLL_MS       = 400   # viewport / Run / playback re-check interval
+
 # Hardware profiles — maps display name to device constraints.
 # path_limit: max total path length in chars, or None for no restriction.
 # conversion: dict of audio conversion settings, or None for no conversion.
@@ -8,10 +8,15 @@ import os
 import shutil
 import subprocess
 import sys
+import threading
 from pathlib import Path
 from typing import Optional, NamedTuple
 
-import state
+import profiling
+
+# Last convert_file() failure per thread, so parallel workers don't clobber
+# each other's error text.  Read (and cleared) via pop_last_error().
+_errors = threading.local()
 
 # Track whether static_ffmpeg paths have been added to PATH
 _static_ffmpeg_initialized = False
@@ -30,14 +35,19 @@ def _init_static_ffmpeg() -> bool:
     return _static_ffmpeg_initialized
 
 
-def _find_ffmpeg_path() -> Optional[str]:
-    """Find ffmpeg executable path.
+def _search_ffmpeg_path() -> Optional[str]:
+    """Search for the ffmpeg executable (uncached — use _find_ffmpeg_path()).
 
     Priority:
+    0. SAMPSON_FFMPEG, exported by a parent process that already resolved it
     1. static-ffmpeg bundled binaries (includes both ffmpeg + ffprobe)
     2. System PATH (user override)
     3. Common install locations
     """
+    inherited = os.environ.get(TOOLCHAIN_ENV)
+    if inherited and os.path.isfile(inherited):
+        return inherited
+
     # 1. Try static-ffmpeg bundled binaries first (bundled with app)
     try:
         if _init_static_ffmpeg():
@@ -123,30 +133,98 @@ def _find_ffprobe_path(ffmpeg_path: str) -> Optional[str]:
     return shutil.which(ffprobe_exe)
 
 
+# ── Resolved toolchain ───────────────────────────────────────────────────────
+# Discovery (static_ffmpeg.add_paths(), PATH lookups, install-dir probes and
+# two `ffmpeg` subprocesses) runs once per process.  main.py starts it on a
+# background thread after the first frame; everyone else blocks on the first
+# call.  The resolved paths are exported to the environment so child
+# processes inherit them instead of searching again.
+
+TOOLCHAIN_ENV = "SAMPSON_FFMPEG"
+TOOLCHAIN_PROBE_ENV = "SAMPSON_FFPROBE"
+
+
+class Toolchain(NamedTuple):
+    """ffmpeg installation shared by conversion, analysis and duration probing."""
+    ffmpeg: Optional[str]
+    ffprobe: Optional[str]
+    version: Optional[str]
+
+
+_toolchain: Optional[Toolchain] = None
+_toolchain_lock = threading.Lock()
+
+
+def _ffmpeg_lines(ffmpeg_path: str, *args) -> list:
+    try:
+        result = subprocess.run([ffmpeg_path, "-hide_banner", *args],
+                                capture_output=True, text=True, timeout=10)
+    except Exception:
+        return []
+    return result.stdout.splitlines() if result.returncode == 0 else []
+
+
+def _discover_toolchain() -> Toolchain:
+    ffmpeg_path = _search_ffmpeg_path()
+    if not ffmpeg_path:
+        return Toolchain(None, None, None)
+
+    inherited_probe = os.environ.get(TOOLCHAIN_PROBE_ENV)
+    if inherited_probe and os.path.isfile(inherited_probe):
+        ffprobe_path = inherited_probe
+    else:
+        ffprobe_path = _find_ffprobe_path(ffmpeg_path)
+
+    # First line of -version: "ffmpeg version 6.0 Copyright ..."
+    version = None
+    lines = _ffmpeg_lines(ffmpeg_path, "-version")
+    if lines:
+        parts = lines[0].split()
+        version = parts[2] if len(parts) >= 3 else "unknown"
+
+    # Make both binaries reachable for pydub's own PATH lookups and for
+    # child processes, once, instead of on every convert/detect call.
+    ffmpeg_dir = os.path.dirname(ffmpeg_path)
+    current_path = os.environ.get("PATH", "")
+    if ffmpeg_dir not in current_path.split(os.pathsep):
+        os.environ["PATH"] = ffmpeg_dir + os.pathsep + current_path
+    os.environ[TOOLCHAIN_ENV] = ffmpeg_path
+    if ffprobe_path:
+        os.environ[TOOLCHAIN_PROBE_ENV] = ffprobe_path
+
+    return Toolchain(ffmpeg_path, ffprobe_path, version)
+
+
+def get_toolchain() -> Toolchain:
+    """Return the process-wide Toolchain, discovering it on first call (thread-safe)."""
+    global _toolchain
+    if _toolchain is None:
+        with _toolchain_lock:
+            if _toolchain is None:
+                with profiling.span("toolchain"):
+                    _toolchain = _discover_toolchain()
+    return _toolchain
+
+
+def warm_up_toolchain():
+    """Resolve the toolchain on a daemon thread so the first Run doesn't wait."""
+    if _toolchain is None:
+        threading.Thread(target=get_toolchain, daemon=True).start()
+
+
+def _find_ffmpeg_path() -> Optional[str]:
+    """Path of the resolved ffmpeg executable, or None."""
+    return get_toolchain().ffmpeg
+
+
 def check_ffmpeg() -> bool:
     """Verify ffmpeg is available on the system."""
-    return _find_ffmpeg_path() is not None
+    return get_toolchain().ffmpeg is not None
 
 
 def get_ffmpeg_version() -> Optional[str]:
     """Get ffmpeg version string if available."""
-    ffmpeg_path = _find_ffmpeg_path()
-    if not ffmpeg_path:
-        return None
-    try:
-        result = subprocess.run(
-            [ffmpeg_path, "-version"],
-            capture_output=True,
-            text=True,
-            timeout=5
-        )
-        if result.returncode == 0:
-            # First line: "ffmpeg version 6.0 Copyright ..."
-            first_line = result.stdout.split('\n')[0]
-            return first_line.split()[2] if len(first_line.split()) >= 3 else "unknown"
-    except Exception:
-        pass
-    return None
+    return get_toolchain().version
 
 
 def get_audio_info(path: Path) -> Optional[NamedTuple]:
@@ -195,11 +273,15 @@ def _get_pydub():
     """Lazy load pydub module and configure ffmpeg path."""
     global _pydub
     if _pydub is None:
+        toolchain = get_toolchain()
         from pydub import AudioSegment
+        if toolchain.ffmpeg:
+            AudioSegment.converter = toolchain.ffmpeg
         _pydub = AudioSegment
     return _pydub
 
 
+@profiling.timed("convert")
 def convert_file(
     src: Path,
     dst: Path,
@@ -228,22 +310,10 @@ def convert_file(
         if not src.exists():
             raise FileNotFoundError(f"Source file not found: {src}")
         
-        # Find ffmpeg
-        ffmpeg_path = _find_ffmpeg_path()
-        if not ffmpeg_path:
+        if not check_ffmpeg():
             raise RuntimeError("ffmpeg not found - cannot convert audio")
-        
-        # Ensure PATH includes ffmpeg directory for subprocess calls
-        ffmpeg_dir = os.path.dirname(ffmpeg_path)
-        current_path = os.environ.get('PATH', '')
-        if ffmpeg_dir not in current_path:
-            os.environ['PATH'] = ffmpeg_dir + os.pathsep + current_path
-        
-        # Explicitly set pydub's ffmpeg path
-        import pydub
-        pydub.AudioSegment.converter = ffmpeg_path
-        
-        # Now load pydub and process the audio
+
+        # Load pydub (configured with the resolved toolchain) and process the audio
         # Pass format explicitly so pydub uses -f flag with ffmpeg directly,
         # making ffprobe unnecessary in the bundle.
         AudioSegment = _get_pydub()
@@ -295,12 +365,19 @@ def convert_file(
         return True
         
     except Exception as e:
-        # Store error info in state for retrieval
+        # Store error info for retrieval via pop_last_error()
         import traceback
-        state._last_conversion_error = f"{str(e)}\n{traceback.format_exc()}"
+        _errors.last = f"{str(e)}\n{traceback.format_exc()}"
         return False
 
 
+def pop_last_error() -> Optional[str]:
+    """Return and clear the last convert_file() error on this thread."""
+    err = getattr(_errors, "last", None)
+    _errors.last = None
+    return err
+
+
 def get_target_extension(output_format: str) -> str:
     """Get file extension for output format."""
     fmt = output_format.lower()
@@ -0,0 +1,199 @@
+"""Shared audio decoding for BPM and key analysis.
+
+detect_bpm() and detect_key() used to decode every file themselves: one
+ffmpeg process per file per detector.  load() is now the single entry point.
+Outside a Run it decodes one file at a time.  Inside a Run,
+engine.transfer opens a batched() scope over the files that still need
+analysis and a DecodeService decodes them ahead of the analysis loop:
+
+  * WAV is read natively by pydub (no process at all).
+  * Everything else is decoded BATCH_SIZE files per ffmpeg process — one
+    invocation with N inputs and N mapped WAV outputs — on a small pool of
+    background threads, a few batches ahead of the consumer.
+  * Batches are decoded straight to mono at DECODE_RATE — the detectors
+    downmix and resample anyway — so a batch of 60 s windows stays small.
+  * The decoded audio is shared, so BPM and key analysis of the same file
+    cost one decode between them; engine.analysis release()s each file when
+    it is done and a batch is freed as soon as all its files are.
+
+ffmpeg cannot be handed new inputs once it is running, so "persistent" here
+means a pool of short-lived batch processes rather than one daemon; the
+spawn cost is still paid once per batch instead of twice per file.  If a
+batch invocation fails (an unreadable input aborts the whole command), its
+files are decoded one per process instead.
+"""
+
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+
+import profiling
+
+BATCH_SIZE = 8
+MAX_SECONDS = 60          # longest window any detector reads (bpm._prepare_audio)
+DECODE_RATE = 22050       # ≥ 2× every detector's analysis rate (onset: 11 kHz, key: 8 kHz)
+
+_NATIVE_EXTS = {".wav"}
+
+
+def _format_for(path: Path) -> str:
+    fmt = path.suffix.lower().lstrip(".")
+    return "aiff" if fmt == "aif" else fmt
+
+
+def decode_one(path: Path):
+    """Decode one file. Raises on failure.
+
+    WAV goes straight to pydub.  Other formats try a one-file batch first —
+    a single ffmpeg process, where pydub would also run ffprobe — and fall
+    back to pydub, whose exception carries the useful error text.
+    """
+    from conversion import _get_pydub
+    if path.suffix.lower() not in _NATIVE_EXTS:
+        audio = _decode_batch([path], MAX_SECONDS).get(path)
+        if audio is not None:
+            return audio
+    AudioSegment = _get_pydub()
+    return AudioSegment.from_file(str(path), format=_format_for(path))
+
+
+def _decode_batch(paths: list, seconds: float) -> dict:
+    """Decode `paths` with a single ffmpeg process; return {path: AudioSegment}.
+
+    Files missing from the result (failed batch or failed input) are left for
+    the caller to decode individually.
+    """
+    from conversion import _get_pydub, get_toolchain
+    ffmpeg = get_toolchain().ffmpeg
+    if not ffmpeg or not paths:
+        return {}
+    AudioSegment = _get_pydub()
+
+    tmp = tempfile.mkdtemp(prefix="sampson-decode-")
+    try:
+        cmd = [ffmpeg, "-hide_banner", "-nostdin", "-v", "error", "-y"]
+        for p in paths:
+            cmd += ["-i", str(p)]
+        outs = []
+        for i in range(len(paths)):
+            out = os.path.join(tmp, f"{i}.wav")
+            outs.append(out)
+            cmd += ["-map", f"{i}:a:0", "-t", str(seconds), "-ac", "1",
+                    "-ar", str(DECODE_RATE), "-acodec", "pcm_s16le", out]
+        with profiling.span("decode.batch" if len(paths) > 1 else "decode.single"):
+            try:
+                proc = subprocess.run(cmd, capture_output=True, timeout=60 + 10 * len(paths))
+            except (OSError, subprocess.SubprocessError):
+                proc = None
+        if proc is None or proc.returncode != 0:
+            if len(paths) == 1:
+                return {}
+            result = {}
+            for p in paths:
+                result.update(_decode_batch([p], seconds))
+            return result
+        result = {}
+        for p, out in zip(paths, outs):
+            try:
+                if os.path.getsize(out) > 44:
+                    result[p] = AudioSegment.from_file(out, format="wav")
+            except Exception:
+                pass
+        return result
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+class DecodeService:
+    """Decodes a known list of files in background batches, a few batches ahead.
+
+    take(path) blocks until the batch holding `path` is done and returns its
+    audio (None if the file isn't part of this service, failed to decode or
+    was already released).  Results stay available until release(path), so
+    BPM and key analysis of the same file share one decode; a batch is
+    dropped once every file in it has been released.
+    """
+
+    def __init__(self, paths, workers: int = 2, batch_size: int = BATCH_SIZE,
+                 seconds: float = MAX_SECONDS):
+        paths = [Path(p) for p in paths if Path(p).suffix.lower() not in _NATIVE_EXTS]
+        self._batches = [paths[i:i + batch_size] for i in range(0, len(paths), batch_size)]
+        self._index = {str(p): b for b, batch in enumerate(self._batches) for p in batch}
+        self._unreleased = {b: {str(p) for p in batch} for b, batch in enumerate(self._batches)}
+        self._seconds = seconds
+        self._lookahead = max(1, workers)
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers),
+                                        thread_name_prefix="sampson-decode")
+        self._futures = {}
+        self._lock = threading.Lock()
+        self._submit_through(self._lookahead - 1)
+
+    def _submit_through(self, last: int):
+        # Caller holds self._lock (or is __init__).
+        for b in range(min(last, len(self._batches) - 1) + 1):
+            if b not in self._futures:
+                self._futures[b] = self._pool.submit(_decode_batch, self._batches[b], self._seconds)
+
+    def take(self, path):
+        b = self._index.get(str(path))
+        if b is None:
+            return None
+        with self._lock:
+            self._submit_through(b + self._lookahead)
+            fut = self._futures.get(b)
+        if fut is None:
+            return None
+        return fut.result().get(Path(path))
+
+    def release(self, path):
+        """`path` has been analysed; free its batch once nothing else needs it."""
+        b = self._index.get(str(path))
+        if b is None:
+            return
+        with self._lock:
+            remaining = self._unreleased[b]
+            remaining.discard(str(path))
+            if not remaining:
+                self._futures[b] = None
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self._futures.clear()
+
+
+_service = None
+
+
+@contextmanager
+def batched(paths, workers: int = 2):
+    """Route load() through a DecodeService for `paths` for the duration of the block."""
+    global _service
+    service = DecodeService(paths, workers=workers)
+    previous, _service = _service, service
+    try:
+        yield service
+    finally:
+        _service = previous
+        service.close()
+
+
+def release(path):
+    """Tell the active DecodeService, if any, that `path` is done with."""
+    service = _service
+    if service is not None:
+        service.release(path)
+
+
+def load(path):
+    """Return the decoded AudioSegment for `path`. Raises if it cannot be decoded."""
+    service = _service
+    if service is not None:
+        audio = service.take(path)
+        if audio is not None:
+            return audio
+    return decode_one(Path(path))
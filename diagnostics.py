@@ -0,0 +1,72 @@
+import tkinter.ttk as ttk
+from tkinter import filedialog
+import customtkinter as ctk
+
+import state
+import theme
+import profiling
+from dpi import _px
+
+
+_COLUMNS = (("stage", "Stage", 160, "w"),
+            ("count", "Count", 70, "e"),
+            ("total", "Total ms", 100, "e"),
+            ("mean", "Mean ms", 90, "e"),
+            ("p50", "p50 ≤", 80, "e"),
+            ("p95", "p95 ≤", 80, "e"),
+            ("max", "Max ms", 90, "e"))
+
+_window = None
+
+
+def _fmt_ms(v):
+    return "—" if v is None else f"{v:,.1f}"
+
+
+def _refresh(tree):
+    tree.delete(*tree.get_children())
+    for name, st in profiling.snapshot().items():
+        tree.insert("", "end", values=(
+            name, st["count"], _fmt_ms(st["total_ms"]), _fmt_ms(st["mean_ms"]),
+            _fmt_ms(st["p50_ms"]), _fmt_ms(st["p95_ms"]), _fmt_ms(st["max_ms"])))
+
+
+def _save(win):
+    path = filedialog.asksaveasfilename(parent=win, defaultextension=".json",
+                                        initialfile="sampson-profile.json",
+                                        filetypes=[("JSON", "*.json")])
+    if path:
+        profiling.dump_json(path)
+
+
+def open_diagnostics():
+    """Show per-stage timings collected since the last Run (one window at a time)."""
+    global _window
+    if _window is not None and _window.winfo_exists():
+        _window.lift()
+        _window.focus_force()
+        return
+
+    win = ctk.CTkToplevel(state.root)
+    win.title("SAMPSON — Diagnostics")
+    win.geometry(f"{_px(720)}x{_px(360)}")
+    win.configure(fg_color=theme.BG_SURF1)
+    _window = win
+
+    tree = ttk.Treeview(win, style="Preview.Treeview",
+                        columns=[c[0] for c in _COLUMNS], show="headings")
+    for col, heading, width, anchor in _COLUMNS:
+        tree.heading(col, text=heading)
+        tree.column(col, width=_px(width), anchor=anchor, stretch=(col == "stage"))
+    tree.pack(fill="both", expand=True, padx=_px(10), pady=(_px(10), _px(6)))
+
+    bar = ctk.CTkFrame(win, fg_color="transparent")
+    bar.pack(fill="x", padx=_px(10), pady=(0, _px(10)))
+    ctk.CTkLabel(bar, text="Timings reset at the start of every Run.",
+                 font=(theme.FONT_UI, 9), text_color=theme.FG_DIM).pack(side="left")
+    ctk.CTkButton(bar, text="Save JSON…", width=_px(100),
+                  command=lambda: _save(win)).pack(side="right")
+    ctk.CTkButton(bar, text="Refresh", width=_px(80),
+                  command=lambda: _refresh(tree)).pack(side="right", padx=_px(6))
+
+    _refresh(tree)
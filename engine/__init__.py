@@ -0,0 +1,35 @@
+"""SAMPSON pipeline engine — scanner, naming, analysis, conversion and transfer.
+
+Nothing in this package imports tkinter or reads `state`; it is driven by an
+immutable RunConfig and reports progress through plain event dicts, so the
+GUI, the CLI and benchmarks can all run it directly.
+"""
+
+import importlib
+
+from engine.scanner import scan_audio_files, get_duration, clear_duration_cache
+
+# RunConfig/ConvertOptions (dataclasses → inspect) and run (thread pool,
+# conversion, detectors) are resolved on first access so that importing the
+# package for the scanner — which the GUI does at startup — stays cheap.
+# SAMPSON.spec lists these modules in hiddenimports for PyInstaller.
+_LAZY = {
+    "RunConfig":      "engine.config",
+    "ConvertOptions": "engine.config",
+    "run":            "engine.transfer",
+}
+
+
+def __getattr__(name):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module 'engine' has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+__all__ = [
+    "RunConfig", "ConvertOptions",
+    "scan_audio_files", "get_duration", "clear_duration_cache",
+    "run",
+]
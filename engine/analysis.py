@@ -0,0 +1,144 @@
+"""BPM and key analysis for a single file, driven by a RunConfig."""
+
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+import analysis_cache
+import audiotags
+import bpm as bpm_module
+import decoder
+import key as key_module
+import nametags
+
+
+class Transfer(NamedTuple):
+    """One completed copy/move/convert, recorded for carry_results()."""
+    src: Path
+    dst: Path
+    fingerprint: Optional[str]   # source content fingerprint, if already indexed
+    rewritten: bool              # target content differs from the source (converted/tagged)
+
+
+def analyse(path, config) -> tuple:
+    """Return (bpm | None, key | None) for `path`, honouring the config toggles."""
+    try:
+        bpm_val = bpm_module.detect_bpm(path, force=config.bpm_fresh,
+                                        backend=config.bpm_backend) if config.bpm_enabled else None
+        key_val = key_module.detect_key(path, force=config.key_fresh) if config.key_enabled else None
+    finally:
+        decoder.release(path)
+    return bpm_val, key_val
+
+
+def pending_decode(files, config) -> list:
+    """Files this run will actually have to decode (not served from the caches)."""
+    pending = []
+    for f in files:
+        need_bpm = config.bpm_enabled and _needs_analysis(
+            f, bpm_module.get_cached_bpm, bpm_module.get_cached_source, config.bpm_fresh)
+        need_key = config.key_enabled and _needs_analysis(
+            f, key_module.get_cached_key, key_module.get_cached_source, config.key_fresh)
+        if need_bpm or need_key:
+            pending.append(f)
+    return pending
+
+
+def _needs_analysis(path, get_cached, get_source, fresh: bool) -> bool:
+    # Tag values stay authoritative on a fresh scan (see resolve_tags).
+    if get_cached(path) is None:
+        return True
+    return fresh and get_source(path) != "tag"
+
+
+def resolve_tags(files) -> int:
+    """Metadata-first tier: cache BPM/key embedded in file headers.
+
+    Reads only chunk headers (acid, smpl, inst, basc, ANNO), so it is cheap
+    enough to run over a whole inventory.  Tag values replace analysed ones
+    but never a manual override.  Returns the number of tagged files.
+    """
+    tagged = 0
+    for f in files:
+        tags = audiotags.read_tags(f)
+        if tags is None:
+            continue
+        tagged += 1
+        if tags.bpm is not None and bpm_module.get_cached_source(f) not in ("tag", "manual"):
+            bpm_module.store_bpm(f, tags.bpm, source="tag")
+        if tags.key is not None and key_module.get_cached_source(f) not in ("tag", "manual"):
+            key_module.store_key(f, tags.key, source="tag")
+    return tagged
+
+
+def resolve_names(files) -> int:
+    """Zero-cost tier: cache BPM/key spelled out in file and folder names.
+
+    Fills only values nothing else has produced yet (source "filename");
+    a fresh scan still analyses them.  Returns the number of files hinted.
+    """
+    hinted = 0
+    for f in files:
+        hint = nametags.name_tags(f)
+        if hint is None:
+            continue
+        stored = False
+        if hint.bpm is not None and bpm_module.get_cached_bpm(f) is None:
+            stored = bpm_module.store_bpm(f, hint.bpm, source="filename")
+        if hint.key is not None and key_module.get_cached_key(f) is None:
+            stored = key_module.store_key(f, hint.key, source="filename") or stored
+        hinted += stored
+    return hinted
+
+
+# Sources worth writing into a file's header.  A filename hint is a guess,
+# and a tag is already there: embedding either would make it an
+# authoritative tag on the next scan.
+_EMBEDDABLE = ("analysis", "manual")
+
+
+def embeddable_results(path) -> tuple:
+    """(bpm | None, key | None) cached for `path` from analysis or a manual edit."""
+    bpm_val = (bpm_module.get_cached_bpm(path)
+               if bpm_module.get_cached_source(path) in _EMBEDDABLE else None)
+    key_val = (key_module.get_cached_key(path)
+               if key_module.get_cached_source(path) in _EMBEDDABLE else None)
+    return bpm_val, key_val
+
+
+def drain_logs() -> list:
+    """Return and clear pending BPM and key log messages."""
+    return bpm_module.get_log_messages() + key_module.get_log_messages()
+
+
+def carry_results(transfers, config):
+    """Point the caches at every transfer target in one pass; on Move, retire the sources.
+
+    Plain copies/moves share the source's content fingerprint, so only the
+    target path is indexed.  Converted or tagged files are new content: the
+    source's cache entries — source, detector version, confidence and
+    candidates — are copied to the target's own fingerprint.
+    """
+    analysis_cache.alias([(t.src, t.dst, t.fingerprint) for t in transfers
+                          if t.fingerprint and not t.rewritten])
+    analysis_cache.copy_results([(t.fingerprint, t.dst) for t in transfers
+                                 if t.fingerprint and t.rewritten])
+    if config.move_files:
+        analysis_cache.retire([t.src for t in transfers])
+
+
+def flush_caches(config):
+    """Persist the analysis caches touched by this run."""
+    if config.bpm_enabled:
+        bpm_module.flush_cache()
+    if config.key_enabled:
+        key_module.flush_cache()
+    analysis_cache.flush_all()      # index + results carried by a disabled detector
+
+
+def count_detected(files, config) -> tuple:
+    """Return (bpm_count | None, key_count | None) of files with a cached result."""
+    bpm_count = (sum(1 for f in files if bpm_module.get_cached_bpm(f) is not None)
+                 if config.bpm_enabled else None)
+    key_count = (sum(1 for f in files if key_module.get_cached_key(f) is not None)
+                 if config.key_enabled else None)
+    return bpm_count, key_count
@@ -0,0 +1,64 @@
+"""Immutable run configuration for the engine.
+
+The GUI (builders.collect_run_config) and the CLI both fill in a RunConfig;
+the engine never reads tkinter variables.
+"""
+
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Optional
+
+import constants
+
+
+@dataclass(frozen=True)
+class ConvertOptions:
+    """Audio conversion settings; field names match convert_file() kwargs."""
+    output_format: str = "wav"
+    sample_rate: Optional[int] = None   # None = keep original
+    bit_depth: Optional[int] = None     # 16 | 24 | 32 | None
+    channels: Optional[int] = None      # 1 | 2 | None
+    normalize: bool = False
+
+    def as_kwargs(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_preset(cls, preset: dict) -> "ConvertOptions":
+        """Build options from a constants.PROFILES "conversion" entry."""
+        return cls(output_format=preset.get("format", "wav"),
+                   sample_rate=preset.get("sample_rate"),
+                   bit_depth=preset.get("bit_depth"),
+                   channels=preset.get("channels"),
+                   normalize=preset.get("normalize", False))
+
+
+@dataclass(frozen=True)
+class RunConfig:
+    """Everything a Run needs, captured once before the worker starts."""
+    source: Path
+    dest: Path
+    folders: tuple = ()                 # scan roots; empty = the whole source
+    move_files: bool = False
+    dry_run: bool = True
+    no_rename: bool = True
+    struct_mode: str = "flat"           # "flat" | "mirror" | "parent"
+    path_limit: Optional[int] = None
+    convert: Optional[ConvertOptions] = None
+    bpm_enabled: bool = False
+    bpm_append: bool = False
+    bpm_fresh: bool = False
+    bpm_backend: str = "autocorr"       # a key of bpm.BACKENDS
+    key_enabled: bool = False
+    key_append: bool = False
+    key_fresh: bool = False
+    embed_tags: bool = False            # write BPM/key into exported WAV/AIFF headers
+    workers: int = 1
+
+    @property
+    def scan_roots(self) -> tuple:
+        return self.folders or (str(self.source),)
+
+    @staticmethod
+    def path_limit_for(profile: str) -> Optional[int]:
+        return constants.PROFILES[profile]["path_limit"]
@@ -0,0 +1,98 @@
+"""Output filename and subfolder rules shared by the preview and the Run worker.
+
+Tk-free so the headless CLI computes exactly the same names as the GUI.
+"""
+
+from pathlib import Path
+
+
+def _apply_path_limit(new_name: str, dest_path_str: str, limit: int,
+                      protect_suffixes: list = None) -> str:
+    """
+    Truncate new_name so that the full destination path stays within `limit` chars.
+
+    The extension is always preserved; only the stem is shortened.
+    protect_suffixes (e.g. ["_120bpm", "_C#"]) are kept intact at the end of the stem.
+    """
+    if protect_suffixes is None:
+        protect_suffixes = []
+    
+    full = str(Path(dest_path_str) / new_name)
+    if len(full) <= limit:
+        return new_name
+    p     = Path(new_name)
+    ext   = p.suffix
+    total_protect_len = sum(len(s) for s in protect_suffixes)
+    avail = limit - len(str(Path(dest_path_str))) - 1 - len(ext) - total_protect_len
+    if avail < 1:
+        avail = 1
+    stem = p.stem
+    
+    # Remove all protected suffixes from stem (in reverse order to handle overlaps)
+    for suffix in sorted(protect_suffixes, key=len, reverse=True):
+        if stem.endswith(suffix):
+            stem = stem[:-len(suffix)]
+    
+    # Reconstruct with all protected suffixes
+    all_suffixes = "".join(protect_suffixes)
+    return stem[:avail] + all_suffixes + ext
+
+
+def _compute_output(f: Path, source_root: Path, dest: Path,
+                    no_rename: bool, struct_mode: str,
+                    path_limit, bpm=None, append_bpm=False,
+                    key=None, append_key=False) -> tuple:
+    """
+    Return (new_filename, rel_subfolder) for a single source file.
+
+    new_filename  — the final filename written to disk
+    rel_subfolder — subfolder relative to dest where the file lands:
+                    ""            flat mode  (file goes directly in dest/)
+                    "Kicks"       parent mode (file goes in dest/Kicks/)
+                    "Kicks/808"   mirror mode (file goes in dest/Kicks/808/)
+
+    struct_mode is one of "flat", "mirror", "parent".
+    path_limit is int | None (from the active hardware profile).
+    bpm / append_bpm control the optional _120bpm suffix.
+    key / append_key control the optional _C suffix.
+    """
+    # Filename
+    new_name = f.name if no_rename else f"{f.parent.name}_{f.name}"
+
+    # Subfolder
+    if struct_mode == "mirror":
+        try:
+            rel_sub = str(f.parent.relative_to(source_root))
+        except ValueError:
+            rel_sub = ""
+        if rel_sub == ".":
+            rel_sub = ""
+    elif struct_mode == "parent":
+        rel_sub = f.parent.name if f.parent != source_root else ""
+    else:                          # "flat" or unrecognised
+        rel_sub = ""
+
+    # BPM suffix (applied before path-limit truncation so it can be protected)
+    bpm_suffix = f"_{int(round(bpm))}bpm" if (bpm is not None and append_bpm) else ""
+    if bpm_suffix:
+        p        = Path(new_name)
+        new_name = p.stem + bpm_suffix + p.suffix
+
+    # Key suffix (applied before path-limit truncation so it can be protected)
+    key_suffix = f"_{key}" if (key is not None and append_key) else ""
+    if key_suffix:
+        p        = Path(new_name)
+        new_name = p.stem + key_suffix + p.suffix
+
+    # Path limit
+    effective_dest = str(Path(dest) / rel_sub) if rel_sub else str(dest)
+    if path_limit is not None:
+        protect_suffixes = []
+        if bpm_suffix:
+            protect_suffixes.append(bpm_suffix)
+        if key_suffix:
+            protect_suffixes.append(key_suffix)
+        new_name = _apply_path_limit(new_name, effective_dest, path_limit,
+                                     protect_suffixes=protect_suffixes)
+
+    return new_name, rel_sub
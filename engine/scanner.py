@@ -0,0 +1,62 @@
+"""Audio file discovery and header-only duration probing."""
+
+import contextlib
+import time
+import wave
+from pathlib import Path
+
+import constants
+import profiling
+
+_duration_cache: dict = {}  # str(path) → float | None; cleared on each scan
+
+
+@profiling.timed("scan")
+def scan_audio_files(folders) -> list:
+    """Return every audio file under the given folders (recursive)."""
+    files = []
+    for folder_path in folders:
+        p = Path(folder_path)
+        if p.is_dir():
+            files += [f for f in p.rglob("*")
+                      if f.suffix.lower() in constants.AUDIO_EXTS and f.is_file()]
+    return files
+
+
+def clear_duration_cache():
+    _duration_cache.clear()
+
+
+def get_duration(path: Path) -> float | None:
+    """Return duration in seconds from file metadata.
+
+    Fast path for WAV/AIFF (stdlib header read, no subprocess).
+    Falls back to ffprobe via pydub for MP3/FLAC/OGG.
+    Returns None on any error.
+    """
+    key = str(path)
+    if key in _duration_cache:
+        return _duration_cache[key]
+    val = None
+    t0 = time.perf_counter()
+    try:
+        ext = path.suffix.lower()
+        if ext == '.wav':
+            with contextlib.closing(wave.open(str(path))) as wf:
+                val = wf.getnframes() / wf.getframerate()
+        elif ext in ('.aif', '.aiff'):
+            import aifc
+            with contextlib.closing(aifc.open(str(path))) as af:
+                val = af.getnframes() / af.getframerate()
+        else:
+            from conversion import get_toolchain
+            from pydub.utils import mediainfo
+            get_toolchain()    # puts ffprobe on PATH for pydub
+            info = mediainfo(str(path))
+            dur = info.get('duration')
+            val = float(dur) if dur else None
+    except Exception:
+        val = None
+    profiling.record("duration", time.perf_counter() - t0)
+    _duration_cache[key] = val
+    return val
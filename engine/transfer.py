@@ -0,0 +1,192 @@
+"""Run pipeline: scan → analyse → name → convert/copy/move.
+
+Progress is reported by calling `emit(event)` with a plain dict so the
+caller decides how to display it — the GUI marshals events onto the Tk
+thread, the CLI prints JSON lines.
+
+Event dicts always carry an "event" key:
+    {"event": "log",      "message": str}
+    {"event": "file",     "index": int, "total": int, "src": str, "dst": str,
+                          "bpm": float | None, "key": str | None, "message": str}
+    {"event": "error",    "src": str, "message": str}
+    {"event": "summary",  "total": int, "processed": int, "errors": int,
+                          "bpm_detected": int | None, "key_detected": int | None}
+"""
+
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+import analysis_cache
+import audiotags
+import decoder
+import profiling
+from conversion import convert_file, get_target_extension, pop_last_error
+from engine import analysis
+from engine.naming import _compute_output
+from engine.scanner import scan_audio_files
+
+
+def _transfer_one(f: Path, config, prefix: str, label: str, conv_label: str,
+                  transfers: list) -> tuple:
+    """Analyse and transfer one file. Returns (file event, error message | None).
+
+    Successful transfers are appended to `transfers` for analysis.carry_results().
+    """
+    bpm_val, key_val = analysis.analyse(f, config)
+
+    new_name, rel_sub = _compute_output(f, config.source, config.dest,
+                                        config.no_rename, config.struct_mode,
+                                        config.path_limit,
+                                        bpm=bpm_val, append_bpm=config.bpm_append,
+                                        key=key_val, append_key=config.key_append)
+
+    # Apply extension change if converting
+    if config.convert:
+        new_name = Path(new_name).stem + get_target_extension(config.convert.output_format)
+
+    sub_dir = config.dest / rel_sub if rel_sub else config.dest
+    target  = sub_dir / new_name
+    dest_display = f"{rel_sub}/{new_name}" if rel_sub else new_name
+    event = {
+        "event": "file", "src": str(f), "dst": str(target),
+        "bpm": bpm_val, "key": key_val,
+        "message": f"{prefix}{label}{conv_label}: {f.name}  →  {dest_display}",
+    }
+
+    if config.dry_run:
+        return event, None
+
+    # Capture what the caches know about `f` before a Move removes it.
+    fingerprint = analysis_cache.known_fingerprint(f)
+    embedded = (analysis.embeddable_results(f)
+                if config.embed_tags and fingerprint else (None, None))
+    sub_dir.mkdir(parents=True, exist_ok=True)
+    if config.convert:
+        try:
+            if not convert_file(f, target, **config.convert.as_kwargs()):
+                error_detail = pop_last_error() or "Unknown error"
+                return event, f"ERROR: Failed to convert {f.name}: {error_detail[:200]}"
+            if config.move_files:
+                f.unlink()  # Delete original after conversion
+        except Exception as e:
+            return event, f"ERROR: Failed to convert {f.name}: {e}"
+    else:
+        # Standard copy/move
+        if config.move_files:
+            with profiling.span("move"):
+                shutil.move(str(f), str(target))
+        else:
+            with profiling.span("copy"):
+                shutil.copy2(str(f), str(target))
+    tagged = config.embed_tags and audiotags.write_tags(target, *embedded)
+    transfers.append(analysis.Transfer(f, target, fingerprint, bool(config.convert or tagged)))
+    return event, None
+
+
+def _failed(f: Path, e: Exception) -> tuple:
+    """(event, error) for a file whose transfer raised `e`."""
+    event = {"event": "file", "src": str(f), "dst": "",
+             "bpm": None, "key": None, "message": f"ERROR: {f.name}"}
+    return event, f"ERROR: {f.name}: {type(e).__name__}: {e}"
+
+
+def run(config, files=None, emit=None) -> dict:
+    """
+    Analyse, rename and transfer files according to `config`.
+
+    `files` defaults to a scan of config.scan_roots.  config.workers > 1
+    processes files on a thread pool; analysis and conversion spend their
+    time in ffmpeg subprocesses, so threads scale well here.  With one
+    worker files are handled strictly in order.  Returns the summary dict
+    that is also emitted last.
+    """
+    if emit is None:
+        emit = lambda _event: None
+    if files is None:
+        files = scan_audio_files(config.scan_roots)
+
+    total  = len(files)
+    label  = "MOVE" if config.move_files else "COPY"
+    prefix = "[DRY] " if config.dry_run else ""
+    conv_label = " [convert]" if config.convert else ""
+    emit_lock = threading.Lock()
+    errors = 0
+    transfers = []
+
+    def _emit(event):
+        with emit_lock:
+            emit(event)
+
+    def _report(i, f, event, err):
+        nonlocal errors
+        for msg in analysis.drain_logs():
+            _emit({"event": "log", "message": msg})
+        event["index"] = i
+        event["total"] = total
+        _emit(event)
+        if err:
+            errors += 1
+            _emit({"event": "error", "src": str(f), "message": err})
+
+    analysis_cache.reset_stats()
+    if config.bpm_enabled or config.key_enabled:
+        with profiling.span("tags"):
+            tagged = analysis.resolve_tags(files)
+            named = analysis.resolve_names(files)
+        if tagged:
+            _emit({"event": "log",
+                   "message": f"[TAGS] {tagged} file(s) carry embedded BPM/key — not re-analysed"})
+        if named:
+            _emit({"event": "log",
+                   "message": f"[TAGS] {named} file(s) named with BPM/key — taken from the name"})
+
+    # Decode files that need analysis ahead of the loop, in ffmpeg batches.
+    pending = analysis.pending_decode(files, config)
+    with decoder.batched(pending, workers=max(2, config.workers)):
+        if config.workers <= 1:
+            for i, f in enumerate(files, 1):
+                try:
+                    event, err = _transfer_one(f, config, prefix, label, conv_label, transfers)
+                except Exception as e:
+                    event, err = _failed(f, e)
+                _report(i, f, event, err)
+        else:
+            with ThreadPoolExecutor(max_workers=config.workers) as pool:
+                futures = {pool.submit(_transfer_one, f, config, prefix, label, conv_label,
+                                       transfers): f
+                           for f in files}
+                for i, fut in enumerate(as_completed(futures), 1):
+                    f = futures[fut]
+                    try:
+                        event, err = fut.result()
+                    except Exception as e:
+                        event, err = _failed(f, e)
+                    _report(i, f, event, err)
+
+    analysis.carry_results(transfers, config)
+    analysis.flush_caches(config)
+    for msg in analysis.drain_logs():
+        _emit({"event": "log", "message": msg})
+    cache_stats = analysis_cache.stats()
+    for field, counts in cache_stats.items():
+        lookups = counts["hits"] + counts["misses"]
+        _emit({"event": "log",
+               "message": f"[CACHE] {field}: {counts['hits']} hits, {counts['misses']} misses "
+                          f"({counts['hits'] / lookups:.0%} hit rate)"})
+
+    # Moved files are only found at their targets now.
+    moved = {t.src: t.dst for t in transfers} if config.move_files else {}
+    bpm_detected, key_detected = analysis.count_detected([moved.get(f, f) for f in files], config)
+    summary = {
+        "event": "summary",
+        "total": total,
+        "processed": total - errors,
+        "errors": errors,
+        "bpm_detected": bpm_detected,
+        "key_detected": key_detected,
+        "cache": cache_stats,
+    }
+    _emit(summary)
+    return summary
@@ -0,0 +1,123 @@
+"""
+Background BPM/key analysis while the app sits idle.
+
+Deck B hands the scheduler every file of the current scan; a single
+low-priority worker thread analyses the ones without a cached result, one
+file at a time:
+
+  * files in the Deck B viewport first (preview re-sends them as the user
+    scrolls), then the rest of the scan in display order;
+  * a short gap between files keeps ffmpeg from hogging the machine;
+  * nothing runs while a Run is active or audio is playing — both share
+    the decoder and the disk with us and matter more.
+
+Results are reported through the `on_result(path, bpm, key)` callback on
+the worker thread; the caller marshals them onto the Tk thread.
+"""
+
+import threading
+import time
+from collections import deque
+
+import analysis_cache
+import bpm as bpm_module
+import constants
+import key as key_module
+import state
+
+_cond = threading.Condition()
+_order: deque = deque()       # remaining files in display order
+_pending: set = set()         # str(path) of files still to analyse
+_priority: list = []          # viewport files, analysed before _order
+_job = None                   # (generation, want_bpm, want_key, bpm_backend, on_result)
+_generation = 0
+_worker = None
+
+
+def _busy() -> bool:
+    return state._run_active or state._is_playing
+
+
+def _needs(path, want_bpm: bool, want_key: bool) -> tuple:
+    return (want_bpm and bpm_module.get_cached_bpm(path) is None,
+            want_key and key_module.get_cached_key(path) is None)
+
+
+def start(files, want_bpm: bool, want_key: bool, on_result,
+          bpm_backend: str = bpm_module.DEFAULT_BACKEND):
+    """Replace the queue with `files`; analyse the enabled fields in the background."""
+    global _job, _generation, _worker
+    with _cond:
+        _generation += 1
+        _order.clear()
+        _pending.clear()
+        _priority.clear()
+        _job = None
+        if want_bpm or want_key:
+            _order.extend(files)
+            _pending.update(str(f) for f in files)
+            _job = (_generation, want_bpm, want_key, bpm_backend, on_result)
+        if _worker is None:
+            _worker = threading.Thread(target=_run, name="sampson-idle-analysis", daemon=True)
+            _worker.start()
+        _cond.notify()
+
+
+def stop():
+    """Drop everything still queued."""
+    start([], False, False, None)
+
+
+def active() -> bool:
+    """True while files are still queued."""
+    with _cond:
+        return _job is not None and bool(_pending)
+
+
+def prioritise(paths):
+    """Analyse `paths` (the rows on screen) before the rest of the queue."""
+    with _cond:
+        _priority[:] = [p for p in paths if str(p) in _pending]
+        if _priority:
+            _cond.notify()
+
+
+def _next():
+    # Caller holds _cond.
+    for source in (_priority, _order):
+        while source:
+            path = source.pop(0) if source is _priority else source.popleft()
+            if str(path) in _pending:
+                _pending.discard(str(path))
+                return path
+    return None
+
+
+def _run():
+    while True:
+        with _cond:
+            while _job is None or not _pending or _busy():
+                # Run/playback state changes aren't signalled: poll while busy.
+                _cond.wait(timeout=constants.IDLE_ANALYSIS_POLL_MS / 1000 if _pending else None)
+            path = _next()
+            job = _job
+        if path is None:
+            continue
+        generation, want_bpm, want_key, bpm_backend, on_result = job
+        need_bpm, need_key = _needs(path, want_bpm, want_key)
+        if not (need_bpm or need_key):
+            continue
+        # Idle results don't belong in a Run's log — and a Run may be reading
+        # the shared buffers right now, so leave them alone.
+        with bpm_module.quiet_log(), key_module.quiet_log():
+            bpm_val = bpm_module.detect_bpm(path, backend=bpm_backend) if need_bpm else None
+            key_val = key_module.detect_key(path) if need_key else None
+        with _cond:
+            current = generation == _generation
+            drained = not _pending
+        if current and (bpm_val is not None or key_val is not None):
+            on_result(path, bpm_val, key_val)
+        if drained:
+            with bpm_module.quiet_log(), key_module.quiet_log():
+                analysis_cache.flush_all()
+        time.sleep(constants.IDLE_ANALYSIS_GAP_MS / 1000)
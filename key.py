@@ -2,23 +2,21 @@
 Musical key detection and cache management.
 
 Uses pitch-period autocorrelation to detect the root pitch class.
-Pure Python implementation - no FFT, no numpy.
+No FFT, no numpy: the per-lag dot products run in C via audioop (pcm.py).
 """
 
-import json
 import math
-import os
+import threading
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional, Tuple
 
-from conversion import _find_ffmpeg_path
+import constants
+import pcm
+import profiling
+from analysis_cache import AnalysisCache
 
 # ── Cache ─────────────────────────────────────────────────────────────────────
-_CACHE_DIR = Path.home() / ".sampson"
-_CACHE_FILE = _CACHE_DIR / "key_cache.json"
-_cache: dict = {}
-_cache_dirty = False
-_cache_loaded = False
 _log_messages: list = []
 
 NOTE_NAMES = ["C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B"]
@@ -41,95 +39,81 @@ _PITCH_FREQUENCIES = {
 }
 
 
+_quiet = threading.local()      # per-thread: drop this thread's messages
+
+
 def _log(msg):
-    _log_messages.append(msg)
+    if not getattr(_quiet, "on", False):
+        _log_messages.append(msg)
 
 
 def get_log_messages():
     global _log_messages
     msgs = _log_messages.copy()
-    _log_messages.clear()
+    del _log_messages[:len(msgs)]
     return msgs
 
 
-def _load_cache():
-    global _cache, _cache_loaded
-    if _cache_loaded:
-        return
-    _cache_loaded = True
+@contextmanager
+def quiet_log():
+    """Drop the calling thread's log messages inside the block.
+
+    For background analysis, which must neither add to nor drain the
+    buffer a Run is reading.
+    """
+    _quiet.on = True
     try:
-        if _CACHE_FILE.exists():
-            _cache = json.loads(_CACHE_FILE.read_text(encoding="utf-8"))
-            _log(f"[KEY] Loaded cache: {len(_cache)} entries")
-    except Exception:
-        _cache = {}
+        yield
+    finally:
+        _quiet.on = False
 
 
-def _entry_valid(path):
-    key = str(path)
-    if key not in _cache:
-        return False
-    try:
-        return _cache[key]["mtime"] == path.stat().st_mtime
-    except Exception:
-        return False
+# Detector versions, stored with every analysed result.  Bump one when its
+# results change: only that detector's cached results are re-analysed.
+VERSIONS = {"autocorr": 1}
 
+_cache = AnalysisCache("key_cache.json", "key", "[KEY]", _log,
+                       versions=VERSIONS, legacy_algorithm="autocorr/1")
 
-def _store(path, key_val):
-    global _cache_dirty
-    try:
-        _cache[str(path)] = {"mtime": path.stat().st_mtime, "key": key_val}
-        _cache_dirty = True
-    except Exception:
-        pass
+
+def _load_cache():
+    _cache.load()
 
 
-def _get_pydub():
-    from pydub import AudioSegment
-    ffmpeg_path = _find_ffmpeg_path()
-    if ffmpeg_path:
-        AudioSegment.converter = ffmpeg_path
-        ffmpeg_dir = os.path.dirname(ffmpeg_path)
-        current_path = os.environ.get('PATH', '')
-        if ffmpeg_dir not in current_path:
-            os.environ['PATH'] = ffmpeg_dir + os.pathsep + current_path
-    return AudioSegment
+def store_key(path: Path, key_val: str, source: str = "analysis",
+              estimate: Optional[pcm.Estimate] = None) -> bool:
+    """Cache a key result for `path` (False if the file is unreadable).
+
+    An analysed result also records the detector `estimate`'s confidence and
+    candidates, and the detector version that produced it.
+    """
+    if estimate is None:
+        return _cache.put(path, key_val, source)
+    return _cache.put(path, key_val, source, estimate.confidence,
+                      _cache.algorithm(DEFAULT_BACKEND), estimate.candidates)
 
 
 # ── Detection Algorithm ───────────────────────────────────────────────────────
 
-def _calculate_autocorrelation_at_lag(samples, lag):
-    """Calculate autocorrelation at a specific lag."""
-    if lag <= 0 or lag >= len(samples):
-        return 0.0
-    
-    n = len(samples) - lag
-    if n <= 0:
-        return 0.0
-    
-    # Sum of products
-    corr = sum(samples[i] * samples[i + lag] for i in range(n))
-    
-    # Normalize
-    sum_sq = sum(s * s for s in samples[:n])
-    if sum_sq > 0:
-        corr = corr / sum_sq
-    
-    return corr
+def _prepare_audio(audio) -> pcm.Pcm:
+    """First 30 s of `audio` as mono PCM at ≤ 8000 Hz — the detector's input."""
+    return pcm.from_segment(audio, 30000, max_rate=8000)
 
 
-def _detect_key_algorithm(audio) -> Optional[str]:
+def _detect_key_algorithm(audio) -> pcm.Estimate:
     """
     Detect musical key using pitch-period autocorrelation.
     
     For each of the 12 pitch classes, compute autocorrelation at lags
     corresponding to that pitch across octaves 2-5, then take argmax.
+    The confidence is the normalised chroma margin between the best and
+    the second-best pitch class; candidates are the strongest pitch classes.
     """
-    samples = audio.get_array_of_samples()
-    sample_rate = audio.frame_rate
+    sample_rate = audio.rate
+    n_samples = audio.frame_count()
     
-    if len(samples) < sample_rate // 4:   # need at least 0.25s at 8000 Hz
-        return None
+    if n_samples < sample_rate // 4:   # need at least 0.25s at 8000 Hz
+        return pcm.Estimate()
     
     # Calculate chroma vector (12 pitch classes)
     chroma = [0.0] * 12
@@ -143,8 +127,8 @@ def _detect_key_algorithm(audio) -> Optional[str]:
             period = sample_rate / freq
             lag = int(round(period))
             
-            if lag > 0 and lag < len(samples) // 2:
-                energy = _calculate_autocorrelation_at_lag(samples, lag)
+            if lag > 0 and lag < n_samples // 2:
+                energy = pcm.lag_correlation(audio.data, lag)
                 # Weight by inverse frequency (lower frequencies often stronger)
                 total_energy += max(0, energy) * (1.0 / math.sqrt(freq))
         
@@ -157,71 +141,93 @@ def _detect_key_algorithm(audio) -> Optional[str]:
     
     # Find argmax
     if max(chroma) < 0.1:  # Too weak signal
-        return None
+        return pcm.Estimate()
     
-    best_pitch = chroma.index(max(chroma))
-    return NOTE_NAMES[best_pitch]
+    ranked = sorted(zip(NOTE_NAMES, chroma), key=lambda c: c[1], reverse=True)
+    return pcm.Estimate(ranked[0][0], ranked[0][1] - ranked[1][1],
+                        tuple(ranked[:constants.ANALYSIS_CANDIDATES]))
+
+
+# Detector backends by name; each returns a pcm.Estimate.
+# detect_key() uses the default; the detector corpus
+# (benchmarks/detectors.py) runs every entry.
+DEFAULT_BACKEND = "autocorr"
+BACKENDS = {
+    "autocorr": _detect_key_algorithm,
+}
 
 
 # ── Public API ─────────────────────────────────────────────────────────────────
 
-def get_cached_key(path):
-    _load_cache()
-    if _entry_valid(path):
-        return _cache[str(path)]["key"]
-    return None
+def get_cached_key(path, indexed_only: bool = False):
+    return _cache.get(path, indexed_only)
+
+
+def get_cached_source(path) -> Optional[str]:
+    """Where the cached key came from: "analysis", "tag", "manual" (None if unknown)."""
+    entry = _cache.get_entry(path)
+    return entry.get("source") if entry else None
+
 
+def get_cached_candidates(path) -> List[Tuple[str, float]]:
+    """[(note, score)] the detector weighed for `path`, best first ([] if none cached)."""
+    entry = _cache.get_entry(path)
+    return [(n, s) for n, s in entry.get("candidates", [])] if entry else []
 
+
+@profiling.timed("detect_key")
 def detect_key(path, force=False):
     _load_cache()
     if not force:
         cached = get_cached_key(path)
+        _cache.count(cached is not None)
         if cached is not None:
             _log(f"[KEY] CACHE: {path.name} = {cached}")
             return cached
+
+    # Embedded tags are authoritative — even a fresh scan doesn't re-analyse them.
+    import audiotags   # header-only read; deferred like the decoder
+    tags = audiotags.read_tags(path)
+    if tags and tags.key is not None:
+        _log(f"[KEY] TAG ({tags.source}): {path.name} = {tags.key}")
+        store_key(path, tags.key, source="tag")
+        return tags.key
     
     _log(f"[KEY] Analyzing: {path.name}")
     
-    if not _find_ffmpeg_path():
+    from conversion import check_ffmpeg   # deferred: keeps import of this module light
+    import decoder
+    if not check_ffmpeg():
         _log(f"[KEY] ERROR: ffmpeg not found")
         return None
     
     try:
-        AudioSegment = _get_pydub()
-        
-        fmt = Path(path).suffix.lower().lstrip('.')
-        if fmt == 'aif':
-            fmt = 'aiff'
-        
         try:
-            audio = AudioSegment.from_file(str(path), format=fmt)
+            with profiling.span("key.decode"):
+                audio = decoder.load(path)
         except Exception as e:
             _log(f"[KEY] ERROR: Load failed - {e}")
             return None
         
-        # Convert to mono
-        audio = audio.set_channels(1)
-        
-        # Downsample to 8000 Hz for faster processing
-        if audio.frame_rate > 8000:
-            audio = audio.set_frame_rate(8000)
-        
-        # Analyze first 30 seconds
-        if len(audio) > 30000:
-            audio = audio[:30000]
+        audio = _prepare_audio(audio)
 
-        if len(audio) < 250:   # < 250 ms after downsampling
-            _log(f"[KEY] {path.name}: too short ({len(audio)} ms), skipping")
+        if audio.duration_ms() < 250:   # < 250 ms after downsampling
+            _log(f"[KEY] {path.name}: too short ({audio.duration_ms()} ms), skipping")
             return None
 
-        key_val = _detect_key_algorithm(audio)
+        with profiling.span("key.analysis"):
+            estimate, analysed_ms = pcm.progressive(
+                audio, BACKENDS[DEFAULT_BACKEND], constants.ANALYSIS_WINDOWS_MS,
+                str.__eq__, constants.KEY_MIN_CONFIDENCE)
+        key_val = estimate.value
 
         if key_val is None:
             _log(f"[KEY] {path.name}: no clear pitch detected (likely percussion)")
             return None
         
-        _log(f"[KEY] DETECTED: {key_val}")
-        _store(path, key_val)
+        _log(f"[KEY] DETECTED: {key_val} "
+             f"(confidence {estimate.confidence:.2f}, {analysed_ms / 1000:.0f} s analysed)")
+        store_key(path, key_val, estimate=estimate)
         return key_val
         
     except Exception as e:
@@ -248,8 +254,11 @@ def set_cached_key(path: Path, key_val: str) -> bool:
             else:
                 raise ValueError(f"Invalid key: {key_val}")
         
-        _cache[str(path)] = {"mtime": path.stat().st_mtime, "key": key_val}
-        _cache_dirty = True
+        # Keep the detector's candidates as a second opinion for later edits.
+        entry = _cache.get_entry(path) or {}
+        if not _cache.put(path, key_val, "manual", algorithm=entry.get("algorithm"),
+                          candidates=entry.get("candidates")):
+            raise OSError(f"cannot read {path}")
         _log(f"[KEY] MANUAL: {path.name} = {key_val}")
         return True
     except Exception as e:
@@ -258,14 +267,4 @@ def set_cached_key(path: Path, key_val: str) -> bool:
 
 
 def flush_cache():
-    global _cache_dirty
-    if not _cache_dirty:
-        _log(f"[KEY] Cache unchanged")
-        return
-    try:
-        _CACHE_DIR.mkdir(parents=True, exist_ok=True)
-        _CACHE_FILE.write_text(json.dumps(_cache, indent=2), encoding="utf-8")
-        _cache_dirty = False
-        _log(f"[KEY] Cache saved: {len(_cache)} entries")
-    except Exception as e:
-        _log(f"[KEY] ERROR: Cache save failed - {e}")
+    _cache.flush()
@@ -0,0 +1,97 @@
+"""
+BPM / root-note hints parsed from file and folder names.
+
+Sample packs routinely encode tempo and key in their names —
+`Loop_Break_174bpm_Fm.wav`, `Bass C# 120 BPM.wav`, `Pads/Am/…` — so a
+tokenizer over the stem and the two nearest parent folders gives a result
+for free, without opening the file.
+
+Only unambiguous tokens count:
+
+  * BPM  — a number carrying a `bpm` marker: `174bpm`, `bpm174`, `174 BPM`
+  * key  — a note with an accidental or a quality (`C#`, `Eb`, `Fm`,
+           `Amin`, `Dmaj`, `A minor`), or a bare capital letter right after a BPM
+           token or a `key` marker (`120bpm_A`, `key_F`).  Bare letters
+           elsewhere are usually variations (`Kick_A`, `Snare_B`).
+
+Keys are reduced to their root pitch class, matching key detection.
+The file name wins over its folders, the nearest folder over the next.
+"""
+
+import re
+from pathlib import Path
+from typing import Optional
+
+from audiotags import BPM_RANGE, Tags
+from key import NOTE_NAMES
+
+_SPLIT = re.compile(r"[\s_\-,+()\[\]{}]+")
+_BPM_JOINED = re.compile(r"^(?:(\d{2,3}(?:\.\d+)?)bpm|bpm(\d{2,3}(?:\.\d+)?))$", re.I)
+_NUMBER = re.compile(r"^\d{2,3}(?:\.\d+)?$")
+_NOTE = re.compile(r"^([A-Ga-g])(#|♯|b|♭|sharp|flat)?(m|min|minor|maj|major)?$")
+_SPELLED = {"min", "minor", "maj", "major"}
+
+_FLATS = {"C": "B", "D": "C#", "E": "D#", "F": "E", "G": "F#", "A": "G#", "B": "A#"}
+_FOLDER_DEPTH = 2
+
+
+def _bpm(tokens: list) -> tuple:
+    """Return (bpm | None, index of the token that carried it)."""
+    for i, tok in enumerate(tokens):
+        m = _BPM_JOINED.match(tok)
+        value = m and (m.group(1) or m.group(2))
+        if not value and tok.lower() == "bpm" and i and _NUMBER.match(tokens[i - 1]):
+            value = tokens[i - 1]
+        if value and BPM_RANGE[0] <= float(value) <= BPM_RANGE[1]:
+            return float(value), i
+    return None, -1
+
+
+def _note(tok: str, bare_ok: bool) -> Optional[str]:
+    m = _NOTE.match(tok)
+    if not m:
+        return None
+    letter, accidental, quality = m.group(1), m.group(2), m.group(3)
+    if letter.islower() and quality not in _SPELLED:
+        return None                          # "am", "eb", "dm" — too word-like
+    if not (accidental or quality or bare_ok):
+        return None
+    letter = letter.upper()
+    if accidental in ("b", "♭", "flat"):
+        return _FLATS[letter]
+    if accidental in ("#", "♯", "sharp"):
+        return NOTE_NAMES[(NOTE_NAMES.index(letter) + 1) % 12]
+    return letter
+
+
+def _key(tokens: list, bpm_at: int) -> Optional[str]:
+    for i, tok in enumerate(tokens):
+        after_marker = i > 0 and (i - 1 == bpm_at or tokens[i - 1].lower() == "key")
+        nxt = tokens[i + 1].lower() if i + 1 < len(tokens) else ""
+        if nxt in _SPELLED and len(tok) <= 2:      # "A minor", "F# maj"
+            tok += nxt
+        note = _note(tok, bare_ok=after_marker)
+        if note:
+            return note
+    return None
+
+
+def parse_name(text: str) -> tuple:
+    """Return (bpm | None, key | None) found in one file or folder name."""
+    tokens = [t for t in _SPLIT.split(text) if t]
+    bpm, bpm_at = _bpm(tokens)
+    return bpm, _key(tokens, bpm_at)
+
+
+def name_tags(path: Path) -> Optional[Tags]:
+    """BPM/key hinted by `path`'s name or its nearest folders, or None."""
+    bpm = key = None
+    for name in [path.stem] + [p.name for p in list(path.parents)[:_FOLDER_DEPTH]]:
+        b, k = parse_name(name)
+        bpm = bpm if bpm is not None else b
+        key = key if key is not None else k
+        if bpm is not None and key is not None:
+            break
+    if bpm is None and key is None:
+        return None
+    return Tags(bpm, key, "filename")
@@ -0,0 +1,104 @@
+"""
+Spectral-flux onset envelope and comb-filter tempo scoring — needs NumPy.
+
+bpm.py's default detector reads a 10 ms RMS envelope, which smears
+transients together; on pads, plucks and other non-drum material the beat
+is often only visible as a change in the spectrum.  This detector:
+
+  1. box-filters the mono PCM down to ~11 kHz (onsets live well below that);
+  2. takes a strided STFT — a sliding_window_view stepped by the hop, so the
+     frames are a view, not a copy — and measures spectral flux: the summed
+     increase in log magnitude from one frame to the next (~11.6 ms hops);
+  3. autocorrelates that onset envelope with one FFT;
+  4. scores every candidate tempo on a fine log grid with a comb: the
+     autocorrelation at 1…4 beat periods, minus the strongest
+     autocorrelation at the halves and thirds between them.  The penalty is
+     what separates a tempo from its half or third: there the "between"
+     points land on real beats.
+
+NumPy is optional: bpm.py registers this backend only when it is installed
+and imports this module on first use.
+"""
+
+from typing import Optional, Tuple
+
+import numpy as np
+
+_TARGET_RATE = 11025          # analysis rate after box-filter decimation
+_N_FFT = 256                  # ~23 ms window at 11 kHz
+_HOP = 128                    # ~11.6 ms hop
+_LOG_GAIN = 100.0 / 32768     # log(1 + γ·|X|) compression, on 16-bit sample values
+_LOCAL_MEAN_S = 0.5           # onset envelope detrending window
+_COMB_TEETH = 4
+_SUBDIVISIONS = (1 / 2, 1 / 3, 2 / 3)   # between-beat points that must stay quiet
+_BPM_MIN, _BPM_MAX = 60.0, 200.0
+_GRID_STEP = 0.0025           # relative spacing of candidate tempos (0.25 %)
+
+
+def _decimate(x: np.ndarray, rate: int) -> tuple:
+    factor = max(1, rate // _TARGET_RATE)
+    if factor == 1:
+        return x, rate
+    n = len(x) // factor * factor
+    return x[:n].reshape(-1, factor).mean(axis=1), rate / factor
+
+
+def onset_envelope(audio) -> tuple:
+    """(spectral-flux envelope, frames per second) of mono 16-bit Pcm `audio`."""
+    x, rate = _decimate(np.frombuffer(audio.data, dtype="<i2").astype(np.float32), audio.rate)
+    if len(x) < _N_FFT + _HOP:
+        return np.zeros(0, dtype=np.float32), rate / _HOP
+    frames = np.lib.stride_tricks.sliding_window_view(x, _N_FFT)[::_HOP]
+    spec = np.abs(np.fft.rfft(frames * np.hanning(_N_FFT).astype(np.float32), axis=1))
+    spec = np.log1p(_LOG_GAIN * spec)
+    flux = np.maximum(np.diff(spec, axis=0), 0.0).sum(axis=1)
+    fps = rate / _HOP
+    width = max(1, int(_LOCAL_MEAN_S * fps))
+    local_mean = np.convolve(flux, np.ones(width) / width, mode="same")
+    return np.maximum(flux - local_mean, 0.0), fps
+
+
+def _autocorrelation(env: np.ndarray, max_lag: int) -> np.ndarray:
+    n = len(env)
+    spectrum = np.fft.rfft(env - env.mean(), 2 * n)
+    r = np.fft.irfft(spectrum * np.conj(spectrum))[:max_lag + 1]
+    r /= n - np.arange(max_lag + 1)              # unbiased: long lags overlap less
+    return r / r[0] if r[0] > 0 else np.zeros_like(r)
+
+
+def tempo_scores(env: np.ndarray, fps: float) -> tuple:
+    """(candidate BPMs, comb scores) on a log grid over 60–200 BPM."""
+    bpms = _BPM_MIN * np.exp(np.arange(0.0, np.log(_BPM_MAX / _BPM_MIN) + 1e-9, _GRID_STEP))
+    periods = 60.0 * fps / bpms                                  # frames per beat
+    teeth = np.arange(1, _COMB_TEETH + 1)
+    max_lag = int(np.ceil(periods[0] * _COMB_TEETH)) + 1
+    if len(env) < max_lag + fps:               # need ≥ 1 s of overlap at the longest lag
+        return bpms, None
+    r = _autocorrelation(env, max_lag)
+    lags = np.arange(len(r))
+    on = np.interp(np.outer(periods, teeth), lags, r)
+    off = np.max([np.interp(np.outer(periods, teeth - f), lags, r) for f in _SUBDIVISIONS], axis=0)
+    return bpms, (on - off).mean(axis=1)
+
+
+def detect_bpm(audio) -> Tuple[Optional[float], float, list]:
+    """(tempo | None, confidence, peaks) of mono Pcm `audio` from its onsets.
+
+    The confidence is the winning comb score, clipped to 0–1; `peaks` are
+    [(bpm, score)]: the winner — even when it sits on the edge of the tempo
+    range — then the other local maxima of the score curve, best first.
+    """
+    env, fps = onset_envelope(audio)
+    if not env.any():
+        return None, 0.0, []
+    bpms, scores = tempo_scores(env, fps)
+    if scores is None:
+        return None, 0.0, []
+    best = int(np.argmax(scores))
+    if scores[best] <= 0:
+        return None, 0.0, []
+    inner = np.flatnonzero((scores[1:-1] > scores[:-2]) & (scores[1:-1] >= scores[2:])) + 1
+    order = inner[np.argsort(scores[inner])[::-1]]
+    peaks = [(float(bpms[i]), float(scores[i]))
+             for i in [best] + [i for i in order if i != best] if scores[i] > 0]
+    return round(float(bpms[best]), 1), min(1.0, float(scores[best])), peaks
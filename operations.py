@@ -1,192 +1,65 @@
-import shutil
 import threading
-from pathlib import Path
 from tkinter import messagebox
 
 import state
 import theme
-import constants
-import bpm as bpm_module
-import key as key_module
+import engine
+import profiling
 from log_panel import log
-from conversion import (
-    check_ffmpeg, convert_file, get_target_extension,
-    parse_sample_rate, parse_bit_depth, parse_channels
-)
+from conversion import check_ffmpeg
 
 
-def _apply_path_limit(new_name: str, dest_path_str: str, limit: int,
-                      protect_suffixes: list = None) -> str:
-    """
-    Truncate new_name so that the full destination path stays within `limit` chars.
-
-    The extension is always preserved; only the stem is shortened.
-    protect_suffixes (e.g. ["_120bpm", "_C#"]) are kept intact at the end of the stem.
-    """
-    if protect_suffixes is None:
-        protect_suffixes = []
-    
-    full = str(Path(dest_path_str) / new_name)
-    if len(full) <= limit:
-        return new_name
-    p     = Path(new_name)
-    ext   = p.suffix
-    total_protect_len = sum(len(s) for s in protect_suffixes)
-    avail = limit - len(str(Path(dest_path_str))) - 1 - len(ext) - total_protect_len
-    if avail < 1:
-        avail = 1
-    stem = p.stem
-    
-    # Remove all protected suffixes from stem (in reverse order to handle overlaps)
-    for suffix in sorted(protect_suffixes, key=len, reverse=True):
-        if stem.endswith(suffix):
-            stem = stem[:-len(suffix)]
-    
-    # Reconstruct with all protected suffixes
-    all_suffixes = "".join(protect_suffixes)
-    return stem[:avail] + all_suffixes + ext
-
-
-def _compute_output(f: Path, source_root: Path, dest: Path,
-                    no_rename: bool, struct_mode: str,
-                    path_limit, bpm=None, append_bpm=False,
-                    key=None, append_key=False) -> tuple:
-    """
-    Return (new_filename, rel_subfolder) for a single source file.
-
-    new_filename  — the final filename written to disk
-    rel_subfolder — subfolder relative to dest where the file lands:
-                    ""            flat mode  (file goes directly in dest/)
-                    "Kicks"       parent mode (file goes in dest/Kicks/)
-                    "Kicks/808"   mirror mode (file goes in dest/Kicks/808/)
-
-    struct_mode is one of "flat", "mirror", "parent".
-    path_limit is int | None (from the active hardware profile).
-    bpm / append_bpm control the optional _120bpm suffix.
-    key / append_key control the optional _C suffix.
-    """
-    # Filename
-    new_name = f.name if no_rename else f"{f.parent.name}_{f.name}"
-
-    # Subfolder
-    if struct_mode == "mirror":
-        try:
-            rel_sub = str(f.parent.relative_to(source_root))
-        except ValueError:
-            rel_sub = ""
-        if rel_sub == ".":
-            rel_sub = ""
-    elif struct_mode == "parent":
-        rel_sub = f.parent.name if f.parent != source_root else ""
-    else:                          # "flat" or unrecognised
-        rel_sub = ""
-
-    # BPM suffix (applied before path-limit truncation so it can be protected)
-    bpm_suffix = f"_{int(round(bpm))}bpm" if (bpm is not None and append_bpm) else ""
-    if bpm_suffix:
-        p        = Path(new_name)
-        new_name = p.stem + bpm_suffix + p.suffix
-
-    # Key suffix (applied before path-limit truncation so it can be protected)
-    key_suffix = f"_{key}" if (key is not None and append_key) else ""
-    if key_suffix:
-        p        = Path(new_name)
-        new_name = p.stem + key_suffix + p.suffix
-
-    # Path limit
-    effective_dest = str(Path(dest) / rel_sub) if rel_sub else str(dest)
-    if path_limit is not None:
-        protect_suffixes = []
-        if bpm_suffix:
-            protect_suffixes.append(bpm_suffix)
-        if key_suffix:
-            protect_suffixes.append(key_suffix)
-        new_name = _apply_path_limit(new_name, effective_dest, path_limit,
-                                     protect_suffixes=protect_suffixes)
-
-    return new_name, rel_sub
-
-
-def run_tool():
-    source = Path(state.active_dir_var.get().strip()) if state.active_dir_var.get().strip() else None
-    dest   = Path(state.dest_var.get().strip())
-
-    if not source or not source.is_dir():
+def run_tool(config):
+    """Validate a RunConfig built by builders.collect_run_config() and start the worker."""
+    if not config.source or not config.source.is_dir():
         messagebox.showerror("Error",
             "Please navigate to a source directory in Deck A.", parent=state.root)
         return
-    if not dest.is_dir():
+    if not config.dest or not config.dest.is_dir():
         messagebox.showerror("Error",
             "Please select a valid destination folder in Deck B.", parent=state.root)
         return
 
-    if not state._selected_folders:
+    if not config.folders:
         messagebox.showwarning("No selection",
             "Please check at least one folder in Deck A.", parent=state.root)
         return
 
+    if config.convert and not check_ffmpeg():
+        messagebox.showerror(
+            "Conversion Error",
+            "ffmpeg is required for audio conversion.\n\n"
+            "Install:\n"
+            "- Windows: Download from ffmpeg.org and add to PATH\n"
+            "- macOS: brew install ffmpeg\n"
+            "- Linux: sudo apt install ffmpeg",
+            parent=state.root
+        )
+        return
+
     state.run_btn.configure(state="disabled")
     state.run_btn.configure(text="Running\u2026")
     if state._status_dot:
         state._status_dot.configure(text_color=theme.CYAN)
     state.progress_var.set(0)
     state.status_var.set("Collecting files\u2026")
-    path_limit  = constants.PROFILES[state.profile_var.get()]["path_limit"]
-    struct_mode = state.struct_mode_var.get()
-    
-    # Build conversion options if enabled
-    convert_options = None
-    if state.convert_enabled_var and state.convert_enabled_var.get():
-        if not check_ffmpeg():
-            messagebox.showerror(
-                "Conversion Error",
-                "ffmpeg is required for audio conversion.\n\n"
-                "Install:\n"
-                "- Windows: Download from ffmpeg.org and add to PATH\n"
-                "- macOS: brew install ffmpeg\n"
-                "- Linux: sudo apt install ffmpeg",
-                parent=state.root
-            )
-            state.run_btn.configure(text="Run", state="normal")
-            return
-        
-        convert_options = {
-            "output_format": state.convert_format_var.get(),
-            "sample_rate": parse_sample_rate(state.convert_sample_rate_var.get()),
-            "bit_depth": parse_bit_depth(state.convert_bit_depth_var.get()),
-            "channels": parse_channels(state.convert_channels_var.get()),
-            "normalize": state.convert_normalize_var.get() if state.convert_normalize_var else False,
-        }
-    
-    bpm_enabled = state.bpm_enabled_var.get() if state.bpm_enabled_var else False
-    bpm_append  = state.bpm_append_var.get()  if state.bpm_append_var  else False
-    bpm_fresh   = state.bpm_fresh_var.get()   if state.bpm_fresh_var   else False
+    state._run_active = True
+
+    threading.Thread(target=profiling.maybe_cprofile, args=(_run_worker, config),
+                     daemon=True).start()
 
-    key_enabled = state.key_enabled_var.get() if state.key_enabled_var else False
-    key_append  = state.key_append_var.get()  if state.key_append_var  else False
-    key_fresh   = state.key_fresh_var.get()   if state.key_fresh_var   else False
 
-    threading.Thread(
-        target=_run_worker,
-        args=(source, dest, state.move_var.get(), state.dry_var.get(),
-              path_limit, not state.modify_names_var.get(), struct_mode, convert_options,
-              bpm_enabled, bpm_append, bpm_fresh, key_enabled, key_append, key_fresh),
-        daemon=True,
-    ).start()
+def _run_finished():
+    state._run_active = False
 
 
-def _run_worker(source, dest, move_files, dry, path_limit, no_rename, struct_mode,
-                convert_options=None, bpm_enabled=False, bpm_append=False, bpm_fresh=False,
-                key_enabled=False, key_append=False, key_fresh=False):
-    files = []
-    for folder_path in state._selected_folders:
-        p = Path(folder_path)
-        if p.is_dir():
-            files += [f for f in p.rglob("*")
-                      if f.suffix.lower() in constants.AUDIO_EXTS and f.is_file()]
+def _run_worker(config):
+    profiling.reset()
+    files = engine.scan_audio_files(config.scan_roots)
     total = len(files)
 
     if total == 0:
+        state.root.after(0, _run_finished)
         state.root.after(0, lambda: state.status_var.set("No audio files found."))
         state.root.after(0, lambda: state.run_btn.configure(text="Run"))
         state.root.after(0, lambda: state.run_btn.configure(state="normal"))
@@ -194,93 +67,42 @@ def _run_worker(source, dest, move_files, dry, path_limit, no_rename, struct_mod
             state.root.after(0, lambda: state._status_dot.configure(text_color=theme.FG_DIM))
         return
 
-    label  = "MOVE" if move_files else "COPY"
-    prefix = "[DRY] " if dry else ""
-    conv_label = " [convert]" if convert_options else ""
-
-    for i, f in enumerate(files, 1):
-        bpm_val = bpm_module.detect_bpm(f, force=bpm_fresh) if bpm_enabled else None
-        
-        # Output any BPM detection log messages
-        for bpm_log_msg in bpm_module.get_log_messages():
-            state.root.after(0, lambda m=bpm_log_msg: log(m))
-        
-        key_val = key_module.detect_key(f, force=key_fresh) if key_enabled else None
-        
-        # Output any Key detection log messages
-        for key_log_msg in key_module.get_log_messages():
-            state.root.after(0, lambda m=key_log_msg: log(m))
-        
-        new_name, rel_sub = _compute_output(f, source, dest,
-                                            no_rename, struct_mode, path_limit,
-                                            bpm=bpm_val, append_bpm=bpm_append,
-                                            key=key_val, append_key=key_append)
-        
-        # Apply extension change if converting
-        if convert_options:
-            new_name = Path(new_name).stem + get_target_extension(
-                convert_options["output_format"])
-        
-        sub_dir = dest / rel_sub if rel_sub else dest
-        target  = sub_dir / new_name
-        dest_display = f"{rel_sub}/{new_name}" if rel_sub else new_name
-        msg = f"{prefix}{label}{conv_label}: {f.name}  \u2192  {dest_display}"
-
-        state.root.after(0, lambda m=msg: log(m))
-        state.root.after(0, lambda pct=int(i / total * 100): state.progress_var.set(pct))
-        state.root.after(0, lambda s=f"Processing {i} / {total}\u2026": state.status_var.set(s))
-
-        if not dry:
-            sub_dir.mkdir(parents=True, exist_ok=True)
-            
-            if convert_options:
-                # Convert file
-                try:
-                    success = convert_file(f, target, **convert_options)
-                    if not success:
-                        error_detail = state._last_conversion_error if state._last_conversion_error else "Unknown error"
-                        state.root.after(0, lambda fn=f.name, err=error_detail: log(f"ERROR: Failed to convert {fn}: {err[:200]}"))
-                        state._last_conversion_error = None  # Clear after logging
-                        continue
-                    if move_files:
-                        f.unlink()  # Delete original after conversion
-                except Exception as e:
-                    state.root.after(0, lambda fn=f.name, msg=str(e): log(f"ERROR: Failed to convert {fn}: {msg}"))
-                    continue
-            else:
-                # Standard copy/move
-                if move_files:
-                    shutil.move(str(f), str(target))
-                else:
-                    shutil.copy2(str(f), str(target))
-
-    if bpm_enabled:
-        bpm_module.flush_cache()
-        # Output any cache save log messages
-        for bpm_log_msg in bpm_module.get_log_messages():
-            state.root.after(0, lambda m=bpm_log_msg: log(m))
-    
-    if key_enabled:
-        key_module.flush_cache()
-        # Output any cache save log messages
-        for key_log_msg in key_module.get_log_messages():
-            state.root.after(0, lambda m=key_log_msg: log(m))
+    def _on_event(event):
+        kind = event["event"]
+        if kind in ("log", "error"):
+            state.root.after(0, lambda m=event["message"]: log(m))
+        elif kind == "file":
+            i = event["index"]
+            state.root.after(0, lambda m=event["message"]: log(m))
+            state.root.after(0, lambda pct=int(i / total * 100): state.progress_var.set(pct))
+            state.root.after(0, lambda s=f"Processing {i} / {total}\u2026": state.status_var.set(s))
+
+    try:
+        summary = engine.run(config, files, emit=_on_event)
+    except Exception as e:
+        state.root.after(0, lambda m=f"ERROR: Run failed - {type(e).__name__}: {e}": log(m))
+        state.root.after(0, lambda: state.status_var.set("Run failed."))
+        if state._status_dot:
+            state.root.after(0, lambda: state._status_dot.configure(text_color=theme.FG_DIM))
+        return
+    finally:
+        state.root.after(0, _run_finished)
+        state.root.after(0, lambda: state.run_btn.configure(text="Run"))
+        state.root.after(0, lambda: state.run_btn.configure(state="normal"))
+    try:
+        profile_path = profiling.dump_json()
+        state.root.after(0, lambda p=profile_path: log(f"[PROFILE] Stage timings written to {p}"))
+    except OSError:
+        pass
 
     s = "s" if total != 1 else ""
-    if bpm_enabled:
-        # Count how many files had BPM detected from this run
-        detected_count = sum(1 for f in files if bpm_module.get_cached_bpm(f) is not None)
-        state.root.after(0, lambda dc=detected_count: log(f"[BPM] Detected BPM for {dc}/{total} file{s}"))
-    
-    if key_enabled:
-        # Count how many files had Key detected from this run
-        detected_count = sum(1 for f in files if key_module.get_cached_key(f) is not None)
-        state.root.after(0, lambda dc=detected_count: log(f"[KEY] Detected key for {dc}/{total} file{s}"))
+    if config.bpm_enabled:
+        state.root.after(0, lambda dc=summary["bpm_detected"]: log(f"[BPM] Detected BPM for {dc}/{total} file{s}"))
+    if config.key_enabled:
+        state.root.after(0, lambda dc=summary["key_detected"]: log(f"[KEY] Detected key for {dc}/{total} file{s}"))
     state.root.after(0, lambda: log("Done."))
     state.root.after(0, lambda: state.status_var.set(f"Complete \u2014 {total} file{s} processed."))
-    state.root.after(0, lambda: state.run_btn.configure(text="Run"))
-    state.root.after(0, lambda: state.run_btn.configure(state="normal"))
-    if bpm_enabled and state._refresh_preview_cb:
+    if config.bpm_enabled and state._refresh_preview_cb:
         state.root.after(0, state._refresh_preview_cb)
     if state._status_dot:
         state.root.after(0, lambda: state._status_dot.configure(text_color=theme.C_COPY))
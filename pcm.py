@@ -0,0 +1,163 @@
+"""
+Raw-PCM primitives for the analysis layer — no NumPy.
+
+The detectors used to walk Python lists of samples.  These helpers work on
+the PCM `bytes` pydub already holds and push the inner loops into C via
+`audioop` (stdlib up to Python 3.12, the `audioop-lts` package after that —
+pydub needs one of them anyway; its pure-Python fallback keeps things
+working, slowly, when neither is installed).
+
+  Pcm / from_segment() — trim, downmix (tomono), downsample (ratecv) and
+                         convert to 16-bit (lin2lin): the detectors' input
+  Estimate             — what a detector backend returns
+  progressive()        — run a detector over growing windows, stop when stable
+  rms_envelope()       — one audioop.rms() per hop over a memoryview
+  autocorrelation()    — one C dot product per lag (see below)
+  lag_correlation()    — the same for a single lag of raw PCM
+  local_maxima()       — strict peaks with a minimum spacing
+"""
+
+import array
+from itertools import accumulate
+from typing import Callable, NamedTuple, Optional
+
+try:
+    import audioop
+except ImportError:                       # Python 3.13+ without audioop-lts
+    from pydub import pyaudioop as audioop
+
+
+class Pcm(NamedTuple):
+    """Mono 16-bit PCM: the detectors work on this, never on an AudioSegment."""
+    data: bytes
+    rate: int
+    width: int = 2
+
+    def frame_count(self) -> int:
+        return len(self.data) // self.width
+
+    def duration_ms(self) -> int:
+        return self.frame_count() * 1000 // self.rate if self.rate else 0
+
+    def head(self, ms: int) -> "Pcm":
+        """The first `ms` milliseconds (a copy of at most that much data)."""
+        return self._replace(data=self.data[:self.rate * ms // 1000 * self.width])
+
+
+def from_segment(audio, max_ms: int, max_rate: Optional[int] = None) -> Pcm:
+    """The first `max_ms` of `audio` as mono 16-bit PCM at ≤ `max_rate` Hz.
+
+    Trims before downmixing, so a long file never gets converted in full.
+    """
+    if audio.channels > 2:                    # audioop only downmixes stereo
+        audio = audio.split_to_mono()[0]
+    width, channels, rate = audio.sample_width, audio.channels, audio.frame_rate
+    frame_bytes = width * channels
+    data = memoryview(audio.raw_data)[:rate * max_ms // 1000 * frame_bytes]
+    if channels == 2:
+        data = audioop.tomono(data, width, 0.5, 0.5)
+    if width != 2:
+        data = audioop.lin2lin(data, width, 2)
+    if max_rate and rate > max_rate:
+        data, _ = audioop.ratecv(data, 2, 1, rate, max_rate, None)
+        rate = max_rate
+    return Pcm(bytes(data), rate)
+
+
+class Estimate(NamedTuple):
+    """A detector's answer: the value, how sure it is (0–1) and the runners-up.
+
+    `candidates` is [(value, score)], best first, starting with `value`.
+    """
+    value: object = None
+    confidence: float = 0.0
+    candidates: tuple = ()
+
+
+def progressive(audio: Pcm, detect: Callable, windows_ms, agree: Callable,
+                min_confidence: float) -> tuple:
+    """Run `detect` on growing heads of `audio`; return (Estimate, ms analysed).
+
+    `detect(pcm)` returns an Estimate.  The windows are tried in order and
+    the whole of `audio` last; analysis stops early once two consecutive
+    windows give values that `agree(a, b)` and the later one is at least
+    `min_confidence` sure.  Audio no longer than the first window is
+    analysed once, whole.
+    """
+    total = audio.duration_ms()
+    previous = None
+    for ms in [w for w in windows_ms if w < total] + [total]:
+        estimate = detect(audio.head(ms))
+        if (estimate.value is not None and previous is not None
+                and estimate.confidence >= min_confidence and agree(previous, estimate.value)):
+            return estimate, ms
+        previous = estimate.value
+    return estimate, total
+
+
+def rms_envelope(data, width: int, hop_frames: int) -> list:
+    """RMS of each whole `hop_frames`-frame hop of mono PCM `data`."""
+    step = hop_frames * width
+    view = memoryview(data)
+    return [audioop.rms(view[i:i + step], width) for i in range(0, len(view) - step, step)]
+
+
+def _as_int16(signal) -> array.array:
+    peak = max(signal, default=0)
+    scale = 32767.0 / peak if peak > 0 else 0.0
+    return array.array("h", (int(v * scale) for v in signal))
+
+
+def autocorrelation(signal, max_lag: int, min_lag: int = 0) -> list:
+    """Normalised autocorrelation r[lag] / r[0] for lag 0..max_lag.
+
+    `signal` must be non-negative (an envelope); it is scaled to 16-bit so
+    audioop can take the dot products.  audioop.findfactor(a, b) returns
+    Σab / Σb², so multiplying by Σb² — a suffix sum of squares computed
+    once — gives Σab in C for every lag.  Lags below `min_lag` are left at
+    0.0 (r[0] is always 1.0) and cost nothing.
+    """
+    n = len(signal)
+    if n == 0:
+        return []
+    x = _as_int16(signal)
+    total_sq = sum(v * v for v in x)
+    if total_sq == 0:
+        return [0.0] * (max_lag + 1)
+    prefix_sq = [0] + list(accumulate(v * v for v in x))
+    data = memoryview(x.tobytes())
+    result = [0.0] * (max_lag + 1)
+    result[0] = 1.0
+    for lag in range(max(1, min_lag), min(max_lag, n - 1) + 1):
+        tail_sq = total_sq - prefix_sq[lag]          # Σ x[i]² for i ≥ lag
+        if tail_sq:
+            a = data[:(n - lag) * 2]
+            b = data[lag * 2:]
+            result[lag] = audioop.findfactor(a, b) * tail_sq / total_sq
+    return result
+
+
+def lag_correlation(data, lag: int) -> float:
+    """Σ x[i]·x[i+lag] / Σ x[i]² over i < n − lag, for 16-bit PCM `data`.
+
+    audioop.findfactor(b, a) is Σab / Σa² — exactly this normalisation.
+    """
+    view = memoryview(data)
+    n = len(view) // 2 - lag
+    if lag <= 0 or n <= 0:
+        return 0.0
+    head = view[:n * 2]
+    if audioop.max(head, 2) == 0:             # silence: findfactor would return NaN
+        return 0.0
+    return audioop.findfactor(view[lag * 2:], head)
+
+
+def local_maxima(signal, min_distance: int = 1) -> list:
+    """[(index, value)] of strict local maxima at least `min_distance` apart."""
+    peaks = []
+    last = -min_distance
+    for i, (prev, cur, nxt) in enumerate(zip(signal, signal[1:], signal[2:]), 1):
+        if cur > prev and cur > nxt and i - last >= min_distance:
+            peaks.append((i, cur))
+            last = i
+    return peaks
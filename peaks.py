@@ -0,0 +1,208 @@
+"""
+Waveform overview peaks and cache management.
+
+Each file is reduced to PEAK_POINTS (min, max) pairs, streamed from the
+PCM a block at a time so even hour-long files never sit in memory; each
+block's extremes come from one audioop.minmax() call over a memoryview
+slice, so the per-sample work stays in C.  The pairs are stored as int8
+(base64) in ~/.sampson/peaks_cache.json — an AnalysisCache keyed on the
+content fingerprint, so overviews follow files through moves and renames
+and get the same LRU eviction (PEAKS_CACHE_MAX_ENTRIES) and startup
+pruning as the BPM and key results — and rendered in Deck B as a one-line
+sparkline.
+"""
+
+import array
+import base64
+import contextlib
+import subprocess
+import sys
+import wave
+from pathlib import Path
+from typing import Optional
+
+try:
+    import audioop
+except ImportError:                       # Python 3.13+ without audioop-lts
+    from pydub import pyaudioop as audioop
+
+import constants
+import profiling
+from analysis_cache import AnalysisCache
+
+PEAK_POINTS = 256
+_BLOCK_FRAMES = 4096          # frames read per chunk
+_SUB_BLOCK = 64               # initial samples per (min, max) block
+_FFMPEG_RATE = 8000           # decode rate for formats without a stdlib reader
+_SPARK_CHARS = " ▁▂▃▄▅▆▇█"
+
+# ── Cache ─────────────────────────────────────────────────────────────────────
+# Entries written before the fingerprint keying ({path: {"mtime", "peaks"}})
+# are migrated by AnalysisCache as their files are looked up.
+_cache = AnalysisCache("peaks_cache.json", "peaks", "[PEAKS]", None,
+                       max_entries=constants.PEAKS_CACHE_MAX_ENTRIES)
+
+
+def _encode(peaks: list) -> str:
+    flat = array.array("b", (max(-127, min(127, v)) for pair in peaks for v in pair))
+    return base64.b64encode(flat.tobytes()).decode("ascii")
+
+
+def _decode(blob: str) -> list:
+    flat = array.array("b", base64.b64decode(blob))
+    return [(flat[i], flat[i + 1]) for i in range(0, len(flat) - 1, 2)]
+
+
+def get_cached_peaks(path: Path) -> Optional[list]:
+    """Return [(min, max), ...] in -127..127 if cached for `path`'s content."""
+    blob = _cache.get(path)
+    return _decode(blob) if blob is not None else None
+
+
+def flush_cache():
+    _cache.flush(quiet=True)
+
+
+# ── Streaming PCM readers ─────────────────────────────────────────────────────
+# Each yields chunks of native-endian 16-bit PCM bytes (channels interleaved
+# — irrelevant for a min/max overview).
+
+def _native(data: bytes, byteorder: str) -> bytes:
+    if byteorder == sys.byteorder:
+        return data
+    samples = array.array("h", data)
+    samples.byteswap()
+    return samples.tobytes()
+
+
+def _chunks_wave(path):
+    with contextlib.closing(wave.open(str(path))) as wf:
+        if wf.getsampwidth() != 2:
+            raise ValueError("not 16-bit")
+        while True:
+            data = wf.readframes(_BLOCK_FRAMES)
+            if not data:
+                return
+            yield _native(data, "little")
+
+
+def _chunks_aiff(path):
+    import aifc
+    with contextlib.closing(aifc.open(str(path))) as af:
+        if af.getsampwidth() != 2 or af.getcomptype() not in (b"NONE", b"twos"):
+            raise ValueError("not 16-bit PCM")
+        while True:
+            data = af.readframes(_BLOCK_FRAMES)
+            if not data:
+                return
+            yield _native(data, "big")          # AIFF PCM is big-endian
+
+
+def _chunks_ffmpeg(path):
+    from conversion import get_toolchain
+    ffmpeg = get_toolchain().ffmpeg
+    if not ffmpeg:
+        raise RuntimeError("ffmpeg not found")
+    proc = subprocess.Popen([ffmpeg, "-hide_banner", "-nostdin", "-v", "error",
+                             "-i", str(path), "-ac", "1", "-ar", str(_FFMPEG_RATE),
+                             "-f", "s16le", "pipe:1"],
+                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    try:
+        while True:
+            data = proc.stdout.read(_BLOCK_FRAMES * 2)
+            if not data:
+                break
+            if len(data) % 2:
+                data = data[:-1]
+            yield _native(data, "little")
+    finally:
+        proc.stdout.close()
+        proc.kill()
+        proc.wait()
+
+
+def _pcm_chunks(path: Path):
+    """Yield PCM chunks, preferring the stdlib readers and falling back to ffmpeg.
+
+    The stdlib readers reject unsupported files before yielding anything,
+    so a fallback never repeats samples already yielded.
+    """
+    ext = path.suffix.lower()
+    native = {".wav": _chunks_wave, ".aif": _chunks_aiff, ".aiff": _chunks_aiff}.get(ext)
+    if native is not None:
+        started = False
+        try:
+            for chunk in native(path):
+                started = True
+                yield chunk
+            return
+        except Exception:
+            if started:
+                raise
+    yield from _chunks_ffmpeg(path)
+
+
+# ── Extraction ────────────────────────────────────────────────────────────────
+
+def extract_peaks(path: Path, points: int = PEAK_POINTS) -> list:
+    """Stream `path` and return up to `points` (min, max) pairs scaled to -127..127.
+
+    Blocks start at _SUB_BLOCK samples; whenever more than 4 × points have
+    accumulated, neighbours are merged and the block size doubles, so memory
+    stays bounded however long the file is.
+    """
+    blocks = []
+    span = _SUB_BLOCK                # samples per block
+    carry = bytearray()              # bytes not yet filling a whole block
+    for chunk in _pcm_chunks(path):
+        carry += chunk
+        step = span * 2
+        whole = len(carry) - len(carry) % step
+        view = memoryview(carry)
+        blocks.extend(audioop.minmax(view[j:j + step], 2) for j in range(0, whole, step))
+        view.release()
+        del carry[:whole]
+        if len(blocks) > 4 * points:
+            blocks = [(min(a[0], b[0]), max(a[1], b[1]))
+                      for a, b in zip(blocks[::2], blocks[1::2])]
+            span *= 2
+    if carry:
+        blocks.append(audioop.minmax(bytes(carry), 2))
+    if not blocks:
+        return []
+    n = len(blocks)
+    m = min(points, n)
+    out = []
+    for i in range(m):
+        group = blocks[i * n // m:(i + 1) * n // m]
+        out.append((min(b[0] for b in group) >> 8, max(b[1] for b in group) >> 8))
+    return out
+
+
+@profiling.timed("peaks")
+def compute_peaks(path: Path) -> Optional[list]:
+    """Return cached peaks, extracting and caching them on a miss (None on error)."""
+    cached = get_cached_peaks(path)
+    if cached is not None:
+        return cached
+    try:
+        peaks = extract_peaks(path)
+    except Exception:
+        return None
+    _cache.put(path, _encode(peaks))
+    return peaks
+
+
+def sparkline(peaks: Optional[list], width: int = 14) -> str:
+    """Render peaks as `width` block characters of peak amplitude."""
+    if not peaks:
+        return ""
+    n = len(peaks)
+    width = min(width, n)
+    top = len(_SPARK_CHARS) - 1
+    cells = []
+    for i in range(width):
+        group = peaks[i * n // width:(i + 1) * n // width] or [peaks[-1]]
+        amp = max(max(abs(lo), abs(hi)) for lo, hi in group)
+        cells.append(_SPARK_CHARS[min(top, (amp * top + 126) // 127)])
+    return "".join(cells)
@@ -1,9 +1,14 @@
 """macOS playback via AppKit.NSSound (replaces pygame.mixer)."""
 
 import sys
+import threading
+from collections import OrderedDict
 from pathlib import Path
 
 import state
+import constants
+import profiling
+from engine import get_duration
 
 # ── Backend selection ────────────────────────────────────────────────────────
 # NSSound on macOS (zero extra deps); pygame fallback for Windows/Linux.
@@ -13,10 +18,41 @@ _NSSound = None  # Lazy-loaded on first use
 _current_index = -1
 _ns_sound = None
 
-# Initialize pygame mixer on Windows/Linux
-if not _USE_NSSOUND:
-    import pygame.mixer as _mixer
-    _mixer.init(frequency=48000, size=-16, channels=2, buffer=512)
+# pygame mixer on Windows/Linux — initialised on first use (or by warm_up()
+# after the first frame) so opening the SDL audio device stays off startup.
+_mixer = None
+_mixer_lock = threading.Lock()
+
+
+def _ensure_mixer():
+    """Import and initialise pygame.mixer once; safe to call from any thread."""
+    global _mixer
+    if _mixer is None:
+        with _mixer_lock:
+            if _mixer is None:
+                import pygame.mixer as mixer
+                mixer.init(frequency=48000, size=-16, channels=2, buffer=512)
+                _mixer = mixer
+    return _mixer
+
+
+def warm_up():
+    """Initialise the playback backend on a background thread.
+
+    Called from main once the window has painted, so the first click on a
+    sample doesn't wait for the audio device.  No-op on macOS, where NSSound
+    must be loaded on the main thread.
+    """
+    if _USE_NSSOUND or _mixer is not None:
+        return
+
+    def _init():
+        try:
+            with profiling.span("startup.mixer_init"):
+                _ensure_mixer()
+        except Exception:
+            pass  # play() retries and fails quietly if there is no audio device
+    threading.Thread(target=_init, daemon=True).start()
 
 
 def _ensure_nssound():
@@ -28,6 +64,101 @@ def _ensure_nssound():
     return _NSSound
 
 
+# ── Prefetch ─────────────────────────────────────────────────────────────────
+# Whenever a row is loaded, the rows above and below are decoded into
+# pygame Sound objects on a background thread, so arrow-key auditioning
+# starts from memory instead of opening and streaming the file.  Sounds live
+# in a small LRU keyed by (path, mtime).  pygame only — NSSound must stay on
+# the main thread.
+
+_sound_cache = OrderedDict()        # (path, mtime) → pygame.mixer.Sound
+_sound_lock  = threading.Lock()
+_wanted = []                        # paths the prefetch thread should load next
+_wanted_cv = threading.Condition()
+_prefetch_thread = None
+_channel = None                     # Channel of the Sound currently playing
+_audition_after = None              # pending root.after id of a debounced audition
+
+
+def _sound_key(path):
+    try:
+        return (str(path), path.stat().st_mtime)
+    except OSError:
+        return None
+
+
+def _cached_sound(path):
+    key = _sound_key(path)
+    with _sound_lock:
+        sound = _sound_cache.get(key)
+        if sound is not None:
+            _sound_cache.move_to_end(key)
+        return sound
+
+
+# Mixer runs at 48 kHz, 16-bit stereo: 192 000 bytes per second of audio.
+_MIXER_BYTES_PER_SECOND = 192000
+
+
+def _cache_bytes() -> int:
+    return int(sum(snd.get_length() for snd in _sound_cache.values()) * _MIXER_BYTES_PER_SECOND)
+
+
+def _decoded_bytes(path):
+    """Estimated size of `path` decoded to the mixer format (None if unknown).
+
+    The size on disk says nothing for compressed formats: a 32 MB MP3 is
+    ~350 MB of PCM.  Durations come from the preview scan's cache.
+    """
+    duration = get_duration(path)
+    return None if duration is None else int(duration * _MIXER_BYTES_PER_SECOND)
+
+
+def _prefetch_worker():
+    while True:
+        with _wanted_cv:
+            while not _wanted:
+                _wanted_cv.wait()
+            path = _wanted.pop(0)
+        key = _sound_key(path)
+        if key is None:
+            continue
+        with _sound_lock:
+            if key in _sound_cache:
+                continue
+        size = _decoded_bytes(path)
+        if size is None or size > constants.PLAYBACK_PREFETCH_MAX_BYTES:
+            continue
+        try:
+            with profiling.span("playback.prefetch"):
+                sound = _ensure_mixer().Sound(str(path))
+        except Exception:
+            continue
+        with _sound_lock:
+            _sound_cache[key] = sound
+            while _sound_cache and (len(_sound_cache) > constants.PLAYBACK_CACHE_SIZE
+                                    or _cache_bytes() > constants.PLAYBACK_CACHE_MAX_BYTES):
+                _sound_cache.popitem(last=False)
+
+
+def _prefetch(paths):
+    """Replace the prefetch queue with `paths` (latest request wins)."""
+    global _prefetch_thread
+    if _USE_NSSOUND:
+        return
+    with _wanted_cv:
+        _wanted[:] = [p for p in paths if p is not None]
+        _wanted_cv.notify()
+    if _prefetch_thread is None:
+        _prefetch_thread = threading.Thread(target=_prefetch_worker, daemon=True)
+        _prefetch_thread.start()
+
+
+def _row_path(iid):
+    src = state.preview_tree.set(iid, "srcpath")
+    return Path(src) if src else None
+
+
 # ── Internal helpers ─────────────────────────────────────────────────────────
 
 def _tree_items():
@@ -43,9 +174,11 @@ def _load_index(idx):
     iid = items[idx]
     state.preview_tree.selection_set(iid)
     state.preview_tree.see(iid)
-    src = state.preview_tree.set(iid, "srcpath")
-    state._playback_file = Path(src) if src else None
+    state._playback_file = _row_path(iid)
     _update_transport_state()
+    # play() streams the current row through mixer.music; decode only the
+    # neighbours the arrow keys will go to next.
+    _prefetch([_row_path(items[j]) for j in (idx + 1, idx - 1) if 0 <= j < len(items)])
 
 
 def _is_busy() -> bool:
@@ -53,14 +186,16 @@ def _is_busy() -> bool:
     if _USE_NSSOUND:
         return _ns_sound is not None and _ns_sound.isPlaying()
     else:
-        return _mixer.music.get_busy()
+        if _mixer is None:
+            return False
+        return _mixer.music.get_busy() or (_channel is not None and _channel.get_busy())
 
 
 # ── Public transport API ─────────────────────────────────────────────────────
 
 def play():
     """Play the currently selected file; if already playing, stop (toggle)."""
-    global _ns_sound
+    global _ns_sound, _channel
     if _is_busy():
         stop()
         return
@@ -77,8 +212,13 @@ def play():
                 _update_transport_state()
                 state.root.after(200, _poll_playback)
         else:
-            _mixer.music.load(str(state._playback_file))
-            _mixer.music.play()
+            mixer = _ensure_mixer()
+            sound = _cached_sound(state._playback_file)
+            if sound is not None:
+                _channel = sound.play()
+            else:
+                mixer.music.load(str(state._playback_file))
+                mixer.music.play()
             state._is_playing = True
             _update_transport_state()
             state.root.after(200, _poll_playback)
@@ -88,13 +228,16 @@ def play():
 
 def stop():
     """Stop playback and update transport state."""
-    global _ns_sound
+    global _ns_sound, _channel
     if _USE_NSSOUND:
         if _ns_sound and _ns_sound.isPlaying():
             _ns_sound.stop()
         _ns_sound = None
-    else:
+    elif _mixer is not None:
         _mixer.music.stop()
+        if _channel is not None:
+            _channel.stop()
+            _channel = None
     state._is_playing = False
     _update_transport_state()
 
@@ -102,6 +245,7 @@ def stop():
 def reset():
     """Stop playback and reset current index (call on source navigate)."""
     global _current_index
+    _cancel_audition()
     stop()
     _current_index = -1
 
@@ -124,6 +268,7 @@ def prev_file():
 
 
 def on_tree_select(event):
+    _cancel_audition()
     state.preview_tree.focus_set()
     iid = state.preview_tree.identify_row(event.y)
     if not iid:
@@ -136,17 +281,43 @@ def on_tree_select(event):
 
 
 def on_arrow_key(event):
+    """Audition the focused row once the cursor has rested on it.
+
+    Holding an arrow key fires this for every row passed; each call stops
+    playback, drops queued prefetches and restarts the debounce timer, so
+    only the row the user stops on is loaded.
+    """
+    global _audition_after
     state.preview_tree.focus_set()
     iid = state.preview_tree.focus()
-    if not iid:
+    if not iid or iid not in _tree_items():
         return
+    _cancel_audition()
+    stop()
+    _prefetch([])
+    delay = constants.AUDITION_DEBOUNCE_MS
+    if delay <= 0:
+        _audition(iid)
+    else:
+        _audition_after = state.root.after(delay, _audition, iid)
+
+
+def _audition(iid):
+    global _audition_after
+    _audition_after = None
     items = _tree_items()
-    if iid in items:
-        stop()
+    if iid in items and state.preview_tree.focus() == iid:
         _load_index(items.index(iid))
         play()
 
 
+def _cancel_audition():
+    global _audition_after
+    if _audition_after is not None:
+        state.root.after_cancel(_audition_after)
+        _audition_after = None
+
+
 def _poll_playback():
     if _is_busy():
         state.root.after(200, _poll_playback)
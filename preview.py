@@ -1,56 +1,33 @@
 import threading
-import wave
-import contextlib
+from collections import deque
 from pathlib import Path
 import tkinter as tk
 
 import state
 import theme
 import constants
+import profiling
+import analysis_cache
 import bpm as bpm_module
 import key as key_module
+import peaks
+import idle_analysis
 from dpi import _px
-from operations import _compute_output
+from engine import scan_audio_files, get_duration, clear_duration_cache
+from engine import analysis
+from engine.naming import _compute_output
 from conversion import get_target_extension
 
 
 # ── Filter ───────────────────────────────────────────────────────────────────
 
 _preview_rows: list = []   # all populated row data; used by apply_filter()
-_duration_cache: dict = {}  # str(path) → float | None; cleared on each scan
+_row_by_src: dict = {}     # srcpath → its (mutable) row in _preview_rows
 _sort_col: str | None = None  # "bpm" | "key" | "duration" | None
 _sort_asc: bool = True
-
-
-def _get_duration(path: Path) -> float | None:
-    """Return duration in seconds from file metadata.
-
-    Fast path for WAV/AIFF (stdlib header read, no subprocess).
-    Falls back to ffprobe via pydub for MP3/FLAC/OGG.
-    Returns None on any error.
-    """
-    key = str(path)
-    if key in _duration_cache:
-        return _duration_cache[key]
-    val = None
-    try:
-        ext = path.suffix.lower()
-        if ext == '.wav':
-            with contextlib.closing(wave.open(str(path))) as wf:
-                val = wf.getnframes() / wf.getframerate()
-        elif ext in ('.aif', '.aiff'):
-            import aifc
-            with contextlib.closing(aifc.open(str(path))) as af:
-                val = af.getnframes() / af.getframerate()
-        else:
-            from pydub.utils import mediainfo
-            info = mediainfo(str(path))
-            dur = info.get('duration')
-            val = float(dur) if dur else None
-    except Exception:
-        val = None
-    _duration_cache[key] = val
-    return val
+_sparks: dict = {}         # srcpath → waveform sparkline, filled by _peaks_worker
+_iid_by_src: dict = {}     # srcpath → tree iid of the row currently displayed
+_peaks_generation = 0      # bumped per scan so stale sparklines are dropped
 
 
 def _fmt_duration(secs: float | None) -> str:
@@ -170,16 +147,15 @@ def _parse_query(text):
     return " ".join(plain_parts).lower(), bpm_spec, note_spec, min_len, max_len
 
 
-def apply_filter(text: str):
-    """Show only rows matching the structured query (case-insensitive).
+def _filter_rows(rows, text: str) -> list:
+    """Return the rows matching the structured query (no Tk access).
 
     Supports plain filename substring, BPM:120, BPM:100-130, Note:C,
     MinLength:N, MaxLength:N (seconds) tokens. All tokens AND together.
-    When no filter is active, caps display at MAX_PREVIEW_ROWS.
+    An empty query matches every row.
     """
-    if state.preview_tree is None:
-        return
-    has_query = bool(text.strip())
+    if not text.strip():
+        return list(rows)
     plain_text, bpm_spec, note_spec, min_len, max_len = _parse_query(text)
 
     def _matches(row):
@@ -210,16 +186,33 @@ def apply_filter(text: str):
                 return False
         return True
 
+    return [row for row in rows if _matches(row)]
+
+
+def apply_filter(text: str):
+    """Show only rows matching the structured query (case-insensitive).
+
+    See _filter_rows() for the query syntax.
+    When no filter is active, caps display at MAX_PREVIEW_ROWS.
+    """
+    if state.preview_tree is None:
+        return
+    has_query = bool(text.strip())
+
     state.preview_tree.delete(*state.preview_tree.get_children())
-    matched = [row for row in _preview_rows if not has_query or _matches(row)]
+    _iid_by_src.clear()
+    matched = _filter_rows(_preview_rows, text)
     display_rows = matched if has_query else matched[:constants.MAX_PREVIEW_ROWS]
 
     for i, (orig, renamed, subfolder, bpm_display, key_display, srcpath, *rest) in enumerate(display_rows):
         dur_display = _fmt_duration(rest[0] if rest else None)
         tag = "odd" if i % 2 else "even"
-        state.preview_tree.insert("", "end",
-                                  values=(orig, renamed, subfolder, bpm_display, key_display, dur_display, srcpath),
-                                  tags=(tag,))
+        _iid_by_src[srcpath] = state.preview_tree.insert(
+            "", "end",
+            values=(orig, renamed, subfolder, bpm_display, key_display, dur_display,
+                    _sparks.get(srcpath, ""), srcpath),
+            tags=(tag,))
+    _queue_peaks([row[5] for row in display_rows])
 
     # Update Deck B count label
     total_cached = len(_preview_rows)
@@ -308,6 +301,20 @@ def _hide_tooltip(*_):
     state._tooltip_item = None
 
 
+def _candidate_row(frame, label, values, var):
+    """A row of small buttons, each putting one cached alternative into `var`."""
+    row = tk.Frame(frame, bg=theme.BG_SURF1)
+    row.pack(fill="x", pady=(0, 4))
+    tk.Label(row, text=label, font=(theme.FONT_UI, 8),
+             bg=theme.BG_SURF1, fg=theme.FG_DIM).pack(side="left", padx=(0, 6))
+    for text, value in values:
+        tk.Button(row, text=text, command=lambda v=value: var.set(v),
+                  font=(theme.FONT_UI, 8),
+                  bg=theme.BG_SURF2, fg=theme.FG_ON_SURF,
+                  activebackground=theme.BG_ROOT, activeforeground=theme.FG_ON_SURF,
+                  relief="flat", padx=6, pady=1).pack(side="left", padx=(0, 4))
+
+
 def _on_bpm_double_click(event):
     """Handle double-click on BPM column to allow manual editing."""
     item = state.preview_tree.identify_row(event.y)
@@ -366,6 +373,16 @@ def _on_bpm_double_click(event):
     entry.select_range(0, "end")
     entry.focus()
     
+    # Half/double tempo and the detector's runners-up, served from the cache
+    variants = [(label, bpm_module.tempo_variant(file_path, factor))
+                for label, factor in (("½×", 0.5), ("2×", 2.0))]
+    variants = [(label, f"{v:g}") for label, v in variants if v is not None and 30 <= v <= 300]
+    if variants:
+        _candidate_row(frame, "Tempo:", variants, bpm_var)
+    candidates = [(f"{b:g}", f"{b:g}") for b, _ in bpm_module.get_cached_candidates(file_path)]
+    if candidates:
+        _candidate_row(frame, "Candidates:", candidates, bpm_var)
+    
     def save_bpm():
         try:
             bpm_val = float(bpm_var.get().strip())
@@ -485,7 +502,12 @@ def _on_key_double_click(event):
     # Valid keys hint
     tk.Label(frame, text="Valid: C, C#, D, D#, E, F, F#, G, G#, A, A#, B", 
              font=(theme.FONT_UI, 8),
-             bg=theme.BG_SURF1, fg=theme.FG_DIM).pack(anchor="w", pady=(4, 0))
+             bg=theme.BG_SURF1, fg=theme.FG_DIM).pack(anchor="w", pady=(4, 4))
+    
+    # The detector's runners-up, served from the cache
+    candidates = [(n, n) for n, _ in key_module.get_cached_candidates(file_path)]
+    if candidates:
+        _candidate_row(frame, "Candidates:", candidates, key_var)
     
     def save_key():
         try:
@@ -545,29 +567,34 @@ def refresh_preview():
         return
     state.preview_count_var.set("Scanning\u2026")
     state.src_count_var.set("Scanning\u2026")
-    threading.Thread(target=_scan_thread, args=(p,), daemon=True).start()
+    analyse = bool((state.bpm_enabled_var and state.bpm_enabled_var.get()) or
+                   (state.key_enabled_var and state.key_enabled_var.get()))
+    threading.Thread(target=_scan_thread, args=(p, analyse), daemon=True).start()
 
 
-def _scan_thread(path_str):
-    global _duration_cache
-    _duration_cache = {}           # clear stale entries from previous scan
+def _scan_thread(path_str, analyse=False):
+    clear_duration_cache()         # clear stale entries from previous scan
     source_root = Path(path_str)
-    if state._selected_folders:
-        files = []
-        for folder_path in state._selected_folders:
-            p = Path(folder_path)
-            if p.is_dir():
-                files += [f for f in p.rglob("*")
-                          if f.suffix.lower() in constants.AUDIO_EXTS and f.is_file()]
-    else:
-        files = []   # empty selection → _populate_preview shows appropriate message
-    durations = {f: _get_duration(f) for f in files}
+    # empty selection → no files; _populate_preview shows appropriate message
+    files = scan_audio_files(state._selected_folders)
+    durations = {f: get_duration(f) for f in files}
+    if analyse:
+        # Fingerprint here, off the Tk thread, so the cached BPM/key lookups in
+        # _populate_preview are side-index hits rather than file reads.
+        for f in files:
+            analysis_cache.fingerprint(f)
+        analysis.resolve_tags(files)       # header-only: embedded BPM/key before any DSP
+        analysis.resolve_names(files)      # then whatever the file/folder names spell out
+        analysis_cache.flush_all()
     state.root.after(0, lambda: _populate_preview(files, source_root, durations))
 
 
+@profiling.timed("populate_preview")
 def _populate_preview(files, source_root, durations=None):
     global _preview_rows
     _preview_rows = []
+    _row_by_src.clear()
+    idle_analysis.stop()
     state.preview_tree.delete(*state.preview_tree.get_children())
     total = len(files)
     if total == 0 and not state._selected_folders:
@@ -595,9 +622,11 @@ def _populate_preview(files, source_root, durations=None):
     key_enabled = bool(state.key_enabled_var and state.key_enabled_var.get())
     key_append  = bool(state.key_append_var  and state.key_append_var.get())
 
-    # Show BPM/Key columns if detection is enabled OR if any file has a cached value
-    has_any_bpm = any(bpm_module.get_cached_bpm(f) is not None for f in files)
-    has_any_key = any(key_module.get_cached_key(f) is not None for f in files)
+    # Show BPM/Key columns if detection is enabled OR if any file has a cached value.
+    # With detection off, only files already fingerprinted are looked up —
+    # hashing the whole scan here would stall the Tk thread.
+    has_any_bpm = any(bpm_module.get_cached_bpm(f, not bpm_enabled) is not None for f in files)
+    has_any_key = any(key_module.get_cached_key(f, not key_enabled) is not None for f in files)
     show_bpm = bpm_enabled or has_any_bpm
     show_key = key_enabled or has_any_key
 
@@ -613,12 +642,12 @@ def _populate_preview(files, source_root, durations=None):
 
     for f in files:
         # BPM: always look up cache when column is visible
-        bpm_val     = bpm_module.get_cached_bpm(f) if show_bpm else None
+        bpm_val     = bpm_module.get_cached_bpm(f, not bpm_enabled) if show_bpm else None
         bpm_display = str(int(round(bpm_val))) if bpm_val is not None \
                       else ("???" if bpm_enabled else "")
 
         # Key: always look up cache when column is visible
-        key_val     = key_module.get_cached_key(f) if show_key else None
+        key_val     = key_module.get_cached_key(f, not key_enabled) if show_key else None
         key_display = key_val if key_val is not None \
                       else ("???" if key_enabled else "")
 
@@ -648,7 +677,9 @@ def _populate_preview(files, source_root, durations=None):
             display_name = new_name
 
         duration_sec = durations.get(f) if durations else None
-        _preview_rows.append((f.name, display_name, rel_sub, bpm_display, key_display, str(f), duration_sec))
+        row = [f.name, display_name, rel_sub, bpm_display, key_display, str(f), duration_sec]
+        _preview_rows.append(row)
+        _row_by_src[row[5]] = row
 
     state.preview_tree.tag_configure("odd",  background=theme.TREE_ROW_ODD, foreground=theme.FG_ON_SURF)
     state.preview_tree.tag_configure("even", background=theme.BG_SURF2,     foreground=theme.FG_VARIANT)
@@ -663,4 +694,148 @@ def _populate_preview(files, source_root, durations=None):
     _apply_sort()
     _update_sort_headings()
     filter_text = state.preview_filter_var.get() if state.preview_filter_var else ""
+    _reset_peaks()
     apply_filter(filter_text)
+    _start_idle_analysis([Path(row[5]) for row in _preview_rows], bpm_enabled, key_enabled)
+
+
+# ── Waveform overviews ──────────────────────────────────────────────────────
+# Peaks are computed (or read from the peaks cache) on a small background
+# pool for the rows on display only — the viewport first, re-read every
+# IDLE_ANALYSIS_POLL_MS as the user scrolls, then the rest in display
+# order — and each finished sparkline is pushed into its row on the Tk
+# thread, so scrolling and filtering never wait for them.
+
+_PEAKS_WORKERS = 2
+_peaks_cond = threading.Condition()
+_peaks_queue: deque = deque()   # srcpaths still to draw
+_peaks_threads: list = []
+
+
+def _reset_peaks():
+    """Forget the previous scan's sparklines and queue."""
+    global _peaks_generation
+    with _peaks_cond:
+        _peaks_generation += 1
+        _peaks_queue.clear()
+    _sparks.clear()
+
+
+def _queue_peaks(srcpaths):
+    """Draw the displayed `srcpaths` that have no sparkline yet, in order."""
+    with _peaks_cond:
+        _peaks_queue.clear()
+        _peaks_queue.extend(p for p in srcpaths if p not in _sparks)
+        if not _peaks_queue:
+            return
+        _peaks_cond.notify_all()
+    while len(_peaks_threads) < _PEAKS_WORKERS:
+        thread = threading.Thread(target=_peaks_worker, name="sampson-peaks", daemon=True)
+        thread.start()
+        _peaks_threads.append(thread)
+    _ensure_viewport_tracking()
+
+
+def _prioritise_peaks(srcpaths):
+    with _peaks_cond:
+        queued = set(_peaks_queue)
+        first = [p for p in srcpaths if p in queued]
+        if not first:
+            return
+        rest = [p for p in _peaks_queue if p not in set(first)]
+        _peaks_queue.clear()
+        _peaks_queue.extend(first + rest)
+
+
+def _peaks_worker():
+    while True:
+        with _peaks_cond:
+            while not _peaks_queue:
+                _peaks_cond.wait()
+            srcpath = _peaks_queue.popleft()
+            generation = _peaks_generation
+            drained = not _peaks_queue
+        spark = peaks.sparkline(peaks.compute_peaks(Path(srcpath)))
+        if spark:
+            state.root.after(0, _set_spark, srcpath, spark, generation)
+        if drained:
+            peaks.flush_cache()
+
+
+def _set_spark(srcpath, spark, generation):
+    if generation != _peaks_generation:
+        return
+    _sparks[srcpath] = spark
+    iid = _iid_by_src.get(srcpath)
+    if iid and state.preview_tree.exists(iid):
+        state.preview_tree.set(iid, "wave", spark)
+
+
+# ── Idle analysis ───────────────────────────────────────────────────────────
+# While BPM/key detection is enabled, rows still showing ??? are analysed by
+# idle_analysis in the background — rows in the viewport first, re-read
+# every IDLE_ANALYSIS_POLL_MS as the user scrolls — and each result is
+# written into its row as it lands.
+
+_viewport_job = None
+
+
+def _start_idle_analysis(files, bpm_enabled, key_enabled):
+    backend = state.bpm_backend_var.get() if state.bpm_backend_var else bpm_module.DEFAULT_BACKEND
+    idle_analysis.start(files, bpm_enabled, key_enabled, _on_idle_result, backend)
+    if bpm_enabled or key_enabled:
+        _ensure_viewport_tracking()
+
+
+def _ensure_viewport_tracking():
+    global _viewport_job
+    if _viewport_job is None:
+        _viewport_job = state.root.after(constants.IDLE_ANALYSIS_POLL_MS, _track_viewport)
+
+
+def _visible_paths() -> list:
+    tree = state.preview_tree
+    children = tree.get_children()
+    if not children:
+        return []
+    first, last = tree.yview()
+    lo = int(first * len(children))
+    hi = min(len(children), int(last * len(children)) + 1)
+    return [Path(tree.set(iid, "srcpath")) for iid in children[lo:hi]]
+
+
+def _track_viewport():
+    global _viewport_job
+    _viewport_job = None
+    if state.preview_tree is None:
+        return
+    analysing = idle_analysis.active()
+    with _peaks_cond:
+        drawing = bool(_peaks_queue)
+    if not (analysing or drawing):
+        return
+    visible = _visible_paths()
+    if analysing:
+        idle_analysis.prioritise(visible)
+    if drawing:
+        _prioritise_peaks([str(p) for p in visible])
+    _viewport_job = state.root.after(constants.IDLE_ANALYSIS_POLL_MS, _track_viewport)
+
+
+def _on_idle_result(path, bpm_val, key_val):
+    # Worker thread → Tk thread.
+    state.root.after(0, _set_analysis, str(path), bpm_val, key_val)
+
+
+def _set_analysis(srcpath, bpm_val, key_val):
+    bpm_display = str(int(round(bpm_val))) if bpm_val is not None else None
+    row = _row_by_src.get(srcpath)
+    if row is not None:
+        row[3] = bpm_display or row[3]
+        row[4] = key_val or row[4]
+    iid = _iid_by_src.get(srcpath)
+    if iid and state.preview_tree.exists(iid):
+        if bpm_display:
+            state.preview_tree.set(iid, "bpm", bpm_display)
+        if key_val:
+            state.preview_tree.set(iid, "key", key_val)
@@ -0,0 +1,149 @@
+"""Lightweight timing spans for the hot paths.
+
+    with profiling.span("scan"):
+        ...
+
+Each span adds its duration to a per-stage aggregate (count, total, min,
+max and a fixed log-scale histogram), so the cost is two perf_counter()
+calls and a lock — cheap enough to leave on permanently.  The aggregates
+feed the Diagnostics window and are dumped as JSON after every Run to
+~/.sampson/profile/last_run.json.
+
+Set SAMPSON_PROFILE=1 to additionally wrap each Run in cProfile; the .prof
+file and a text summary land next to the JSON dump.  (cProfile only sees
+the thread it runs on, so use --workers 1 when profiling the CLI.)
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+PROFILE_DIR = Path.home() / ".sampson" / "profile"
+
+# Upper bucket edges in milliseconds; the last bucket is open-ended.
+BUCKETS_MS = (0.1, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+_lock = threading.Lock()
+_stages: dict = {}   # name → {"count", "total", "min", "max", "hist": [int, ...]}
+
+
+def _bucket_labels() -> list:
+    labels = [f"<={b:g}ms" for b in BUCKETS_MS]
+    labels.append(f">{BUCKETS_MS[-1]:g}ms")
+    return labels
+
+
+def record(name: str, seconds: float):
+    """Add one observation of `seconds` to stage `name`."""
+    ms = seconds * 1000.0
+    idx = len(BUCKETS_MS)
+    for i, edge in enumerate(BUCKETS_MS):
+        if ms <= edge:
+            idx = i
+            break
+    with _lock:
+        st = _stages.get(name)
+        if st is None:
+            st = _stages[name] = {"count": 0, "total": 0.0, "min": seconds, "max": seconds,
+                                  "hist": [0] * (len(BUCKETS_MS) + 1)}
+        st["count"] += 1
+        st["total"] += seconds
+        st["min"] = min(st["min"], seconds)
+        st["max"] = max(st["max"], seconds)
+        st["hist"][idx] += 1
+
+
+@contextmanager
+def span(name: str):
+    """Time the enclosed block as one observation of stage `name`."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - t0)
+
+
+def timed(name: str):
+    """Decorator form of span(): time every call of the function as `name`."""
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter() - t0)
+        return inner
+    return wrap
+
+
+def reset():
+    with _lock:
+        _stages.clear()
+
+
+def snapshot() -> dict:
+    """Return {stage: summary} sorted by total time, slowest first."""
+    labels = _bucket_labels()
+    with _lock:
+        items = [(k, dict(v, hist=list(v["hist"]))) for k, v in _stages.items()]
+    out = {}
+    for name, st in sorted(items, key=lambda kv: kv[1]["total"], reverse=True):
+        out[name] = {
+            "count": st["count"],
+            "total_ms": round(st["total"] * 1000, 3),
+            "mean_ms": round(st["total"] / st["count"] * 1000, 3),
+            "min_ms": round(st["min"] * 1000, 3),
+            "max_ms": round(st["max"] * 1000, 3),
+            "p50_ms": _percentile(st["hist"], st["count"], 0.50),
+            "p95_ms": _percentile(st["hist"], st["count"], 0.95),
+            "histogram": {labels[i]: n for i, n in enumerate(st["hist"]) if n},
+        }
+    return out
+
+
+def _percentile(hist: list, count: int, q: float):
+    """Upper edge of the bucket holding the q-th observation (None if open-ended)."""
+    target = q * count
+    seen = 0
+    for i, n in enumerate(hist):
+        seen += n
+        if seen >= target and n:
+            return BUCKETS_MS[i] if i < len(BUCKETS_MS) else None
+    return None
+
+
+def dump_json(path=None) -> Path:
+    """Write snapshot() to `path` (default PROFILE_DIR/last_run.json); return the path."""
+    path = Path(path) if path else PROFILE_DIR / "last_run.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    payload = {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "stages": snapshot()}
+    path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+    return path
+
+
+def cprofile_enabled() -> bool:
+    return os.environ.get("SAMPSON_PROFILE", "").strip().lower() not in ("", "0", "false", "no")
+
+
+def maybe_cprofile(fn, *args, **kwargs):
+    """Call fn(*args, **kwargs), under cProfile when SAMPSON_PROFILE is set."""
+    if not cprofile_enabled():
+        return fn(*args, **kwargs)
+    import cProfile
+    import io
+    import pstats
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(fn, *args, **kwargs)
+    finally:
+        PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        stem = PROFILE_DIR / f"run-{time.strftime('%Y%m%d-%H%M%S')}"
+        profiler.dump_stats(str(stem.with_suffix(".prof")))
+        text = io.StringIO()
+        pstats.Stats(profiler, stream=text).sort_stats("cumulative").print_stats(40)
+        stem.with_suffix(".txt").write_text(text.getvalue(), encoding="utf-8")
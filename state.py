@@ -44,23 +44,24 @@ _tooltip_item      = None   # item_id currently shown in tooltip
 
 _playback_file     = None   # Path of file currently loaded (or None)
 _is_playing        = False  # True while pygame.mixer is playing
+_run_active        = False  # True while a Run worker is processing files
 transport_prev_btn = None   # ttk.Button refs for enable/disable
 transport_play_btn = None
 transport_next_btn = None
 
-# Conversion error tracking
-_last_conversion_error = None  # Stores last conversion error details
-
 # BPM detection options
 bpm_enabled_var = None   # tk.BooleanVar — master toggle for BPM detection
 bpm_append_var  = None   # tk.BooleanVar — append _120bpm to output filename
 bpm_fresh_var   = None   # tk.BooleanVar — re-scan all (ignore cache)
+bpm_backend_var = None   # tk.StringVar — BPM detector (a key of bpm.BACKENDS)
 
 # Key detection options
 key_enabled_var = None   # tk.BooleanVar — master toggle for key detection
 key_append_var  = None   # tk.BooleanVar — append key label to output filename
 key_fresh_var   = None   # tk.BooleanVar — re-scan all (ignore cache)
 
+embed_tags_var  = None   # tk.BooleanVar — write BPM/key into exported file headers
+
 # Collapsible section states (persists across theme toggles)
 _section_open = {}   # {"struct": True, "device": True, "conversion": True, "bpm": True, "key": True}
 
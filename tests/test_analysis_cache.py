@@ -0,0 +1,110 @@
+import json
+import threading
+
+import analysis_cache
+
+
+def _run_all(targets):
+    errors = []
+
+    def guarded(fn, *args):
+        try:
+            fn(*args)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=guarded, args=t) for t in targets]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return errors
+
+
+def test_concurrent_index_flushes_leave_valid_json(tmp_path, monkeypatch):
+    index_file = tmp_path / "fingerprints.json"
+    monkeypatch.setattr(analysis_cache, "_INDEX_FILE", index_file)
+    monkeypatch.setattr(analysis_cache, "_index",
+                        {f"/lib/{i}.wav": {"mtime": i, "size": i, "fp": str(i)} for i in range(5_000)})
+    monkeypatch.setattr(analysis_cache, "_index_loaded", True)
+
+    def writer(n):
+        for i in range(20):
+            with analysis_cache._index_lock:
+                analysis_cache._index[f"/w{n}/{i}.wav"] = {"mtime": i, "size": i, "fp": f"{n}-{i}"}
+                analysis_cache._index_dirty = True
+            analysis_cache.flush_index()
+
+    assert _run_all([(writer, n) for n in range(8)]) == []
+    analysis_cache.flush_index()
+
+    assert len(json.loads(index_file.read_text(encoding="utf-8"))) == 5_000 + 8 * 20
+    assert [p.name for p in tmp_path.iterdir()] == ["fingerprints.json"]
+
+
+def test_write_atomic_from_many_threads(tmp_path):
+    path = tmp_path / "cache.json"
+    payloads = [json.dumps({"n": n, "pad": "x" * 200_000}) for n in range(16)]
+    assert _run_all([(analysis_cache.write_atomic, path, p) for p in payloads]) == []
+
+    assert path.read_text(encoding="utf-8") in payloads
+    assert [p.name for p in tmp_path.iterdir()] == ["cache.json"]
+
+
+def test_corrupt_index_is_kept_aside(tmp_path, monkeypatch):
+    index_file = tmp_path / "fingerprints.json"
+    index_file.write_text('{"/a.wav": {"mtime"', encoding="utf-8")
+    monkeypatch.setattr(analysis_cache, "_INDEX_FILE", index_file)
+    monkeypatch.setattr(analysis_cache, "_index", {})
+    monkeypatch.setattr(analysis_cache, "_index_loaded", False)
+
+    with analysis_cache._index_lock:
+        analysis_cache._load_index()
+
+    assert analysis_cache._index == {}
+    assert (tmp_path / "fingerprints.corrupt").exists()
+
+
+def _isolate(tmp_path, monkeypatch):
+    monkeypatch.setattr(analysis_cache, "CACHE_DIR", tmp_path)
+    monkeypatch.setattr(analysis_cache, "_INDEX_FILE", tmp_path / "fingerprints.json")
+    monkeypatch.setattr(analysis_cache, "_index", {})
+    monkeypatch.setattr(analysis_cache, "_index_loaded", True)
+    monkeypatch.setattr(analysis_cache, "_caches", [])
+    files = []
+    for i in range(4):
+        f = tmp_path / f"{i}.wav"
+        f.write_bytes(bytes([i]) * 100)
+        files.append(f)
+    return files
+
+
+def test_eviction_drops_index_rows_no_cache_holds(tmp_path, monkeypatch):
+    files = _isolate(tmp_path, monkeypatch)
+    small = analysis_cache.AnalysisCache("small.json", "bpm", "[T]", None, max_entries=2)
+    large = analysis_cache.AnalysisCache("large.json", "key", "[T]", None)
+    for i, f in enumerate(files):
+        small.put(f, 100 + i)
+    large.put(files[0], "C")
+    for i, f in enumerate(files):
+        small._entries[analysis_cache.fingerprint(f)]["used"] = i
+
+    small.flush(quiet=True)
+
+    assert set(analysis_cache._index) == {str(f) for f in (files[0], files[2], files[3])}
+
+
+def test_index_is_capped_rows_without_results_first(tmp_path, monkeypatch):
+    files = _isolate(tmp_path, monkeypatch)
+    monkeypatch.setattr(analysis_cache, "MAX_ENTRIES", 2)
+    cache = analysis_cache.AnalysisCache("bpm.json", "bpm", "[T]", None, max_entries=10)
+    for f in files:
+        analysis_cache.fingerprint(f)
+    cache.put(files[1], 120)
+    cache.put(files[2], 90)
+    cache._entries[analysis_cache.fingerprint(files[1])]["used"] = 1
+
+    analysis_cache.flush_index()
+
+    assert set(analysis_cache._index) == {str(files[1]), str(files[2])}
+    assert len(json.loads((tmp_path / "fingerprints.json").read_text(encoding="utf-8"))) == 2
@@ -0,0 +1,51 @@
+import struct
+import wave
+
+import audiotags
+
+
+def _wav_with_acid(path, acid: bytes):
+    with wave.open(str(path), "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(8000)
+        w.writeframes(b"\0\0" * 800)
+    with open(path, "r+b") as fh:
+        fh.seek(0, 2)
+        fh.write(struct.pack("<4sI", b"acid", len(acid)) + acid)
+        total = fh.tell()
+        fh.seek(4)
+        fh.write(struct.pack("<I", total - 8))
+
+
+def _acid(path) -> tuple:
+    with open(path, "rb") as fh:
+        data = fh.read()
+    offset = data.index(b"acid") + 8
+    return struct.unpack(audiotags._ACID_FMT, data[offset:offset + 24])
+
+
+def test_one_shot_acid_chunk_keeps_vendor_fields(tmp_path):
+    path = tmp_path / "hit.wav"
+    one_shot = struct.pack(audiotags._ACID_FMT, audiotags._ACID_ONE_SHOT, 60, 0x8000, 0.0,
+                           3, 8, 6, 0.0)
+    _wav_with_acid(path, one_shot)
+
+    assert not audiotags.write_tags(path, bpm=130.0)
+    assert _acid(path) == struct.unpack(audiotags._ACID_FMT, one_shot)
+
+    assert audiotags.write_tags(path, bpm=130.0, key="D")
+    flags, root, _u1, _u2, beats, den, num, tempo = _acid(path)
+    assert flags == audiotags._ACID_ONE_SHOT | audiotags._ACID_ROOT_SET
+    assert root == audiotags._ACID_ROOT_BASE + 2
+    assert (beats, den, num, tempo) == (3, 8, 6, 0.0)
+    tags = audiotags.read_tags(path)
+    assert tags.bpm is None and tags.key == "D"
+
+
+def test_loop_acid_chunk_updates_tempo_only(tmp_path):
+    path = tmp_path / "loop.wav"
+    _wav_with_acid(path, struct.pack(audiotags._ACID_FMT, 0, 0, 0x8000, 0.0, 8, 4, 4, 90.0))
+
+    assert audiotags.write_tags(path, bpm=120.0)
+    assert _acid(path) == (0, 0, 0x8000, 0.0, 8, 4, 4, 120.0)
@@ -0,0 +1,23 @@
+import array
+import math
+import wave
+
+import peaks
+
+
+def test_extract_peaks_matches_per_block_min_max(tmp_path):
+    path = tmp_path / "tone.wav"
+    samples = array.array("h", (int(20000 * math.sin(i / 7.0) * (i % 5000) / 5000)
+                                for i in range(100_000)))
+    with wave.open(str(path), "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(8000)
+        w.writeframes(samples.tobytes())
+
+    out = peaks.extract_peaks(path, points=64)
+
+    assert len(out) == 64
+    assert min(lo for lo, _ in out) == min(samples) >> 8
+    assert max(hi for _, hi in out) == max(samples) >> 8
+    assert all(lo <= hi for lo, hi in out)